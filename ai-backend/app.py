@@ -1,11 +1,15 @@
 from flask import Flask
 from flask_cors import CORS
 from routes.overview import bp as overview_bp
+from routes.jobs import bp as jobs_bp
+from utils import metrics
 
 app = Flask(__name__)
 CORS(app)
+metrics.init_app(app)
 
 app.register_blueprint(overview_bp)
+app.register_blueprint(jobs_bp)
 
 if __name__ == "__main__":
     app.run(debug=True, host="0.0.0.0", port=5001)
\ No newline at end of file
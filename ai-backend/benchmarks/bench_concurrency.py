@@ -0,0 +1,57 @@
+# bench_concurrency.py
+# /ai/generate_stores 동시 실행 처리량 벤치마크 (가짜 OpenAI 서버 사용, 네트워크/과금 없음)
+# 사용법: python benchmarks/bench_concurrency.py --stores 60 --latency 0.5 --concurrency 1 4 8 16 [--batch]
+import os
+import sys
+import json
+import time
+import argparse
+
+BASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="동시 추론 처리량 벤치마크")
+    parser.add_argument("--stores", type=int, default=60)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--port", type=int, default=5099)
+    parser.add_argument("--item-latency", type=float, default=0.05, help="결과 하나당 추가 지연(초)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--batch", action="store_true", help="여러 가게를 한 요청으로 묶는 배치 모드")
+    args = parser.parse_args()
+
+    # config import 전에 가짜 서버로 향하게 설정
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+    os.environ["WEB_BACKEND_URL"] = f"http://127.0.0.1:{args.port}/stores/process"
+    os.environ.setdefault("OPENAI_API_KEY", "fake")
+    os.environ["OPENAI_REQUESTS_PER_MINUTE"] = "0"
+    os.environ["OPENAI_TOKENS_PER_MINUTE"] = "0"
+    os.environ["INFER_CACHE_ENABLED"] = "0"  # 매번 실제로 호출해서 재기
+
+    from fake_openai import serve_in_thread
+    from routes.overview import run_stores
+
+    with open(os.path.join(BASE_DIR, "mock_data.json"), encoding="utf-8") as f:
+        mock = json.load(f)
+    stores = [mock[i % len(mock)] for i in range(args.stores)]
+
+    server = serve_in_thread(args.port, args.latency, args.item_latency)
+    try:
+        for concurrency in args.concurrency:
+            start = time.perf_counter()
+            calls_before = server.app.config["calls"]
+            result = run_stores(stores, concurrency, args.batch)
+            calls = server.app.config["calls"] - calls_before
+            elapsed = time.perf_counter() - start
+            assert [r["store_name"] for r in result] == [s["store_name"] for s in stores]
+            errors = sum(1 for r in result if "error" in r)
+            print(f"concurrency={concurrency}: {elapsed:.2f}s, {len(stores) / elapsed:.1f} stores/s, "
+                  f"openai_calls={calls}, errors={errors}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# fake_openai.py
+# 벤치마크/로컬 테스트용 가짜 OpenAI + 웹 백엔드 서버
+# - POST /v1/chat/completions: latency + 결과 수 * item_latency초 기다린 뒤 고정된 JSON 결과 반환
+#   (배치 프롬프트면 입력의 key마다 결과를 하나씩 담은 {"results": [...]})
+# - POST /stores/process, /stores/process/batch: 받기만 하고 ok
+# 단독 실행: python benchmarks/fake_openai.py --port 5099 --latency 0.5
+#   -> OPENAI_BASE_URL=http://127.0.0.1:5099/v1 WEB_BACKEND_URL=http://127.0.0.1:5099/stores/process
+import re
+import json
+import time
+import logging
+import argparse
+import threading
+from flask import Flask, jsonify, request
+from werkzeug.serving import make_server
+
+FAKE_RESULT = {
+    "store_name": "",
+    "address": "",
+    "categories": ["good_price"],
+    "positive_news_count": 2,
+    "positive_sns_count": 3,
+    "cardnews": {"title": "착한 가격 유지", "summary": "물가 상승에도 가격을 유지하고 있습니다."},
+}
+
+
+def create_app(latency=0.5, item_latency=0.0):
+    app = Flask(__name__)
+    app.config["calls"] = 0
+
+    @app.post("/v1/chat/completions")
+    def chat_completions():
+        app.config["calls"] += 1
+        body = request.get_json()
+        user_content = body.get("messages", [{}])[-1].get("content", "")
+        keys = re.findall(r'"key": "([^"]+)"', user_content)
+        if keys:
+            content = {"results": [{"key": key, **FAKE_RESULT} for key in keys]}
+        else:
+            content = FAKE_RESULT
+        time.sleep(latency + item_latency * max(1, len(keys)))
+        prompt_chars = sum(len(m.get("content", "")) for m in body.get("messages", []))
+        return jsonify({
+            "id": f"chatcmpl-fake-{app.config['calls']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": json.dumps(content, ensure_ascii=False)},
+            }],
+            "usage": {"prompt_tokens": prompt_chars // 2, "completion_tokens": 80, "total_tokens": prompt_chars // 2 + 80},
+        })
+
+    @app.post("/stores/process")
+    def process():
+        return jsonify({"status": "ok"})
+
+    @app.post("/stores/process/batch")
+    def process_batch():
+        app.config["batches"] = app.config.get("batches", 0) + 1
+        return jsonify({"status": "ok", "ingested": len(request.get_json())})
+
+    return app
+
+
+def serve_in_thread(port, latency, item_latency=0.0):
+    # 백그라운드 스레드에서 띄우고 server 반환 (server.shutdown()으로 종료)
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", port, create_app(latency, item_latency), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="가짜 OpenAI 서버")
+    parser.add_argument("--port", type=int, default=5099)
+    parser.add_argument("--latency", type=float, default=0.5, help="요청당 고정 지연(초)")
+    parser.add_argument("--item-latency", type=float, default=0.0, help="결과 하나당 추가 지연(초)")
+    args = parser.parse_args()
+    create_app(args.latency, args.item_latency).run(host="127.0.0.1", port=args.port, threaded=True)
@@ -8,9 +8,38 @@ load_dotenv(os.path.join(BASE_DIR, "..", ".env"))
 # OpenAI 설정
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+# 로컬 가짜 OpenAI 서버 등으로 바꿀 때 사용 (예: http://127.0.0.1:5099/v1)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+
+# 동시 추론 설정 (/ai/generate_stores)
+AI_CONCURRENCY = int(os.getenv("AI_CONCURRENCY", "4"))
+# 분당 요청/토큰 한도 (0이면 제한 없음)
+OPENAI_REQUESTS_PER_MINUTE = int(os.getenv("OPENAI_REQUESTS_PER_MINUTE", "500"))
+OPENAI_TOKENS_PER_MINUTE = int(os.getenv("OPENAI_TOKENS_PER_MINUTE", "200000"))
 
 # AI 서버 테스트용 포트
 PORT = int(os.getenv("PORT", "5001"))
 
 # 웹 백엔드 URL (DB 저장용 POST)
-WEB_BACKEND_URL = os.getenv("WEB_BACKEND_URL", "http://127.0.0.1:5000/stores/process")
\ No newline at end of file
+WEB_BACKEND_URL = os.getenv("WEB_BACKEND_URL", "http://127.0.0.1:5000/stores/process")
+# 여러 결과를 한 번에 저장하는 배치 엔드포인트, 배치 크기, 실패 시 재시도 횟수
+WEB_BACKEND_BATCH_URL = os.getenv("WEB_BACKEND_BATCH_URL", WEB_BACKEND_URL.rstrip("/") + "/batch")
+WEB_BACKEND_BATCH_SIZE = int(os.getenv("WEB_BACKEND_BATCH_SIZE", "50"))
+WEB_BACKEND_RETRIES = int(os.getenv("WEB_BACKEND_RETRIES", "3"))
+WEB_BACKEND_TIMEOUT = float(os.getenv("WEB_BACKEND_TIMEOUT", "30"))
+# 배치 모드: 여러 가게를 한 요청에 묶음 (요청당 예상 토큰 한도, 최대 가게 수)
+AI_BATCH_MODE = os.getenv("AI_BATCH_MODE", "0") == "1"
+AI_BATCH_TOKEN_BUDGET = int(os.getenv("AI_BATCH_TOKEN_BUDGET", "8000"))
+AI_BATCH_MAX_STORES = int(os.getenv("AI_BATCH_MAX_STORES", "10"))
+
+# infer_tags 결과 캐시 (SQLite). 키 = hash(모델, system prompt, user prompt)
+INFER_CACHE_ENABLED = os.getenv("INFER_CACHE_ENABLED", "1") == "1"
+INFER_CACHE_PATH = os.getenv("INFER_CACHE_PATH", os.path.join(BASE_DIR, "infer_cache.db"))
+INFER_CACHE_MAX_BYTES = int(os.getenv("INFER_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+# 증분 처리 작업(job) 체크포인트 DB
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join(BASE_DIR, "jobs.db"))
+# 끝난 작업(completed/failed)의 항목 기록 보관 기간 (일). 새 작업을 만들 때 지난 작업을 지움 (0이면 지우지 않음)
+JOB_RETENTION_DAYS = float(os.getenv("JOB_RETENTION_DAYS", "7"))
+# 이보다 느린 요청(ms)을 로그로 남김 (0이면 끔)
+SLOW_REQUEST_LOG_MS = float(os.getenv("SLOW_REQUEST_LOG_MS", "0"))
@@ -0,0 +1,100 @@
+from flask import Blueprint, jsonify, request
+import json
+import threading
+from routes.overview import iter_results, MOCK_DATA_FILE
+from services.job_store import JobStore, RUNNING, COMPLETED, FAILED
+from services.web_client import web_client
+from config import JOB_DB_PATH, JOB_RETENTION_DAYS, AI_CONCURRENCY, AI_BATCH_MODE, WEB_BACKEND_BATCH_SIZE
+
+bp = Blueprint("jobs", __name__)
+
+# 증분/재개 가능한 AI 분석 작업
+# - 입력 가게마다 fingerprint(뉴스 + SNS 리뷰 + 모델/프롬프트 버전)를 비교해서 이미 처리한 가게는 건너뜀
+# - 웹 백엔드 전송이 끝난 배치 단위로 체크포인트 -> 중간에 죽어도 이어서 실행
+# - 끝난 작업의 항목 기록은 JOB_RETENTION_DAYS가 지나면 새 작업을 만들 때 삭제 (jobs.db가 계속 커지지 않도록)
+job_store = JobStore(JOB_DB_PATH)
+job_store.mark_interrupted()
+
+_lock = threading.Lock()
+_running_job = None
+
+def _flush(job_id, pending):
+    if not pending:
+        return
+    # 웹 백엔드가 저장한 건만 완료로 체크포인트. 못 보냈거나 건별로 실패한 건은 오류와 함께 실패 처리 (재개 시 다시 시도)
+    undelivered = web_client.post_batch([result for _, result in pending])
+    job_store.mark_done(job_id, [idx for pos, (idx, _) in enumerate(pending) if pos not in undelivered])
+    for pos, error in undelivered.items():
+        job_store.mark_failed(job_id, pending[pos][0], f"web backend send failed: {error}")
+
+def run_job(job_id, concurrency=AI_CONCURRENCY, batch=AI_BATCH_MODE):
+    global _running_job
+    try:
+        items = job_store.pending_items(job_id)
+        job_store.set_status(job_id, RUNNING)
+        pending = []
+        for pos, store_result in iter_results([store for _, store in items], concurrency, batch, send=False):
+            idx = items[pos][0]
+            if "error" in store_result:
+                job_store.mark_failed(job_id, idx, store_result["error"])
+                continue
+            pending.append((idx, store_result))
+            if len(pending) >= WEB_BACKEND_BATCH_SIZE:
+                _flush(job_id, pending)
+                pending = []
+        _flush(job_id, pending)
+        job_store.set_status(job_id, COMPLETED)
+    except Exception as e:
+        job_store.set_status(job_id, FAILED, str(e))
+    finally:
+        with _lock:
+            _running_job = None
+
+def _start(job_id, concurrency, batch):
+    global _running_job
+    _running_job = job_id
+    threading.Thread(target=run_job, args=(job_id, concurrency, batch), daemon=True).start()
+
+@bp.post("/ai/jobs")
+def start_job():
+    # 멈춘 작업이 있으면 이어서 실행, 없으면(또는 ?new=1) 새 작업. ?force=1이면 fingerprint 무시
+    concurrency = max(1, request.args.get("concurrency", AI_CONCURRENCY, type=int))
+    batch = request.args.get("batch", "1" if AI_BATCH_MODE else "0") == "1"
+    force = request.args.get("force", "0") == "1"
+    new = request.args.get("new", "0") == "1"
+
+    with _lock:
+        if _running_job is not None:
+            return jsonify({"error": "job already running", "job": job_store.status(_running_job)}), 409
+
+        job_id = None if (new or force) else job_store.latest_resumable()
+        if job_id is None:
+            try:
+                with open(MOCK_DATA_FILE, "r", encoding="utf-8") as f:
+                    stores = json.load(f)
+            except Exception as e:
+                return jsonify({"error": f"mock_data.json load failed: {str(e)}"}), 500
+            job_id = job_store.create_job(stores, force=force, retention_days=JOB_RETENTION_DAYS)
+        _start(job_id, concurrency, batch)
+    return jsonify(job_store.status(job_id)), 202
+
+@bp.post("/ai/jobs/<int:job_id>/resume")
+def resume_job(job_id):
+    concurrency = max(1, request.args.get("concurrency", AI_CONCURRENCY, type=int))
+    batch = request.args.get("batch", "1" if AI_BATCH_MODE else "0") == "1"
+    with _lock:
+        status = job_store.status(job_id)
+        if status is None:
+            return jsonify({"error": "job not found"}), 404
+        if _running_job is not None:
+            return jsonify({"error": "job already running", "job": job_store.status(_running_job)}), 409
+        _start(job_id, concurrency, batch)
+    return jsonify(job_store.status(job_id)), 202
+
+@bp.get("/ai/jobs/<int:job_id>")
+def get_job(job_id):
+    status = job_store.status(job_id)
+    if status is None:
+        return jsonify({"error": "job not found"}), 404
+    status["running"] = _running_job == job_id
+    return jsonify(status)
@@ -1,13 +1,117 @@
-from flask import Blueprint, jsonify, Response
+from flask import Blueprint, jsonify, Response, request, stream_with_context
 import json
-import requests
-from services.openai_service import infer_tags
-from utils.prompt_templates import SYSTEM_PROMPT, USER_PROMPT_TEMPLATE
-from config import WEB_BACKEND_URL
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from services.openai_service import infer_tags, infer_tags_batch, pack_batches, result_cache
+from services.web_client import web_client
+from utils.prompt_templates import SYSTEM_PROMPT, USER_PROMPT_TEMPLATE, BATCH_USER_PROMPT_TEMPLATE
+from config import (
+    OPENAI_MODEL,
+    AI_CONCURRENCY,
+    AI_BATCH_MODE, AI_BATCH_TOKEN_BUDGET, AI_BATCH_MAX_STORES,
+)
 
 bp = Blueprint("overview", __name__)
 MOCK_DATA_FILE = "mock_data.json"
 
+def to_store_result(store, ai_output):
+    return {
+        "store_name": store.get("store_name", ""),
+        "address": store.get("address", ""),
+        "categories": ai_output.get("categories", []),
+        "positive_news_count": ai_output.get("positive_news_count", 0),
+        "positive_sns_count": ai_output.get("positive_sns_count", 0),
+        "cardnews": ai_output.get("cardnews", {"title": "", "summary": ""})
+    }
+
+def process_store(store):
+    # 가게 하나 추론. 실패해도 예외 대신 error 필드로 반환
+    try:
+        user_prompt = USER_PROMPT_TEMPLATE.format(
+            store_json=json.dumps(store, ensure_ascii=False, indent=2)
+        )
+        store_result = to_store_result(store, infer_tags(SYSTEM_PROMPT, user_prompt))
+    except Exception as e:
+        store_result = {
+            "store_name": store.get("store_name", ""),
+            "address": store.get("address", ""),
+            "error": str(e)
+        }
+    return store_result
+
+def process_batch(batch):
+    # batch: [(key, store_json)]. 한 요청으로 추론하고, 결과가 없거나 형식이 틀린 가게만 개별 재시도
+    try:
+        outputs = infer_tags_batch(SYSTEM_PROMPT, batch)
+    except Exception as e:
+        print(f"[Warning] Batch inference failed, retrying individually: {str(e)}")
+        outputs = {}
+
+    results = []
+    for key, store_json in batch:
+        store = json.loads(store_json)
+        ai_output = outputs.get(key)
+        if ai_output is None:
+            results.append(process_store(store))
+            continue
+        results.append(to_store_result(store, ai_output))
+    return results
+
+def iter_results(stores, concurrency=AI_CONCURRENCY, batch=AI_BATCH_MODE, send=True):
+    # 끝나는 대로 (입력 index, 결과)를 내보냄. concurrency개 스레드로 동시에 처리
+    # send=True면 성공한 결과를 모아 웹 백엔드 배치 엔드포인트로 전송
+    if batch:
+        # 토큰 예산 안에서 가게 여러 개를 한 요청으로 (배치는 입력 순서대로 연속)
+        items = [(str(i), json.dumps(store, ensure_ascii=False, indent=2)) for i, store in enumerate(stores)]
+        units = pack_batches(items, SYSTEM_PROMPT, AI_BATCH_TOKEN_BUDGET, AI_BATCH_MAX_STORES)
+
+        def run_unit(unit):
+            return list(zip((int(key) for key, _ in unit), process_batch(unit)))
+    else:
+        units = list(enumerate(stores))
+
+        def run_unit(unit):
+            index, store = unit
+            return [(index, process_store(store))]
+
+    batcher = web_client.batcher() if send else None
+    pool = ThreadPoolExecutor(max_workers=max(1, concurrency))
+    try:
+        futures = [pool.submit(run_unit, unit) for unit in units]
+        for future in as_completed(futures):
+            for index, store_result in future.result():
+                if batcher is not None and "error" not in store_result:
+                    batcher.add(store_result)
+                yield index, store_result
+        if batcher is not None:
+            batcher.flush()
+    finally:
+        # 스트리밍 도중 클라이언트가 끊으면 아직 시작 안 한 작업은 취소
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def run_stores(stores, concurrency=AI_CONCURRENCY, batch=AI_BATCH_MODE):
+    # 전체 결과를 입력 순서대로 반환
+    results = sorted(iter_results(stores, concurrency, batch), key=lambda item: item[0])
+    return [result for _, result in results]
+
+def current_batch_id():
+    # 입력 데이터 + 모델 + 프롬프트가 같으면 같은 id -> 웹 백엔드가 이미 받은 배치인지 판단하는 데 사용
+    h = hashlib.sha256()
+    with open(MOCK_DATA_FILE, "rb") as f:
+        h.update(f.read())
+    for part in (OPENAI_MODEL, SYSTEM_PROMPT, USER_PROMPT_TEMPLATE, BATCH_USER_PROMPT_TEMPLATE):
+        h.update(b"\0" + part.encode("utf-8"))
+    return h.hexdigest()
+
+
+@bp.get("/ai/batch_id")
+def batch_id():
+    try:
+        return jsonify({"batch_id": current_batch_id()})
+    except OSError as e:
+        return jsonify({"error": f"mock_data.json load failed: {str(e)}"}), 500
+
+
 @bp.get("/ai/generate_stores")
 def generate_stores():
     try:
@@ -16,41 +120,35 @@ def generate_stores():
     except Exception as e:
         return jsonify({"error": f"mock_data.json load failed: {str(e)}"}), 500
 
-    result = []
+    concurrency = request.args.get("concurrency", AI_CONCURRENCY, type=int)
+    batch = request.args.get("batch", "1" if AI_BATCH_MODE else "0") == "1"
 
-    for store in stores:
-        store_result = {
-            "store_name": store.get("store_name", ""), 
-            "address": store.get("address", "")
-            }
-        try:
-            user_prompt = USER_PROMPT_TEMPLATE.format(
-                store_json=json.dumps(store, ensure_ascii=False, indent=2)
-            )
-            ai_output = infer_tags(SYSTEM_PROMPT, user_prompt)
-
-            store_result.update({
-                "categories": ai_output.get("categories", []),
-                "positive_news_count": ai_output.get("positive_news_count", 0),
-                "positive_sns_count": ai_output.get("positive_sns_count", 0),
-                "cardnews": ai_output.get("cardnews", {"title": "", "summary": ""})
-            })
-
-            # 웹 백엔드로 전송
-            try:
-                resp = requests.post(WEB_BACKEND_URL, json=store_result)
-                if resp.status_code != 200:
-                    print(f"[Warning] Failed to send {store_result['store_name']}: {resp.text}")
-            except Exception as e2:
-                print(f"[Error] Sending {store_result['store_name']} failed: {str(e2)}")
-
-        except Exception as e:
-            store_result["error"] = str(e)
-
-        result.append(store_result)
+    # ?stream=ndjson: 가게별 결과를 끝나는 대로 한 줄씩 전송 ("index" = 입력 순서)
+    # 받는 쪽이 직접 저장하므로 웹 백엔드로 POST하지 않음 (?push=1이면 전송)
+    if request.args.get("stream") == "ndjson":
+        send = request.args.get("push", "0") == "1"
+
+        def generate():
+            for index, store_result in iter_results(stores, max(1, concurrency), batch, send):
+                yield json.dumps({"index": index, **store_result}, ensure_ascii=False) + "\n"
+
+        return Response(
+            stream_with_context(generate()),
+            status=200,
+            mimetype="application/x-ndjson; charset=utf-8"
+        )
+
+    result = run_stores(stores, max(1, concurrency), batch)
 
     return Response(
         json.dumps(result, ensure_ascii=False, indent=2),
         status=200,
         mimetype="application/json; charset=utf-8"
-    )
\ No newline at end of file
+    )
+
+@bp.get("/ai/cache_stats")
+def cache_stats():
+    # infer_tags 결과 캐시 적중/미스 현황
+    if result_cache is None:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **result_cache.stats()})
\ No newline at end of file
@@ -0,0 +1,190 @@
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from config import OPENAI_MODEL
+from utils.prompt_templates import PROMPT_VERSION, SYSTEM_PROMPT, USER_PROMPT_TEMPLATE, BATCH_USER_PROMPT_TEMPLATE
+
+# 작업 상태
+PENDING, RUNNING, COMPLETED, INTERRUPTED, FAILED = "pending", "running", "completed", "interrupted", "failed"
+# 항목 상태
+ITEM_PENDING, ITEM_DONE, ITEM_SKIPPED, ITEM_FAILED = "pending", "done", "skipped", "failed"
+
+
+def store_key(store: dict) -> str:
+    return f"{store.get('store_name', '')}|{store.get('address', '')}"
+
+
+# 같은 입력이라도 결과를 바꾸는 설정: 모델, 프롬프트 버전, 프롬프트 내용
+# -> 바뀌면 모든 가게의 fingerprint가 달라져서 다음 작업에서 다시 처리
+ANALYSIS_VERSION = {
+    "model": OPENAI_MODEL,
+    "prompt_version": PROMPT_VERSION,
+    "prompt": hashlib.sha256("\0".join(
+        (SYSTEM_PROMPT, USER_PROMPT_TEMPLATE, BATCH_USER_PROMPT_TEMPLATE)
+    ).encode("utf-8")).hexdigest(),
+}
+
+
+def fingerprint(store: dict) -> str:
+    # 입력 내용(뉴스 + SNS 리뷰)과 분석 설정(ANALYSIS_VERSION)이 같으면 같은 값
+    content = {"news": store.get("news", []), "sns_reviews": store.get("sns_reviews", []), "analysis": ANALYSIS_VERSION}
+    return hashlib.sha256(json.dumps(content, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class JobStore:
+    """증분 처리 작업 체크포인트 (SQLite).
+
+    - processed: 가게별로 마지막으로 처리(웹 백엔드 전송까지 완료)한 fingerprint
+    - jobs / job_items: 작업과 항목별 진행 상태. 프로세스가 죽어도 done 항목은 다시 처리하지 않음
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS processed (
+                store_key TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                processed_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                status TEXT NOT NULL,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS job_items (
+                job_id INTEGER NOT NULL,
+                idx INTEGER NOT NULL,
+                store_key TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                store_json TEXT NOT NULL,
+                status TEXT NOT NULL,
+                error TEXT,
+                PRIMARY KEY (job_id, idx)
+            );
+            """
+        )
+        self._conn.commit()
+
+    def create_job(self, stores: list, force: bool = False, retention_days: float = 0) -> int:
+        # 이미 같은 fingerprint로 처리된 가게는 skipped로 등록. retention_days > 0이면 그보다 오래된 끝난 작업을 먼저 정리
+        now = time.time()
+        if retention_days > 0:
+            self.prune(now - retention_days * 86400)
+        with self._lock:
+            processed = dict(self._conn.execute("SELECT store_key, fingerprint FROM processed"))
+            cur = self._conn.execute(
+                "INSERT INTO jobs (status, created_at, updated_at) VALUES (?, ?, ?)", (PENDING, now, now)
+            )
+            job_id = cur.lastrowid
+            rows = []
+            for idx, store in enumerate(stores):
+                key, fp = store_key(store), fingerprint(store)
+                status = ITEM_SKIPPED if not force and processed.get(key) == fp else ITEM_PENDING
+                rows.append((job_id, idx, key, fp, json.dumps(store, ensure_ascii=False), status))
+            self._conn.executemany(
+                "INSERT INTO job_items (job_id, idx, store_key, fingerprint, store_json, status) VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+        return job_id
+
+    def pending_items(self, job_id: int) -> list:
+        # [(idx, store)] 아직 끝나지 않은 항목 (실패 항목도 재시도 대상)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT idx, store_json FROM job_items WHERE job_id = ? AND status IN (?, ?) ORDER BY idx",
+                (job_id, ITEM_PENDING, ITEM_FAILED),
+            ).fetchall()
+        return [(idx, json.loads(store_json)) for idx, store_json in rows]
+
+    def mark_done(self, job_id: int, indexes: list):
+        # 웹 백엔드 전송이 끝난 항목을 한 트랜잭션으로 체크포인트
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE job_items SET status = ?, error = NULL WHERE job_id = ? AND idx = ?",
+                [(ITEM_DONE, job_id, idx) for idx in indexes],
+            )
+            self._conn.executemany(
+                """
+                INSERT OR REPLACE INTO processed (store_key, fingerprint, processed_at)
+                SELECT store_key, fingerprint, ? FROM job_items WHERE job_id = ? AND idx = ?
+                """,
+                [(now, job_id, idx) for idx in indexes],
+            )
+            self._conn.execute("UPDATE jobs SET updated_at = ? WHERE id = ?", (now, job_id))
+            self._conn.commit()
+
+    def mark_failed(self, job_id: int, idx: int, error: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE job_items SET status = ?, error = ? WHERE job_id = ? AND idx = ?",
+                (ITEM_FAILED, error, job_id, idx),
+            )
+            self._conn.commit()
+
+    def set_status(self, job_id: int, status: str, error: str = None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                (status, error, time.time(), job_id),
+            )
+            self._conn.commit()
+
+    def prune(self, before: float) -> int:
+        # before(epoch)보다 전에 끝난 작업(completed/failed)과 그 항목을 삭제. 가게별 처리 기록(processed)은 남김
+        with self._lock:
+            job_ids = [(job_id,) for job_id, in self._conn.execute(
+                "SELECT id FROM jobs WHERE status IN (?, ?) AND updated_at < ?", (COMPLETED, FAILED, before)
+            )]
+            self._conn.executemany("DELETE FROM job_items WHERE job_id = ?", job_ids)
+            self._conn.executemany("DELETE FROM jobs WHERE id = ?", job_ids)
+            self._conn.commit()
+        return len(job_ids)
+
+    def mark_interrupted(self):
+        # 서버 시작 시: 실행 중이던 작업은 프로세스와 함께 멈춘 것
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE status IN (?, ?)",
+                (INTERRUPTED, time.time(), RUNNING, PENDING),
+            )
+            self._conn.commit()
+
+    def latest_resumable(self):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id FROM jobs WHERE status = ? ORDER BY id DESC LIMIT 1", (INTERRUPTED,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def status(self, job_id: int):
+        with self._lock:
+            job = self._conn.execute(
+                "SELECT id, status, error, created_at, updated_at FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if job is None:
+                return None
+            counts = dict(self._conn.execute(
+                "SELECT status, COUNT(*) FROM job_items WHERE job_id = ? GROUP BY status", (job_id,)
+            ))
+        return {
+            "id": job[0],
+            "status": job[1],
+            "error": job[2],
+            "created_at": job[3],
+            "updated_at": job[4],
+            "total": sum(counts.values()),
+            "done": counts.get(ITEM_DONE, 0),
+            "skipped": counts.get(ITEM_SKIPPED, 0),
+            "failed": counts.get(ITEM_FAILED, 0),
+            "pending": counts.get(ITEM_PENDING, 0),
+        }
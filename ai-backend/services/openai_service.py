@@ -1,46 +1,165 @@
 import json
 from openai import OpenAI
-from config import OPENAI_API_KEY, OPENAI_MODEL
+from config import (
+    OPENAI_API_KEY, OPENAI_MODEL, OPENAI_BASE_URL,
+    OPENAI_REQUESTS_PER_MINUTE, OPENAI_TOKENS_PER_MINUTE,
+    INFER_CACHE_ENABLED, INFER_CACHE_PATH, INFER_CACHE_MAX_BYTES,
+)
+from services.result_cache import ResultCache, make_key
+from utils.prompt_templates import BATCH_USER_PROMPT_TEMPLATE
+from utils.rate_limit import RateLimiter
+from utils.metrics import track_outbound, record_openai_usage
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+client = OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL)
 
-def infer_tags(system_prompt: str, user_prompt: str) -> dict:
-    resp = client.chat.completions.create(
-        model=OPENAI_MODEL,
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ],
-        temperature=0
-    )
-    raw_text = resp.choices[0].message.content
+# 동시 호출 전체가 공유하는 분당 요청/토큰 한도
+rate_limiter = RateLimiter(OPENAI_REQUESTS_PER_MINUTE, OPENAI_TOKENS_PER_MINUTE)
+
+# 추론 결과 캐시 (끄면 None)
+result_cache = ResultCache(INFER_CACHE_PATH, INFER_CACHE_MAX_BYTES) if INFER_CACHE_ENABLED else None
+
+# 응답 토큰 예상치 (카드뉴스 JSON 한 개 분량)
+EXPECTED_COMPLETION_TOKENS = 300
+
+def estimate_prompt_tokens(*texts: str) -> int:
+    # 한글 위주 텍스트라 대략 2글자당 1토큰으로 넉넉하게 잡음
+    return sum(len(t) for t in texts) // 2
+
+def estimate_tokens(*texts: str) -> int:
+    return estimate_prompt_tokens(*texts) + EXPECTED_COMPLETION_TOKENS
+
+def _complete(system_prompt: str, user_prompt: str, expected_results: int = 1) -> str:
+    rate_limiter.acquire(estimate_prompt_tokens(system_prompt, user_prompt) + EXPECTED_COMPLETION_TOKENS * expected_results)
+    with track_outbound("openai"):
+        resp = client.chat.completions.create(
+            model=OPENAI_MODEL,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=0
+        )
+    record_openai_usage(OPENAI_MODEL, resp.usage)
+    return resp.choices[0].message.content
+
+def normalize_output(data):
+    # 가게 하나의 결과 dict 검증/정리. 형식이 맞지 않으면 None
+    if not isinstance(data, dict):
+        return None
+    if not isinstance(data.get("categories", []), list):
+        return None
+    for count_key in ("positive_news_count", "positive_sns_count"):
+        try:
+            data[count_key] = int(data.get(count_key, 0))
+        except (TypeError, ValueError):
+            return None
+    if not isinstance(data.get("cardnews", {}), (dict, list)):
+        return None
+
+    # categories를 문자열 리스트로 변환
+    categories = data.get("categories", [])
+    processed_categories = []
+    for cat in categories:
+        if isinstance(cat, dict) and "name" in cat:
+            processed_categories.append(cat["name"])
+        elif isinstance(cat, str):
+            processed_categories.append(cat)
+    data["categories"] = processed_categories
+
+    # address 포함 여부 확인, 없으면 빈 문자열
+    data["address"] = data.get("address", "")
+
+    return data
 
+def parse_output(raw_text: str):
+    # AI 응답 -> dict. JSON이 아니면 None
     try:
         # AI가 JSON만 반환하도록 유도
         json_text = raw_text.strip()
         data = json.loads(json_text)
+    except (json.JSONDecodeError, AttributeError):
+        return None
+    return normalize_output(data)
+
+def fallback_output() -> dict:
+    return {
+        "store_name": "",
+        "address": "",
+        "categories": [],
+        "positive_news_count": 0,
+        "positive_sns_count": 0,
+        "cardnews": {"title": "", "summary": ""}
+    }
+
+def infer_tags(system_prompt: str, user_prompt: str) -> dict:
+    # temperature=0이므로 같은 (모델, 프롬프트)는 캐시된 결과를 그대로 사용
+    key = make_key(OPENAI_MODEL, system_prompt, user_prompt)
+    if result_cache is not None:
+        cached = result_cache.get(key)
+        if cached is not None:
+            return cached
+
+    data = parse_output(_complete(system_prompt, user_prompt))
+    if data is None:
+        # fallback (파싱 실패 결과는 캐시하지 않음)
+        return fallback_output()
+    if result_cache is not None:
+        result_cache.put(key, data)
+    return data
+
+
+def pack_batches(items: list, system_prompt: str, token_budget: int, max_items: int) -> list:
+    """[(key, store_json)] -> 순서를 유지한 배치 리스트. 배치마다 system prompt + 가게들 + 예상 응답이 token_budget 이하."""
+    fixed = estimate_prompt_tokens(system_prompt, BATCH_USER_PROMPT_TEMPLATE)
+    batches, current, used = [], [], fixed
+    for key, store_json in items:
+        cost = estimate_tokens(store_json)
+        if current and (used + cost > token_budget or len(current) >= max_items):
+            batches.append(current)
+            current, used = [], fixed
+        current.append((key, store_json))
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+def _batch_cache_key(system_prompt: str, store_json: str) -> str:
+    # 배치 프롬프트로 얻은 결과는 배치 템플릿까지 포함한 키로 저장
+    return make_key(OPENAI_MODEL, system_prompt, BATCH_USER_PROMPT_TEMPLATE + store_json)
+
+def infer_tags_batch(system_prompt: str, items: list) -> dict:
+    """[(key, store_json)]를 한 요청으로 추론 -> {key: 결과}. 검증에 실패한 가게는 빠져 있음 (호출자가 개별 재시도)."""
+    results, pending = {}, []
+    for key, store_json in items:
+        cached = result_cache.get(_batch_cache_key(system_prompt, store_json)) if result_cache is not None else None
+        if cached is not None:
+            results[key] = cached
+        else:
+            pending.append((key, store_json))
+    if not pending:
+        return results
+
+    stores_json = "[\n" + ",\n".join(
+        json.dumps({"key": key, **json.loads(store_json)}, ensure_ascii=False, indent=2) for key, store_json in pending
+    ) + "\n]"
+    raw_text = _complete(system_prompt, BATCH_USER_PROMPT_TEMPLATE.format(stores_json=stores_json), len(pending))
+    try:
+        data = json.loads(raw_text.strip())
+    except (json.JSONDecodeError, AttributeError):
+        return results
+    entries = data.get("results", []) if isinstance(data, dict) else data
+    if not isinstance(entries, list):
+        return results
 
-        # categories를 문자열 리스트로 변환
-        categories = data.get("categories", [])
-        processed_categories = []
-        for cat in categories:
-            if isinstance(cat, dict) and "name" in cat:
-                processed_categories.append(cat["name"])
-            elif isinstance(cat, str):
-                processed_categories.append(cat)
-        data["categories"] = processed_categories
-
-        # address 포함 여부 확인, 없으면 빈 문자열
-        data["address"] = data.get("address", "")
-
-        return data
-    except json.JSONDecodeError:
-        # fallback
-        return {
-            "store_name": "",
-            "address": "",
-            "categories": [],
-            "positive_news_count": 0,
-            "positive_sns_count": 0,
-            "cardnews": {"title": "", "summary": ""}
-        }
\ No newline at end of file
+    by_key = dict(pending)
+    for entry in entries:
+        if not isinstance(entry, dict) or str(entry.get("key")) not in by_key:
+            continue
+        key = str(entry.pop("key"))
+        output = normalize_output(entry)
+        if output is None or key in results:
+            continue
+        results[key] = output
+        if result_cache is not None:
+            result_cache.put(_batch_cache_key(system_prompt, by_key[key]), output)
+    return results
\ No newline at end of file
@@ -0,0 +1,80 @@
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+
+def make_key(model: str, system_prompt: str, user_prompt: str) -> str:
+    # 모델이나 프롬프트(템플릿 포함)가 바뀌면 키가 달라져 자동으로 무효화됨
+    h = hashlib.sha256()
+    for part in (model, system_prompt, user_prompt):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class ResultCache:
+    """SQLite 기반 추론 결과 캐시. 전체 크기가 max_bytes를 넘으면 오래 안 쓴 항목부터 삭제."""
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS infer_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_infer_cache_last_used ON infer_cache (last_used_at)")
+        self._conn.commit()
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM infer_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE infer_cache SET last_used_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, value: dict):
+        text = json.dumps(value, ensure_ascii=False)
+        size = len(text.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO infer_cache (key, value, size, created_at, last_used_at) VALUES (?, ?, ?, ?, ?)",
+                (key, text, size, now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM infer_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM infer_cache ORDER BY last_used_at").fetchall()
+        expired = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            expired.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM infer_cache WHERE key = ?", expired)
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM infer_cache").fetchone()
+            return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": total, "max_bytes": self.max_bytes}
@@ -0,0 +1,100 @@
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from utils.metrics import track_outbound
+from config import (
+    WEB_BACKEND_BATCH_URL, WEB_BACKEND_BATCH_SIZE,
+    WEB_BACKEND_RETRIES, WEB_BACKEND_TIMEOUT,
+)
+
+# 재시도할 응답 코드 (서버가 일시적으로 못 받은 경우. 500도 쓰기 잠금 대기 초과 같은 일시적 오류일 수 있음)
+RETRY_STATUS = {500, 502, 503, 504}
+# 웹 백엔드가 건별 실패로 돌려주는 오류 중 다시 보내도 소용없는 것 (레코드 형식 오류)
+PERMANENT_ERROR = "invalid record"
+
+
+class WebBackendClient:
+    """웹 백엔드로 결과를 보내는 클라이언트. 연결 풀을 재사용하고 배치 단위로 POST."""
+
+    def __init__(self, batch_url=WEB_BACKEND_BATCH_URL, retries=WEB_BACKEND_RETRIES, timeout=WEB_BACKEND_TIMEOUT, pool_size=8):
+        self.batch_url = batch_url
+        self.retries = retries
+        self.timeout = timeout
+        self.http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.http.mount("http://", adapter)
+        self.http.mount("https://", adapter)
+
+    def post_batch(self, results: list) -> dict:
+        """results를 배치로 보내고 전달하지 못한 건을 {results index: 오류}로 반환 (빈 dict면 모두 전달).
+
+        연결 오류/5xx는 지수 백오프로 재시도. 200 응답이어도 웹 백엔드가 건별로 실패한 건("failed")은
+        같은 방식으로 그 건들만 다시 보냄 (형식이 잘못된 건 -> "invalid record"는 다시 보내도 같으므로 제외).
+        """
+        undelivered = {}
+        pending = list(range(len(results)))  # 이번 시도에 보낼 results index
+        for attempt in range(self.retries + 1):
+            try:
+                with track_outbound("web_backend") as call:
+                    resp = self.http.post(self.batch_url, json=[results[i] for i in pending], timeout=self.timeout)
+                    call["status"] = resp.status_code
+                if resp.status_code == 200:
+                    retry = []
+                    for i in pending:
+                        undelivered.pop(i, None)
+                    for item in resp.json().get("failed", []):
+                        index = pending[item["index"]]
+                        undelivered[index] = item.get("error") or "failed"
+                        if not undelivered[index].startswith(PERMANENT_ERROR):
+                            retry.append(index)
+                    if not retry:
+                        break
+                    pending = retry
+                    error = f"{len(retry)} records failed: {undelivered[retry[0]]}"
+                elif resp.status_code not in RETRY_STATUS:
+                    print(f"[Warning] Failed to send batch of {len(pending)}: {resp.status_code} {resp.text[:200]}")
+                    undelivered.update((i, f"HTTP {resp.status_code}") for i in pending)
+                    return undelivered
+                else:
+                    error = f"HTTP {resp.status_code}"
+            except (requests.ConnectionError, requests.Timeout, ValueError) as e:
+                error = str(e)
+            if attempt < self.retries:
+                time.sleep(0.5 * 2 ** attempt)
+        else:
+            print(f"[Error] Sending batch of {len(pending)} failed after {self.retries + 1} attempts: {error}")
+            for i in pending:
+                undelivered.setdefault(i, error)
+        if undelivered:
+            print(f"[Warning] {len(undelivered)} of {len(results)} records not stored by web backend")
+        return undelivered
+
+    def batcher(self, batch_size=WEB_BACKEND_BATCH_SIZE):
+        return ResultBatcher(self, batch_size)
+
+
+class ResultBatcher:
+    """한 번의 실행 동안 결과를 모아 batch_size개마다 전송. 마지막에 flush() 호출."""
+
+    def __init__(self, client: WebBackendClient, batch_size: int):
+        self.client = client
+        self.batch_size = max(1, batch_size)
+        self.pending = []
+        self.sent = 0
+        self.failed = 0
+
+    def add(self, store_result: dict):
+        self.pending.append(store_result)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, []
+        undelivered = self.client.post_batch(batch)
+        self.sent += len(batch) - len(undelivered)
+        self.failed += len(undelivered)
+
+
+web_client = WebBackendClient()
@@ -0,0 +1,173 @@
+# 요청 단위 성능 계측 + Prometheus 텍스트 형식 /metrics
+# - 라우트별 응답 시간 히스토그램
+# - 외부 HTTP 호출 시간 (track_outbound: OpenAI, 웹 백엔드 배치 POST)
+# - OpenAI 토큰 사용량 (응답의 usage)
+# - SLOW_REQUEST_LOG_MS를 설정하면 그보다 느린 요청을 그동안의 외부 호출과 함께 출력 (기본 꺼짐)
+import time
+import threading
+from contextlib import contextmanager
+from flask import g, request, has_request_context, Response
+from config import SLOW_REQUEST_LOG_MS
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + list(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) + (float("inf"),)
+        self._values = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, state in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, state):
+                    cumulative += count
+                    le = f'le="{_number(bound)}"'
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, [le])} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(state[-2])}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {state[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_LATENCY = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP 요청 처리 시간", ("method", "route", "status"),
+))
+OUTBOUND_LATENCY = registry.register(Histogram(
+    "outbound_http_duration_seconds", "외부 HTTP 호출 시간", ("target", "status"),
+))
+OPENAI_TOKENS = registry.register(Counter(
+    "openai_tokens_total", "OpenAI 토큰 사용량 (응답 usage 기준)", ("model", "kind"),
+))
+OPENAI_REQUEST_TOKENS = registry.register(Histogram(
+    "openai_request_tokens", "OpenAI 요청 하나의 전체 토큰 수", ("model",), TOKEN_BUCKETS,
+))
+
+
+@contextmanager
+def track_outbound(target):
+    """외부 HTTP 호출 시간 기록. with 블록 안에서 call["status"]에 상태 코드를 넣으면 라벨로 사용."""
+    call = {"status": "ok"}
+    started = time.perf_counter()
+    try:
+        yield call
+    except Exception:
+        call["status"] = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        OUTBOUND_LATENCY.observe(elapsed, target, str(call["status"]))
+        # 요청 스레드에서 호출한 경우 느린 요청 로그용으로 기록 (작업 스레드 호출은 요청 컨텍스트가 없음)
+        if SLOW_REQUEST_LOG_MS and has_request_context() and "metrics_calls" in g:
+            g.metrics_calls.append((target, call["status"], elapsed))
+
+
+def record_openai_usage(model, usage):
+    # usage가 없는 호환 서버도 있으므로 없으면 건너뜀
+    if usage is None:
+        return
+    prompt = getattr(usage, "prompt_tokens", 0) or 0
+    completion = getattr(usage, "completion_tokens", 0) or 0
+    OPENAI_TOKENS.inc(model, "prompt", amount=prompt)
+    OPENAI_TOKENS.inc(model, "completion", amount=completion)
+    OPENAI_REQUEST_TOKENS.observe(prompt + completion, model)
+
+
+def init_app(app):
+    """요청 훅과 GET /metrics를 등록."""
+
+    @app.before_request
+    def _start():
+        g.metrics_started = time.perf_counter()
+        g.metrics_calls = []
+
+    @app.after_request
+    def _finish(response):
+        started = g.pop("metrics_started", None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        rule = request.url_rule
+        route = rule.rule if rule is not None else "unmatched"
+        REQUEST_LATENCY.observe(elapsed, request.method, route, str(response.status_code))
+        if SLOW_REQUEST_LOG_MS and elapsed * 1000 >= SLOW_REQUEST_LOG_MS:
+            calls = "".join(
+                f"\n    {target} {status} {seconds * 1000:.1f} ms" for target, status, seconds in g.metrics_calls
+            )
+            print(f"[Slow Request] {request.method} {request.full_path} -> {response.status_code} "
+                  f"{elapsed * 1000:.1f} ms{calls}")
+        return response
+
+    @app.route("/metrics")
+    def metrics():
+        return Response(registry.render(), mimetype="text/plain; version=0.0.4")
@@ -1,3 +1,7 @@
+# 프롬프트 밖에서 결과 해석(파싱/점수 규칙 등)이 바뀌면 올림 -> 증분 작업이 모든 가게를 다시 처리
+# (프롬프트 문장 자체가 바뀐 것은 job_store가 내용 해시로 알아챔)
+PROMPT_VERSION = 1
+
 SYSTEM_PROMPT = """
 당신은 로컬 상권의 사회적 가치를 평가하는 전문가입니다.
 주어진 뉴스 기사와 SNS 리뷰를 읽고, 특정 가게가 '착한 가게'로 불릴 만한 근거를 찾아, 해당되는 카테고리로 분류하세요.
@@ -38,4 +42,35 @@ USER_PROMPT_TEMPLATE = """
     "positive_sns_count": 0,
     "cardnews": {{"title": "...", "summary": "..."}}
 }}
-"""
\ No newline at end of file
+"""
+
+# 여러 가게를 한 번에 보내는 배치 모드용 (SYSTEM_PROMPT는 요청당 한 번만 전송)
+BATCH_USER_PROMPT_TEMPLATE = """
+다음은 여러 가게에 대한 자료입니다. 각 가게는 "key" 값으로 구분됩니다:
+
+{stores_json}
+
+각 가게마다 따로 아래 요구사항을 수행하세요:
+1) 뉴스와 SNS 리뷰를 읽고, 해당 가게가 '착한 가게'라고 평가된 근거를 찾으세요.
+2) 카테고리 풀에서 어울리는 카테고리를 하나 이상 선택하세요.
+3) 뉴스 기사 중 긍정적으로 평가한 뉴스 기사의 개수를 세세요.
+4) SNS 리뷰 중 긍정적으로 평가한 SNS 리뷰의 개수를 세세요.
+5) 위 결과를 기반으로, 제목과 간단한 요약(3줄 이내)을 포함하는 카드뉴스를 만들어주세요.
+
+반드시 valid JSON으로 반환하세요.
+입력의 모든 key에 대해 results에 하나씩, 같은 key 값을 넣어 반환하세요.
+출력 구조는 다음과 같습니다:
+{{
+    "results": [
+        {{
+            "key": "...",
+            "store_name": "...",
+            "address": "...",
+            "categories": ["..."],
+            "positive_news_count": 0,
+            "positive_sns_count": 0,
+            "cardnews": {{"title": "...", "summary": "..."}}
+        }}
+    ]
+}}
+"""
@@ -1,92 +1,103 @@
 # Flask 웹 서버
 from flask import Flask, jsonify, request, abort
 from flask_cors import CORS
-from sqlalchemy import create_engine
-from sqlalchemy import text
-from sqlalchemy.orm import sessionmaker, joinedload
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import joinedload, selectinload
 from contextlib import contextmanager
 import os
-import datetime
+import time
 import requests
 import json
 import load_data  # CSV/JSON 초기 데이터 로딩
-from models import Base, Store, Certification, CertificationType, Category, CardNews
+import manifest
+import migrations
+import spatial
+import scoring
+import search_index
+import clusters
+from pagination import list_response
+from response_cache import ResponseCache, cached, install_invalidation
+from compression import compress_response
+import marker_format
+import metrics
+from category_index import ensure_category_index, parse_categories, filter_by_categories
+from models import Base, Store, Certification, CardNews
+from db import engine, Session, ReadSession, write_queue
+from geocoding import Geocoder
+from geocode_worker import GeocodeWorker
+from ingest_service import IngestService
+from ingest_worker import BackgroundIngest
 
 app = Flask(__name__)
 CORS(app)
 
-# DB 세팅
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_PATH = os.path.join(BASE_DIR, "database.db")
-engine = create_engine(f"sqlite:///{os.path.abspath(DB_PATH)}")
-Session = sessionmaker(bind=engine)
+# DB 세팅 (db.py): 읽기는 ReadSession 풀, 쓰기는 모두 write_queue로
 
 # AI 서버 설정
 AI_SERVER_URL = "http://localhost:5001/ai/generate_stores"
+# 현재 AI 결과 배치 id (입력 데이터/모델/프롬프트 해시). manifest와 같으면 다시 받지 않음
+AI_BATCH_ID_URL = "http://localhost:5001/ai/batch_id"
+AI_BATCH_SOURCE = "ai_batch"
+# 스트림에서 다음 결과가 올 때까지 기다리는 최대 시간(초)
+AI_STREAM_READ_TIMEOUT = 120
+
+# /stores/process/batch 한 번에 받는 최대 결과 수
+PROCESS_BATCH_MAX_ITEMS = 1000
+
+# GET 응답 캐시: 이 프로세스의 쓰기 세션(write_queue)이 commit하면 무효화
+# (초기 적재는 자식 프로세스에서 쓰므로 load_sources가 끝난 뒤 직접 무효화)
+response_cache = ResponseCache()
+install_invalidation(response_cache, Session)
+
+# 주소 -> 좌표 변환기 (카카오 API 키는 geocoding 모듈에서 불러옴)
+# 수집 경로는 좌표 없이 저장하고, 좌표는 백그라운드 워커가 채움 (geocode_worker.py)
+# 좌표 채우기는 배치마다 캐시를 비우지 않고 한 바퀴를 마칠 때 한 번만 무효화
+geocoder = Geocoder(ReadSession, write_queue=write_queue)
+geocode_worker = GeocodeWorker(ReadSession, geocoder, write_queue=write_queue,
+                               on_filled=lambda filled: response_cache.invalidate())
+
+# 최소 점수 기준 (scoring.py, 지도 클러스터 집계와 공용)
+MIN_SCORE = scoring.MIN_SCORE
+
+# AI 결과 수집 (/stores/process*, AI 스트림 공용). 결과 여러 건을 쓰기 작업 하나로 저장
+ingest_service = IngestService(write_queue, MIN_SCORE)
+# AI 스트림에서 모아서 한 번에 저장할 최대 건수 / 첫 건을 받은 뒤 최대 대기 시간(초)
+AI_INGEST_BATCH_SIZE = 100
+AI_INGEST_FLUSH_SECONDS = 1.0
+
+# /stores/nearby 결과 개수 기본값/최대값
+NEARBY_DEFAULT_LIMIT = 50
+NEARBY_MAX_LIMIT = 500
+
+# /stores/search 결과 개수 기본값/최대값
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+
+# 테이블 생성 + 기존 DB에 새 인덱스/제약 반영
+Base.metadata.create_all(engine)
+migrations.migrate(engine)
+spatial.ensure_spatial_index(engine)
+ensure_category_index(engine)
+clusters.ensure_cluster_index(engine)
+search_index.ensure_search_index(engine)
 
-# 카카오 API 키 불러오기
-KAKAO_API_KEY = os.environ.get("KAKAO_API_KEY")
-
-# 최소 점수 기준
-MIN_SCORE = 50
+# 요청 계측 + GET /metrics (SLOW_REQUEST_LOG_MS로 느린 요청 로그)
+metrics.init_app(app)
 
-# 테이블 생성
-Base.metadata.create_all(engine)
+# JSON/마커 응답 압축 (Accept-Encoding: br, gzip)
+@app.after_request
+def compress(response):
+    return compress_response(response, request.accept_encodings)
 
-# Context manager로 세션 안전하게 관리
+# Context manager로 읽기 전용 세션 관리 (쓰기는 write_queue.run/submit)
 @contextmanager
 def get_session():
-    session = Session()
+    session = ReadSession()
     try:
         yield session
     finally:
         session.close()
 
-# Helper 함수
-def add_or_get_category(session, cat_name):
-    category = session.query(Category).filter_by(code=cat_name).first()  # code 기준 조회
-    if not category:
-        category = Category(code=cat_name, name=cat_name)
-        session.add(category)
-        session.flush()
-    return category
-
-def add_or_get_cert_type(session, category):
-    cert_type = session.query(CertificationType).filter_by(code=category.code).first()
-    if not cert_type:
-        cert_type = CertificationType(
-            code=category.code,
-            name=category.name,
-            category_code=category.code
-        )
-        session.add(cert_type)
-        session.flush()
-    return cert_type
-
-def link_certification(session, store, cert_type):
-    exists = session.query(Certification).filter_by(
-        store_id=store.id, cert_type_id=cert_type.id
-    ).first()
-    if not exists:
-        session.add(Certification(store_id=store.id, cert_type_id=cert_type.id))
-
-def geocode_address(address):
-    # 주소를 좌표(lat, lon)로 변환
-    if not address:
-        return None, None
-    try:
-        url = "https://dapi.kakao.com/v2/local/search/address.json"
-        headers = {"Authorization": f"KakaoAK {KAKAO_API_KEY}"}
-        params = {"query": address}
-        resp = requests.get(url, headers=headers, params=params, timeout=10)
-        resp.raise_for_status()
-        docs = resp.json().get("documents", [])
-        if docs:
-            return float(docs[0]["y"]), float(docs[0]["x"])  # (lat, lon)
-    except Exception as e:
-        print(f"[Geocoding Error] {address}: {e}")
-    return None, None
-
 # Store -> dict 변환
 def store_to_dict(store, include_details=False, include_cardnews=False):
     data = {
@@ -118,200 +129,264 @@ def store_to_dict(store, include_details=False, include_cardnews=False):
 
     return data
 
-# AI 서버에서 데이터 가져오기
-def fetch_and_store_ai_data():
+def fetch_ai_batch_id():
+    # AI 서버가 꺼져 있거나 batch_id를 모르면 None (-> 항상 새로 받음)
     try:
-        resp = requests.get(AI_SERVER_URL, timeout=5)
+        with metrics.track_outbound("ai_server") as call:
+            resp = requests.get(AI_BATCH_ID_URL, timeout=5)
+            call["status"] = resp.status_code
         resp.raise_for_status()
-        data_list = resp.json()
+        return resp.json().get("batch_id")
+    except (requests.RequestException, ValueError) as e:
+        print(f"[Warning] AI batch id fetch failed: {e}")
+        return None
+
+# AI 서버에서 데이터 가져오기
+# ndjson 스트림으로 받아서 가게 결과가 도착하는 대로 저장 (전체 배치를 기다리지 않음)
+# 이미 받은 배치(manifest의 batch id가 같음)면 건너뜀. 실패 없이 끝까지 받은 경우에만 manifest 기록
+# 결과는 AI_INGEST_BATCH_SIZE건(또는 AI_INGEST_FLUSH_SECONDS)씩 모아 ingest_service에 넘기고 다음 줄을 읽음
+def fetch_and_store_ai_data(force=False, progress=None):
+    report = progress or (lambda item, state: None)
+    batch_id = fetch_ai_batch_id()
+    if batch_id and not force:
+        with get_session() as session:
+            if manifest.is_unchanged(session, AI_BATCH_SOURCE, batch_id):
+                print(f"[AI] batch {batch_id[:12]} already ingested, skipped")
+                report(AI_BATCH_SOURCE, "skipped")
+                return
+
+    report(AI_BATCH_SOURCE, "loading")
+    pending = []  # [(결과 리스트, Future)]
+    buffer = []
+    buffered_at = None
+    received = 0
+    count = 0
+    failed = 0
+    completed = False
+    try:
+        # 스트림은 응답 헤더가 올 때까지(첫 결과 준비)만 외부 호출 시간으로 잰다
+        with metrics.track_outbound("ai_server_stream") as call:
+            resp = requests.get(
+                AI_SERVER_URL, params={"stream": "ndjson"}, stream=True,
+                timeout=(5, AI_STREAM_READ_TIMEOUT)
+            )
+            call["status"] = resp.status_code
+        with resp:
+            resp.raise_for_status()
+            for line in resp.iter_lines():
+                if not line:
+                    continue
+                try:
+                    data = json.loads(line)
+                except ValueError:
+                    print(f"[Warning] Invalid AI record: {line[:200]!r}")
+                    failed += 1
+                    continue
+                if "error" in data:
+                    # 추론 실패 결과는 저장하지 않음 (기존 AI 점수를 0으로 덮어쓰지 않도록)
+                    print(f"[Warning] AI inference failed for {data.get('store_name')}: {data['error']}")
+                    failed += 1
+                    continue
+                buffer.append(data)
+                received += 1
+                buffered_at = buffered_at or time.monotonic()
+                if len(buffer) >= AI_INGEST_BATCH_SIZE or time.monotonic() - buffered_at >= AI_INGEST_FLUSH_SECONDS:
+                    pending.append((buffer, ingest_service.submit(buffer)))
+                    buffer, buffered_at = [], None
+                report(AI_BATCH_SOURCE, f"loading ({received})")
+        completed = True
     except Exception as e:
         print(f"[Error] AI data fetch failed: {e}")
-        return
-
-    with get_session() as session:
-        for data in data_list:
-            store_name = data.get("store_name")
-            address = data.get("address", "")
-            categories = data.get("categories", [])
-            add_score = data.get("positive_news_count", 0) * 25 + data.get("positive_sns_count", 0) * 10
-
-            # cardnews dict/list 대응
-            cardnews_data = data.get("cardnews", [])
-            if isinstance(cardnews_data, dict):
-                cardnews_list = [cardnews_data]
-            elif isinstance(cardnews_data, list):
-                cardnews_list = cardnews_data
+    if buffer:
+        pending.append((buffer, ingest_service.submit(buffer)))
+    # 스트림이 중간에 끊겨도 이미 넘긴 결과는 저장되므로 끝까지 기다려서 센다
+    for items, future in pending:
+        try:
+            errors = future.result()
+        except Exception as e:
+            # 한 묶음이 실패해도 나머지 묶음 결과와 실패 보고, 좌표 워커 알림은 계속
+            errors = [str(e)] * len(items)
+        for data, error in zip(items, errors):
+            if error:
+                print(f"[Warning] AI record not stored for {data.get('store_name')}: {error}")
+                failed += 1
             else:
-                cardnews_list = []
-
-            # 주소 기준 조회
-            store = session.query(Store).filter_by(address=address).first()
-            if not store and add_score >= MIN_SCORE:
-                # 여기서 좌표 채우기
-                lat, lon = geocode_address(address)
-
-                store = Store(
-                    name=store_name,
-                    address=address,
-                    lat=lat,
-                    lon=lon,
-                    score=add_score,
-                    created_at=datetime.datetime.utcnow()
-                )
-                session.add(store)
-                session.flush()
-            elif store:
-                store.score += add_score
-                # 기존 스토어인데 좌표가 비어 있다면 채워주기
-                if (store.lat is None or store.lon is None) and address:
-                    lat, lon = geocode_address(address)
-                    store.lat, store.lon = lat, lon
-
-            if store:
-                for cat_name in categories:
-                    category = add_or_get_category(session, cat_name)
-                    cert_type = add_or_get_cert_type(session, category)
-                    link_certification(session, store, cert_type)
-
-                for cn in cardnews_list:
-                    new_card = CardNews(
-                        store_id=store.id,
-                        title=cn.get("title", ""),
-                        summary=cn.get("summary", ""),
-                        created_at=datetime.datetime.utcnow(),
-                    )
-                    session.add(new_card)
-
-        session.commit()
+                count += 1
+    if completed and batch_id and not failed:
+        try:
+            write_queue.run(lambda session: manifest.record(session, AI_BATCH_SOURCE, batch_id))
+        except SQLAlchemyError as e:
+            print(f"[Error] AI batch manifest not recorded: {e}")
+            completed = False
+    geocode_worker.notify()
+    report(AI_BATCH_SOURCE, "loaded" if completed and not failed else "failed")
+    print(f"[AI] {count} records ingested, {failed} failed")
+
+# 초기 CSV/JSON 로딩 (변경된 파일만). 새 가게 좌표는 워커가 채움
+# 적재는 낮은 우선순위 자식 프로세스에서 (load_data.main_in_subprocess): 적재 중에도 GET 응답 시간 유지
+def load_sources(progress):
+    changed = load_data.main_in_subprocess(progress=progress)
+    # 실패해도 앞 청크들은 commit됐을 수 있으므로 항상 무효화
+    response_cache.invalidate()
+    if changed:
+        geocode_worker.notify()
+
+# 시작 시 데이터 적재: 서버는 기존 DB로 바로 응답하고, 적재는 백그라운드에서 진행
+ingest = BackgroundIngest([
+    ("sources", load_sources),
+    ("ai", lambda progress: fetch_and_store_ai_data(progress=progress)),  # AI 서버에서 데이터 가져와 DB 저장
+])
+
+# 준비 상태: 서버가 응답 중이면 항상 200, 백그라운드 적재/지오코딩 진행 상황을 함께 보여줌
+@app.route('/ready', methods=['GET'])
+def ready():
+    status = ingest.status()
+    return jsonify({
+        "ready": True,
+        "ingest_complete": status["state"] == "done",
+        "ingest": status,
+        "geocoding": geocode_worker.status(),
+        "writer": write_queue.status(),
+    })
+
+# 좌표 채우기 워커 상태 (backlog: 주소는 있는데 좌표가 없는 가게 수)
+@app.route('/geocoding/status', methods=['GET'])
+def geocoding_status():
+    return jsonify(geocode_worker.status())
 
 # AI 서버에서 처리 결과 받기
 @app.route('/stores/process', methods=['POST'])
 def process_store_result():
-    # 원본 body 그대로 찍기
-    print("=== [DEBUG] Raw request data ===")
-    print(request.data.decode("utf-8"))
-
     data = request.get_json()
     if not data:
         return jsonify({"error": "No data received"}), 400
-    
-    # 파싱된 값들 확인
-    print("=== [DEBUG] Parsed JSON ===")
-    print(json.dumps(data, indent=2, ensure_ascii=False))
-
-    store_name = data.get("store_name")
-    address = data.get("address", "")
-    categories = data.get("categories", [])
-    add_score = data.get("positive_news_count", 0) * 25 + data.get("positive_sns_count", 0) * 10
-
-    # cardnews dict/list 대응
-    cardnews_data = data.get("cardnews", [])
-    if isinstance(cardnews_data, dict):
-        cardnews_list = [cardnews_data]
-    elif isinstance(cardnews_data, list):
-        cardnews_list = cardnews_data
-    else:
-        cardnews_list = []
 
-    with get_session() as session:
-        # 주소 기준으로 store 조회
-        store = session.query(Store).filter_by(address=address).first()
-
-        # store가 없고 점수가 기준 이상이면 새로 생성
-        if not store and add_score >= MIN_SCORE:
-            # 좌표 변환 추가
-            lat, lon = geocode_address(address)
-
-            store = Store(
-                name=store_name,
-                address=address,
-                lat=lat,
-                lon=lon,
-                score=add_score,
-                created_at=datetime.datetime.utcnow()
-            )
-            session.add(store)
-            session.flush()  # store.id를 사용하려면 flush 필요
-        elif store:
-            store.score += add_score
-            # 기존 store인데 좌표가 없으면 채워주기
-            if (store.lat is None or store.lon is None) and address:
-                lat, lon = geocode_address(address)
-                store.lat, store.lon = lat, lon
-
-        # store가 생성되거나 이미 존재하는 경우에만 연결
-        if store:
-            # certification 처리
-            for cat_name in categories:
-                category = add_or_get_category(session, cat_name)
-                cert_type = add_or_get_cert_type(session, category)
-                link_certification(session, store, cert_type)
-
-            # 카드뉴스 처리
-            for cn in cardnews_list:
-                new_card = CardNews(
-                    store_id=store.id,
-                    title=cn.get("title", ""),
-                    summary=cn.get("summary", ""),
-                    created_at=datetime.datetime.utcnow(),
-                )
-                session.add(new_card)
-
-        session.commit()
-    return jsonify({"status": "ok", "store": store_name}), 200
+    error, = ingest_service.ingest([data])
+    if error:
+        return jsonify({"error": error}), 500
+    geocode_worker.notify()
+    return jsonify({"status": "ok", "store": data.get("store_name")}), 200
+
+# AI 서버에서 처리 결과 여러 건 받기 (ingest_service: 쓰기 작업 하나, 배치 단위 쿼리)
+# body: 결과 리스트. 실패한 건만 건별 savepoint로 골라내고 나머지는 저장
+@app.route('/stores/process/batch', methods=['POST'])
+def process_store_results_batch():
+    data_list = request.get_json(silent=True)
+    if not isinstance(data_list, list) or not data_list:
+        return jsonify({"error": "결과 리스트가 필요합니다"}), 400
+    if len(data_list) > PROCESS_BATCH_MAX_ITEMS:
+        return jsonify({"error": f"한 번에 최대 {PROCESS_BATCH_MAX_ITEMS}건까지 보낼 수 있습니다"}), 413
+
+    failed = []
+    valid = []
+    for index, data in enumerate(data_list):
+        if not isinstance(data, dict) or "error" in data:
+            failed.append({"index": index, "error": "invalid record"})
+        else:
+            valid.append((index, data))
+    errors = ingest_service.ingest([data for _, data in valid]) if valid else []
+    failed.extend({"index": index, "error": error} for (index, _), error in zip(valid, errors) if error)
+    failed.sort(key=lambda item: item["index"])
+    ingested = len(valid) - sum(1 for error in errors if error)
+    geocode_worker.notify()
+    return jsonify({"status": "ok", "ingested": ingested, "failed": failed}), 200
 
 # 모든 스토어 조회
+# ?categories=a,b 필터, ?match=all 이면 모든 카테고리를 가진 가게만 (기본은 하나라도)
+# ?limit=&cursor= 페이지네이션, ?stream=json|ndjson 스트리밍 (pagination.py)
+# ?format=columns|binary (또는 Accept 헤더) 지도 마커용 압축 표현 (marker_format.py)
 @app.route('/stores', methods=['GET'])
+@cached(
+    response_cache,
+    vary=lambda: marker_format.negotiate(request.args, request.accept_mimetypes),
+    vary_headers=("Accept",),
+)
 def get_stores():
-    category_filter = request.args.get('categories')
-    with get_session() as session:
+    category_codes = parse_categories(request.args.get('categories'))
+    match = request.args.get('match', 'any')
+    if match not in ('any', 'all'):
+        return jsonify({"error": "match는 any 또는 all 이어야 합니다"}), 400
+    try:
+        fmt = marker_format.negotiate(request.args, request.accept_mimetypes)
+    except marker_format.FormatError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if fmt != "json":
+        # 지도 마커용 압축 표현: 전체 목록을 한 번에 (id/lat/lon/score/category_mask 열)
+        if any(key in request.args for key in ("limit", "cursor", "stream")):
+            return jsonify({"error": "format=columns/binary는 limit, cursor, stream을 지원하지 않습니다"}), 400
+
+        def store_filter(stmt):
+            return filter_by_categories(stmt.where(Store.score >= MIN_SCORE), category_codes, match)
+
+        with get_session() as session:
+            markers = marker_format.load_markers(session, store_filter)
+        if fmt == "columns":
+            return app.response_class(marker_format.encode_columns(*markers), mimetype=marker_format.COLUMNS_MIMETYPE)
+        return app.response_class(marker_format.encode_binary(*markers), mimetype=marker_format.BINARY_MIMETYPE)
+
+    def build_query(session):
         query = session.query(Store).options(
-            joinedload(Store.certifications).joinedload(Certification.cert_type),
-            joinedload(Store.cardnews)
+            selectinload(Store.category_links),
+            selectinload(Store.cardnews)
         ).filter(Store.score >= MIN_SCORE)
+        return filter_by_categories(query, category_codes, match)
 
-        if category_filter:
-            query = query.join(Store.certifications).join(Certification.cert_type).filter(
-                CertificationType.category_code == category_filter
-            ).distinct()
+    def serialize(stores):
+        return [store_to_dict(s, include_cardnews=True) for s in stores]
 
-        stores = query.all()
-        return jsonify([store_to_dict(s, include_cardnews=True) for s in stores])
+    return list_response(get_session, build_query, Store.id, serialize, request.args)
 
-# 가게명 검색
+# 가게명/주소 검색 (FTS5 trigram 인덱스, 관련도 순)
 @app.route("/stores/search", methods=["GET"])
+@cached(response_cache)
 def search_stores_by_name():
     search_query = request.args.get("q", "").strip()
     if not search_query:
         return jsonify([])
+    try:
+        limit = min(int(request.args.get("limit", SEARCH_DEFAULT_LIMIT)), SEARCH_MAX_LIMIT)
+    except ValueError:
+        return jsonify({"error": "limit는 숫자여야 합니다"}), 400
+    if limit <= 0:
+        return jsonify({"error": "limit는 0보다 커야 합니다"}), 400
     with get_session() as session:
+        store_ids = search_index.search_store_ids(session, search_query, limit, MIN_SCORE)
+        if not store_ids:
+            return jsonify([])
         stores = session.query(Store).options(
-            joinedload(Store.certifications).joinedload(Certification.cert_type),
-            joinedload(Store.cardnews)
-        ).filter(
-            Store.score >= MIN_SCORE,
-            Store.name.ilike(f"%{search_query}%")
-        ).all()
-        return jsonify([store_to_dict(s, include_cardnews=True) for s in stores])
+            selectinload(Store.category_links),
+            selectinload(Store.cardnews)
+        ).filter(Store.id.in_(store_ids)).all()
+        by_id = {s.id: s for s in stores}
+        return jsonify([store_to_dict(by_id[i], include_cardnews=True) for i in store_ids if i in by_id])
 
 # 특정 스토어 상세 조회
 @app.route('/stores/<int:store_id>', methods=['GET'])
+@cached(response_cache)
 def get_store_detail(store_id):
     with get_session() as session:
         store = session.query(Store).options(
             joinedload(Store.certifications).joinedload(Certification.cert_type),
-            joinedload(Store.cardnews)
+            selectinload(Store.category_links),
+            selectinload(Store.cardnews)
         ).filter(Store.id == store_id).first()
         if not store:
             abort(404, description="Store not found")
         return jsonify(store_to_dict(store, include_details=True, include_cardnews=True))
 
-# 모든 카드뉴스 리스트 조회
+# 모든 카드뉴스 리스트 조회 (?limit=&cursor=, ?stream=json|ndjson 지원)
 @app.route('/cardnews', methods=['GET'])
+@cached(response_cache)
 def get_cardnews():
-    with get_session() as session:
-        cards = session.query(CardNews).all()
-        result = [
+    def build_query(session):
+        # store는 JOIN으로, store 카테고리는 IN 쿼리 한 번으로 -> 카드 수와 무관하게 쿼리 2개
+        return session.query(CardNews).options(
+            joinedload(CardNews.store).selectinload(Store.category_links)
+        )
+
+    def serialize(cards):
+        return [
             {
                 "store_id": card.store_id,
                 "store_name": card.store.name if card.store else "",
@@ -322,9 +397,34 @@ def get_cardnews():
             }
             for card in cards
         ]
-        return jsonify(result)
-    
-# 반경 N km 내 가게 불러오기 (안전 강화 버전)
+
+    return list_response(get_session, build_query, CardNews.id, serialize, request.args)
+
+# 지도 화면(bbox)용 마커 클러스터: 줌 레벨별로 미리 집계된 셀을 읽음
+# 최대 클러스터 줌보다 확대하면 개별 가게 (너무 많으면 최대 줌 클러스터)
+@app.route("/stores/clusters")
+@cached(response_cache)
+def get_store_clusters():
+    try:
+        west, south, east, north = clusters.parse_bbox(request.args.get("bbox"))
+        zoom = int(request.args.get("zoom", ""))
+    except ValueError as e:
+        return jsonify({"error": f"bbox(west,south,east,north), zoom 파라미터가 올바르지 않습니다: {e}"}), 400
+
+    with get_session() as session:
+        if zoom > clusters.MAX_CLUSTER_ZOOM:
+            points = clusters.query_points(session, west, south, east, north)
+            if points is not None:
+                return jsonify({"zoom": zoom, "clusters": points})
+            zoom = clusters.MAX_CLUSTER_ZOOM
+        zoom = max(clusters.MIN_CLUSTER_ZOOM, zoom)
+        try:
+            items = clusters.query_clusters(session, zoom, west, south, east, north)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+    return jsonify({"zoom": zoom, "clusters": items})
+
+# 반경 N km 내 가게 불러오기 (R*Tree bounding box 후보 -> 하버사인 거리 정렬)
 @app.route("/stores/nearby")
 def get_nearby_stores():
     try:
@@ -332,44 +432,58 @@ def get_nearby_stores():
         lat_str = request.args.get("lat")
         lon_str = request.args.get("lon")
         radius_str = request.args.get("radius", "2")
+        limit_str = request.args.get("limit", str(NEARBY_DEFAULT_LIMIT))
+        min_score_str = request.args.get("min_score")
+        category = request.args.get("category")
 
         # 필수 값 체크
         if lat_str is None or lon_str is None:
             return jsonify({"error": "lat, lon 파라미터 필요"}), 400
 
-        # float 변환
+        # 숫자 변환
         try:
             lat = float(lat_str)
             lon = float(lon_str)
             radius = float(radius_str)
+            limit = int(limit_str)
+            min_score = int(min_score_str) if min_score_str is not None else None
         except ValueError:
-            return jsonify({"error": "lat, lon, radius는 숫자여야 합니다"}), 400
-
-        # SQL 실행
-        query = text("""
-            SELECT id, name, lat, lon,
-                   (6371 * acos(
-                       cos(radians(:lat)) * cos(radians(lat)) *
-                       cos(radians(lon) - radians(:lon)) +
-                       sin(radians(:lat)) * sin(radians(lat))
-                   )) AS distance
-            FROM store
-            HAVING distance < :radius
-            ORDER BY distance
-        """)
-
-        with Session() as session:
-            result = session.execute(query, {"lat": lat, "lon": lon, "radius": radius})
-            stores = [dict(row._mapping) for row in result]
+            return jsonify({"error": "lat, lon, radius, limit, min_score는 숫자여야 합니다"}), 400
+        if radius <= 0 or limit <= 0:
+            return jsonify({"error": "radius, limit는 0보다 커야 합니다"}), 400
+        limit = min(limit, NEARBY_MAX_LIMIT)
+
+        with get_session() as session:
+            query = spatial.nearby_query(
+                session, lat, lon, radius,
+                Store.id, Store.name, Store.lat, Store.lon, Store.score
+            )
+            if min_score is not None:
+                query = query.filter(Store.score >= min_score)
+            if category:
+                query = filter_by_categories(query, [category])
+            ranked = spatial.rank_by_distance(query.all(), lat, lon, radius, limit)
 
+        stores = [
+            {
+                "id": row.id,
+                "name": row.name,
+                "lat": row.lat,
+                "lon": row.lon,
+                "score": row.score,
+                "distance": round(distance, 3),
+            }
+            for distance, row in ranked
+        ]
         return jsonify(stores)
 
     except Exception as e:
-        # 여기서 query_str 관련 에러가 나더라도 잡힘
         return jsonify({"error": str(e)}), 500
 
 # 서버 시작
 if __name__ == '__main__':
-    load_data.main()          # 초기 CSV/JSON 로딩
-    fetch_and_store_ai_data() # AI 서버에서 데이터 가져와 DB 저장
+    # debug 리로더는 감시용 부모 프로세스에서도 이 블록을 실행하므로, 실제 서버 프로세스에서만 적재
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        ingest.start()
+        geocode_worker.start()
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
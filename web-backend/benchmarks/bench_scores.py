@@ -0,0 +1,84 @@
+# bench_scores.py
+# 점수 전체 재계산 벤치마크: 기존 N+1 방식 vs scoring.recompute_scores (집계 한 문장)
+# 사용법: python benchmarks/bench_scores.py --sizes 10000 100000
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from models import Base, Store, Certification, CertificationType, AIContribution  # noqa: E402
+from scoring import recompute_scores, ai_score  # noqa: E402
+
+
+def build_db(path, n_stores, seed=0):
+    rng = random.Random(seed)
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(CertificationType), [
+            {"id": i, "code": f"cert_{i}", "name": f"cert_{i}"} for i in range(1, 5)
+        ])
+        conn.execute(insert(Store), [
+            {"id": i, "name": f"store_{i}", "address": f"addr_{i}", "score": 0} for i in range(1, n_stores + 1)
+        ])
+        certs = []
+        for store_id in range(1, n_stores + 1):
+            for cert_type_id in rng.sample(range(1, 5), rng.randint(0, 3)):
+                certs.append({"store_id": store_id, "cert_type_id": cert_type_id})
+        conn.execute(insert(Certification), certs)
+        ai = []
+        for store_id in rng.sample(range(1, n_stores + 1), n_stores // 10):
+            news, sns = rng.randint(0, 5), rng.randint(0, 10)
+            ai.append({"store_id": store_id, "source": "ai_overview", "positive_news_count": news,
+                       "positive_sns_count": sns, "score": ai_score(news, sns)})
+        conn.execute(insert(AIContribution), ai)
+    return engine
+
+
+def legacy_update_store_scores(session):
+    # 변경 전 load_data.update_store_scores (store마다 COUNT 쿼리)
+    for store in session.query(Store).all():
+        cert_count = session.query(Certification).filter_by(store_id=store.id).count()
+        store.score = (cert_count or 0) * 50
+    session.commit()
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="store 점수 재계산 벤치마크")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--legacy-max", type=int, default=10000, help="N+1 방식은 이 크기 이하에서만 측정")
+    args = parser.parse_args()
+
+    for n in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = build_db(os.path.join(tmp, "bench.db"), n)
+            Session = sessionmaker(bind=engine)
+            results = {}
+            if n <= args.legacy_max:
+                with Session() as session:
+                    results["legacy_n_plus_1"] = timed(lambda: legacy_update_store_scores(session))
+            with Session() as session:
+                results["full_recompute"] = timed(lambda: (recompute_scores(session), session.commit()))
+            with Session() as session:
+                results["full_recompute_noop"] = timed(lambda: (recompute_scores(session), session.commit()))
+            with Session() as session:
+                ids = random.Random(1).sample(range(1, n + 1), 100)
+                results["incremental_100"] = timed(lambda: (recompute_scores(session, ids), session.commit()))
+            engine.dispose()
+        print(f"stores={n}: " + ", ".join(f"{k}={v * 1000:.1f}ms" for k, v in results.items()))
+
+
+if __name__ == "__main__":
+    main()
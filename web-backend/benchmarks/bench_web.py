@@ -0,0 +1,436 @@
+# bench_web.py
+# 웹 백엔드 부하 벤치마크
+# - 규모별(--sizes) 합성 DB를 만들고 (synth_data.py, --cache-dir에 재사용)
+#   별도 프로세스로 띄운 Flask 서버에 스레드 부하 생성기로 엔드포인트별 요청을 보낸다
+# - 엔드포인트별 p50/p95/p99 지연, 처리량, 서버 프로세스 최대 RSS
+#   + load_data.main 적재 시간/최대 RSS (같은 규모의 합성 CSV/JSON 소스)
+# - 결과는 JSON으로 저장 (커밋/실행 환경 포함), --compare로 이전 결과와 비교
+# 사용법: python benchmarks/bench_web.py --sizes 10000 100000 [--requests 200] [--concurrency 8]
+#         [--endpoints search nearby] [--compare benchmarks/results/old.json]
+import os
+import sys
+import json
+import math
+import time
+import random
+import socket
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+import sqlite3
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+WEB_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, WEB_DIR)
+
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "store_bench")
+SERVER_START_TIMEOUT = 120
+RSS_SAMPLE_INTERVAL = 0.02
+
+
+# ---------- 시나리오 ----------
+
+def _cursor(store_id):
+    from pagination import encode_cursor
+    return encode_cursor(store_id)
+
+
+def _district(rng):
+    from synth_data import DISTRICTS
+    return rng.choice(DISTRICTS)
+
+
+def _search_term(rng):
+    from synth_data import PREFIXES, BUSINESSES, DISTRICTS
+    choice = rng.random()
+    if choice < 0.4:
+        return rng.choice(PREFIXES) + rng.choice(BUSINESSES)[1]
+    if choice < 0.7:
+        return rng.choice(rng.choice(DISTRICTS)[4])
+    if choice < 0.9:
+        return rng.choice(BUSINESSES)[1][:2]  # 3글자 미만 (LIKE 경로)
+    return f"{rng.choice(PREFIXES)} {rng.choice(BUSINESSES)[1]}"
+
+
+def _nearby(rng, n):
+    _, _, lat, lon, _ = _district(rng)
+    return (f"/stores/nearby?lat={lat + rng.uniform(-0.02, 0.02):.5f}&lon={lon + rng.uniform(-0.02, 0.02):.5f}"
+            f"&radius={rng.choice([0.5, 1, 2, 5])}")
+
+
+def _clusters(rng, n):
+    _, _, lat, lon, _ = _district(rng)
+    zoom = rng.randint(10, 14)
+    half = 360.0 / (1 << zoom) * 2  # 대략 화면 4x3 타일
+    return f"/stores/clusters?bbox={lon - half:.5f},{lat - half * 0.75:.5f},{lon + half:.5f},{lat + half * 0.75:.5f}&zoom={zoom}"
+
+
+# (이름, 경로 생성 함수(rng, 가게 수), 요청 수 상한, 이 규모 이하에서만 실행)
+SCENARIOS = [
+    ("stores_page", lambda rng, n: f"/stores?limit=100&cursor={_cursor(rng.randint(0, n))}", None, None),
+    ("stores_markers", lambda rng, n: "/stores?format=binary", 20, None),
+    ("stores_full", lambda rng, n: "/stores", 5, 100000),
+    ("search", lambda rng, n: f"/stores/search?q={_search_term(rng)}", None, None),
+    ("nearby", _nearby, None, None),
+    ("cardnews_page", lambda rng, n: f"/cardnews?limit=50&cursor={_cursor(rng.randint(0, n // 5))}", None, None),
+    ("clusters", _clusters, None, None),
+]
+SCENARIO_NAMES = [name for name, *_ in SCENARIOS]
+
+
+# ---------- 측정 도구 ----------
+
+def read_rss_kb(pid):
+    # /proc이 없는 환경(macOS 등)에서는 None
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+class RssSampler:
+    """pid의 RSS를 주기적으로 읽어 구간 최대값을 기록."""
+
+    def __init__(self, pid, interval=RSS_SAMPLE_INTERVAL):
+        self.pid = pid
+        self.interval = interval
+        self.peak_kb = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            rss = read_rss_kb(self.pid)
+            if rss is not None:
+                self.peak_kb = max(self.peak_kb or 0, rss)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    @property
+    def peak_mb(self):
+        return None if self.peak_kb is None else round(self.peak_kb / 1024, 1)
+
+
+def percentile(sorted_values, p):
+    # nearest-rank
+    if not sorted_values:
+        return None
+    index = max(0, math.ceil(p / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def summarize(latencies, sizes, errors, elapsed, concurrency, peak_mb):
+    latencies = sorted(latencies)
+    ms = lambda v: None if v is None else round(v * 1000, 2)  # noqa: E731
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "concurrency": concurrency,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "mean_ms": ms(sum(latencies) / len(latencies)) if latencies else None,
+        "max_ms": ms(latencies[-1]) if latencies else None,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed > 0 else None,
+        "bytes_mean": round(sum(sizes) / len(sizes)) if sizes else None,
+        "peak_rss_mb": peak_mb,
+    }
+
+
+# ---------- 서버 ----------
+
+def serve(db_path, port, response_cache):
+    # --serve 모드: 합성 DB에 붙은 app을 threaded WSGI 서버로 띄운다 (자식 프로세스)
+    import logging
+    from werkzeug.serving import make_server
+
+    if not response_cache:
+        os.environ["RESPONSE_CACHE_MAX_ENTRIES"] = "0"
+    # app import 시 create_all/마이그레이션이 기본 DB(web-backend/database.db)가 아니라 합성 DB에서 돌도록
+    os.environ["DATABASE_PATH"] = db_path
+    import app as web_app
+    import db
+    import spatial
+    import clusters
+    import migrations
+    import search_index
+    from category_index import ensure_category_index
+    from models import Base
+
+    engine, _ = db.bind(db_path)
+    Base.metadata.create_all(engine)
+    migrations.migrate(engine)
+    spatial.ensure_spatial_index(engine)
+    ensure_category_index(engine)
+    clusters.ensure_cluster_index(engine)
+    search_index.ensure_search_index(engine)
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", port, web_app.app, threaded=True)
+    server.serve_forever()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(db_path, response_cache):
+    port = free_port()
+    cmd = [sys.executable, os.path.abspath(__file__), "--serve", db_path, str(port)]
+    if response_cache:
+        cmd.append("--response-cache")
+    proc = subprocess.Popen(cmd, cwd=WEB_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    base_url = f"http://127.0.0.1:{port}"
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"benchmark server exited with {proc.returncode}")
+        try:
+            if requests.get(base_url + "/ready", timeout=1).status_code == 200:
+                return proc, base_url
+        except requests.RequestException:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("benchmark server did not start in time")
+
+
+# ---------- 부하 생성 ----------
+
+def run_scenario(base_url, pid, make_path, n_stores, total, concurrency, seed, warmup=5):
+    rng = random.Random(seed)
+    paths = [make_path(rng, n_stores) for _ in range(total + warmup)]
+    local = threading.local()
+
+    def session():
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        return local.session
+
+    def fetch(path):
+        started = time.perf_counter()
+        try:
+            resp = session().get(base_url + path, timeout=300)
+            body = resp.content
+            ok = resp.status_code < 400
+        except requests.RequestException:
+            return None, 0, False
+        return time.perf_counter() - started, len(body), ok
+
+    with ThreadPoolExecutor(max_workers=min(concurrency, warmup)) as pool:
+        list(pool.map(fetch, paths[:warmup]))
+
+    latencies, sizes, errors = [], [], 0
+    with RssSampler(pid) as sampler, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        started = time.perf_counter()
+        for latency, size, ok in pool.map(fetch, paths[warmup:]):
+            if ok:
+                latencies.append(latency)
+                sizes.append(size)
+            else:
+                errors += 1
+        elapsed = time.perf_counter() - started
+    return summarize(latencies, sizes, errors, elapsed, concurrency, sampler.peak_mb)
+
+
+def bench_load_data(n_stores, seed, work_dir):
+    # 같은 규모의 합성 소스 파일을 load_data.main(force=True)로 빈 DB에 적재 (자식 프로세스)
+    from synth_data import write_sources
+
+    sources_dir = os.path.join(work_dir, f"sources_{n_stores}")
+    write_sources(sources_dir, n_stores, seed)
+    script = (
+        "import sys, time, json; sys.path.insert(0, sys.argv[1]); import load_data; "
+        "load_data.DATA_DIR = sys.argv[2]; t = time.perf_counter(); load_data.main(force=True); "
+        "print(json.dumps({'seconds': time.perf_counter() - t}))"
+    )
+    # load_data는 DATABASE_PATH(없으면 web-backend/database.db)에 적재하므로 빈 임시 디렉터리의 DB를 지정
+    with tempfile.TemporaryDirectory(prefix="load_data_", dir=work_dir) as run_dir:
+        env = {
+            **os.environ,
+            "KAKAO_API_KEY": "",  # 외부 지오코딩 호출 없이 적재 자체만 측정
+            "DATABASE_PATH": os.path.join(run_dir, "database.db"),
+        }
+        started = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, "-c", script, WEB_DIR, sources_dir],
+            cwd=run_dir, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+        )
+        with RssSampler(proc.pid) as sampler:
+            out, _ = proc.communicate()
+        wall = time.perf_counter() - started
+        if proc.returncode != 0:
+            return {"error": f"exit {proc.returncode}"}
+        with sqlite3.connect(os.path.join(run_dir, "database.db")) as conn:
+            stores = conn.execute("SELECT COUNT(*) FROM stores").fetchone()[0]
+    result = json.loads(out.strip().splitlines()[-1])
+    return {
+        "seconds": round(result["seconds"], 3),
+        "wall_seconds": round(wall, 3),  # 프로세스 시작/모듈 로딩 포함
+        "stores": stores,
+        "stores_per_second": round(stores / result["seconds"], 1) if result["seconds"] else None,
+        "peak_rss_mb": sampler.peak_mb,
+    }
+
+
+# ---------- 결과 ----------
+
+def git_revision():
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=WEB_DIR, text=True).strip()
+        dirty = bool(subprocess.check_output(["git", "status", "--porcelain", "--", "."], cwd=WEB_DIR, text=True).strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def print_table(size, result):
+    print(f"\n== {size} stores ==")
+    print(f"{'endpoint':16s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s} {'req/s':>9s} {'bytes':>10s} {'rss MB':>8s} {'err':>4s}")
+    for name, r in result["endpoints"].items():
+        if "skipped" in r:
+            print(f"{name:16s} skipped: {r['skipped']}")
+            continue
+        print(f"{name:16s} {r['p50_ms']!s:>9s} {r['p95_ms']!s:>9s} {r['p99_ms']!s:>9s} "
+              f"{r['throughput_rps']!s:>9s} {r['bytes_mean']!s:>10s} {r['peak_rss_mb']!s:>8s} {r['errors']:>4d}")
+    if "load_data" in result:
+        print(f"load_data.main   {result['load_data']}")
+
+
+def compare(old, new):
+    # 같은 규모/엔드포인트끼리 p50/p95/처리량 변화율
+    def change(a, b):
+        if a in (None, 0) or b is None:
+            return "n/a"
+        return f"{(b - a) / a * 100:+.1f}%"
+
+    print(f"\n== compare {old['meta'].get('commit', '')[:10]} -> {new['meta'].get('commit', '')[:10]} ==")
+    for size, result in new["results"].items():
+        previous = old["results"].get(size)
+        if not previous:
+            continue
+        for name, r in result["endpoints"].items():
+            p = previous["endpoints"].get(name)
+            if not p or "skipped" in r or "skipped" in p:
+                continue
+            print(f"{size:>8s} {name:16s} p50 {p['p50_ms']} -> {r['p50_ms']} ({change(p['p50_ms'], r['p50_ms'])})  "
+                  f"p95 {change(p['p95_ms'], r['p95_ms'])}  req/s {change(p['throughput_rps'], r['throughput_rps'])}")
+        if "load_data" in result and "seconds" in previous.get("load_data", {}):
+            print(f"{size:>8s} load_data.main   {previous['load_data']['seconds']}s -> {result['load_data'].get('seconds')}s "
+                  f"({change(previous['load_data']['seconds'], result['load_data'].get('seconds'))})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="웹 백엔드 엔드포인트/적재 벤치마크")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000], help="가게 수 (예: 10000 100000 1000000)")
+    parser.add_argument("--requests", type=int, default=200, help="엔드포인트별 요청 수")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--endpoints", nargs="+", choices=SCENARIO_NAMES, default=SCENARIO_NAMES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="합성 DB/소스 파일 보관 위치")
+    parser.add_argument("--rebuild", action="store_true", help="캐시된 합성 DB를 다시 만든다")
+    parser.add_argument("--skip-load-data", action="store_true", help="load_data.main 적재 벤치마크 생략")
+    parser.add_argument("--response-cache", action="store_true", help="응답 캐시를 켠 상태로 측정 (기본은 끔)")
+    parser.add_argument("--output", help="결과 JSON 경로 (기본: benchmarks/results/web_<시각>_<커밋>.json)")
+    parser.add_argument("--compare", help="비교할 이전 결과 JSON")
+    parser.add_argument("--serve", nargs=2, metavar=("DB", "PORT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve[0], int(args.serve[1]), args.response_cache)
+        return
+
+    os.makedirs(args.cache_dir, exist_ok=True)
+    # synth_data -> load_data import 시 create_all/마이그레이션이 도는 DB. 실제 web-backend/database.db는 건드리지 않음
+    os.environ["DATABASE_PATH"] = os.path.join(args.cache_dir, "import_scratch.db")
+    from synth_data import build_db, GENERATOR_VERSION
+
+    commit, dirty = git_revision()
+    report = {
+        "meta": {
+            "commit": commit,
+            "dirty": dirty,
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "response_cache": args.response_cache,
+            "generator_version": GENERATOR_VERSION,
+        },
+        "results": {},
+    }
+
+    for size in args.sizes:
+        db_path = os.path.join(args.cache_dir, f"bench_{size}_s{args.seed}_v{GENERATOR_VERSION}.db")
+        result = {"build_seconds": None, "endpoints": {}}
+        if args.rebuild or not os.path.exists(db_path):
+            print(f"building {size} stores...")
+            started = time.perf_counter()
+            build_db(db_path, size, args.seed)
+            result["build_seconds"] = round(time.perf_counter() - started, 2)
+
+        for name, make_path, max_requests, max_size in SCENARIOS:
+            if name not in args.endpoints:
+                continue
+            if max_size is not None and size > max_size:
+                result["endpoints"][name] = {"skipped": f"only up to {max_size} stores"}
+                continue
+            total = min(args.requests, max_requests) if max_requests else args.requests
+            print(f"  {size} {name} x{total}...", flush=True)
+            # 엔드포인트마다 새 서버 프로세스 -> 최대 RSS가 앞 엔드포인트의 영향을 받지 않음
+            proc, base_url = start_server(db_path, args.response_cache)
+            try:
+                result["endpoints"][name] = run_scenario(
+                    base_url, proc.pid, make_path, size, total, args.concurrency, args.seed,
+                )
+            finally:
+                proc.terminate()
+                proc.wait()
+
+        if not args.skip_load_data:
+            print(f"  {size} load_data.main...", flush=True)
+            result["load_data"] = bench_load_data(size, args.seed, args.cache_dir)
+
+        report["results"][str(size)] = result
+        print_table(size, result)
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"web_{stamp}_{(commit or 'nogit')[:8]}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\nsaved {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
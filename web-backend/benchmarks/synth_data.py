@@ -0,0 +1,226 @@
+# synth_data.py
+# 벤치마크용 합성 데이터 생성기
+# - 실제 시/구 중심 좌표 주변에 가게를 흩뿌리고, 한국어 상호/도로명 주소/전화번호를 만든다
+# - build_db: stores/certifications/ai_contributions/cardnews를 채운 SQLite DB (인덱스/트리거 포함)
+# - write_sources: load_data.SOURCES와 같은 형식의 CSV(cp949)/JSON 파일 (load_data.main 벤치마크용)
+# 같은 (가게 수, seed)면 항상 같은 데이터
+# 사용법: python benchmarks/synth_data.py --stores 100000 --out /tmp/bench_100k.db [--sources-dir /tmp/src]
+import os
+import sys
+import csv
+import json
+import time
+import random
+import argparse
+import datetime
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from models import Base, Store, Certification, CertificationType, AIContribution, CardNews  # noqa: E402
+from load_data import load_categories, load_certification_types  # noqa: E402
+from scoring import recompute_scores, ai_score  # noqa: E402
+import spatial  # noqa: E402
+import clusters  # noqa: E402
+import migrations  # noqa: E402
+import search_index  # noqa: E402
+from category_index import ensure_category_index  # noqa: E402
+
+# 생성 규칙이 바뀌면 올림 (캐시된 벤치마크 DB 구분용)
+GENERATOR_VERSION = 1
+CHUNK_SIZE = 5000
+
+# (시도, 시군구, 중심 위도, 중심 경도, 동 이름들)
+DISTRICTS = [
+    ("서울특별시", "종로구", 37.5735, 126.9790, ["연건동", "혜화동", "명륜동", "창신동"]),
+    ("서울특별시", "중구", 37.5641, 126.9979, ["명동", "을지로동", "신당동", "회현동"]),
+    ("서울특별시", "마포구", 37.5663, 126.9019, ["서교동", "합정동", "망원동", "연남동"]),
+    ("서울특별시", "강남구", 37.5172, 127.0473, ["역삼동", "삼성동", "논현동", "대치동"]),
+    ("서울특별시", "송파구", 37.5145, 127.1059, ["잠실동", "방이동", "가락동", "문정동"]),
+    ("서울특별시", "관악구", 37.4784, 126.9516, ["신림동", "봉천동", "남현동"]),
+    ("부산광역시", "해운대구", 35.1631, 129.1635, ["우동", "중동", "좌동", "송정동"]),
+    ("부산광역시", "부산진구", 35.1628, 129.0532, ["부전동", "전포동", "양정동"]),
+    ("대구광역시", "북구", 35.8858, 128.5828, ["산격동", "복현동", "대현동", "침산동"]),
+    ("대구광역시", "중구", 35.8693, 128.6062, ["동인동", "삼덕동", "대봉동"]),
+    ("인천광역시", "남동구", 37.4473, 126.7314, ["구월동", "간석동", "만수동"]),
+    ("광주광역시", "서구", 35.1520, 126.8903, ["치평동", "화정동", "쌍촌동"]),
+    ("대전광역시", "서구", 36.3553, 127.3838, ["둔산동", "월평동", "탄방동"]),
+    ("경기도", "수원시 팔달구", 37.2826, 127.0198, ["인계동", "매교동", "행궁동"]),
+    ("경기도", "성남시 분당구", 37.3826, 127.1189, ["정자동", "서현동", "야탑동"]),
+    ("전북특별자치도", "전주시 완산구", 35.8122, 127.1198, ["효자동", "중앙동", "서신동"]),
+    ("제주특별자치도", "제주시", 33.4996, 126.5312, ["이도동", "연동", "노형동"]),
+]
+ROADS = ["대학로", "세종대로", "중앙로", "시청로", "문화로", "번영로", "평화로", "공원로", "역전로", "상가로"]
+PREFIXES = ["행복", "우리", "소문난", "할매", "진미", "새마을", "동네", "착한", "정성", "바다", "한결", "옛날", "나눔", "푸른"]
+BUSINESSES = [
+    ("한식", "식당"), ("한식", "국밥"), ("분식", "분식"), ("한식", "칼국수"), ("이미용", "미용실"),
+    ("세탁", "세탁소"), ("한식", "반찬가게"), ("제과", "베이커리"), ("카페", "카페"), ("한식", "정육식당"),
+    ("제과", "떡집"), ("분식", "김밥"), ("중식", "중화요리"), ("양식", "돈까스"),
+]
+AREA_CODES = {"서울특별시": "02", "부산광역시": "051", "대구광역시": "053", "인천광역시": "032",
+              "광주광역시": "062", "대전광역시": "042", "경기도": "031", "전북특별자치도": "063", "제주특별자치도": "064"}
+CARDNEWS_TITLES = ["우리 동네 따뜻한 가게 이야기", "주민이 추천하는 착한 가게", "착한 가격 지킴이", "나눔을 실천하는 가게"]
+CARDNEWS_SUMMARIES = ["오랫동안 같은 자리에서 착한 가격을 지켜온 가게입니다.",
+                      "지역 이웃에게 매달 음식을 나누고 있습니다.",
+                      "친환경 포장재를 사용하고 일회용품을 줄였습니다."]
+
+
+def iter_stores(n_stores, seed=0):
+    """가게 dict를 id 순으로 생성 (id, name, address, district, phone, lat, lon, sido, business, dong)."""
+    rng = random.Random(seed)
+    for store_id in range(1, n_stores + 1):
+        sido, sigungu, lat, lon, dongs = rng.choice(DISTRICTS)
+        dong = rng.choice(dongs)
+        business, suffix = rng.choice(BUSINESSES)
+        name = f"{rng.choice(PREFIXES)}{suffix}"
+        if rng.random() < 0.6:
+            name = f"{name} {dong[:-1] if len(dong) > 2 else dong}점"
+        # 같은 상호가 흔하므로 뒤에 번호를 붙여 가게명으로 구분 (load_data는 가게명 기준 중복 제거)
+        name = f"{name} {store_id}호"
+        road = rng.choice(ROADS)
+        address = f"{sido} {sigungu} {road}{rng.randint(1, 60)}길 {rng.randint(1, 200)} ({dong})"
+        area = AREA_CODES.get(sido, "02")
+        yield {
+            "id": store_id,
+            "name": name,
+            "address": address,
+            "district": sigungu,
+            "phone": f"{area}-{rng.randint(200, 999)}-{rng.randint(1000, 9999)}",
+            # 구 중심에서 대략 ±3km
+            "lat": round(lat + rng.gauss(0, 0.015), 6),
+            "lon": round(lon + rng.gauss(0, 0.018), 6),
+            "sido": sido,
+            "business": business,
+            "dong": dong,
+        }
+
+
+def _chunks(rows, size=CHUNK_SIZE):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+def build_db(path, n_stores, seed=0, log=print):
+    """path에 합성 DB를 만든다. 이미 있으면 지우고 새로 만든다."""
+    if os.path.exists(path):
+        os.remove(path)
+    started = time.perf_counter()
+    rng = random.Random(seed + 1)
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    migrations.migrate(engine)
+    spatial.ensure_spatial_index(engine)
+    ensure_category_index(engine)
+    clusters.ensure_cluster_index(engine)
+    search_index.ensure_search_index(engine)
+
+    session_factory = sessionmaker(bind=engine)
+    with session_factory() as session:
+        load_categories(session)
+        load_certification_types(session)
+        session.commit()
+        cert_type_ids = [ct.id for ct in session.query(CertificationType).order_by(CertificationType.id)]
+
+    now = datetime.datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(text("PRAGMA journal_mode=WAL"))
+        batch, done = [], 0
+        for store in iter_stores(n_stores, seed):
+            batch.append({
+                "id": store["id"], "name": store["name"], "address": store["address"],
+                "district": store["district"], "phone": store["phone"],
+                "lat": store["lat"], "lon": store["lon"], "created_at": now, "score": 0,
+                "raw_meta": {"업종": store["business"], "시도": store["sido"]},
+            })
+            if len(batch) >= CHUNK_SIZE:
+                conn.execute(insert(Store), batch)
+                done += len(batch)
+                batch = []
+                if done % 100000 == 0:
+                    log(f"  stores {done}/{n_stores}")
+        if batch:
+            conn.execute(insert(Store), batch)
+
+        certs, ai_rows, cards = [], [], []
+        for store_id in range(1, n_stores + 1):
+            # 인증 1~2개 (good_price가 가장 흔함)
+            picks = {rng.choices(cert_type_ids, weights=[6, 2, 1, 1][:len(cert_type_ids)])[0]}
+            if rng.random() < 0.2:
+                picks.add(rng.choice(cert_type_ids))
+            certs.extend({"store_id": store_id, "cert_type_id": ct} for ct in picks)
+            if rng.random() < 0.1:
+                news, sns = rng.randint(0, 4), rng.randint(0, 8)
+                ai_rows.append({"store_id": store_id, "source": "ai_overview", "positive_news_count": news,
+                                "positive_sns_count": sns, "score": ai_score(news, sns), "updated_at": now})
+            if rng.random() < 0.2:
+                cards.append({"store_id": store_id, "title": rng.choice(CARDNEWS_TITLES),
+                              "summary": rng.choice(CARDNEWS_SUMMARIES), "created_at": now})
+        for chunk in _chunks(certs):
+            conn.execute(insert(Certification), chunk)
+        for chunk in _chunks(ai_rows):
+            conn.execute(insert(AIContribution), chunk)
+        for chunk in _chunks(cards):
+            conn.execute(insert(CardNews), chunk)
+
+    with session_factory() as session:
+        recompute_scores(session)
+        session.commit()
+    engine.dispose()
+    log(f"  built {n_stores} stores in {time.perf_counter() - started:.1f}s -> {path}")
+    return path
+
+
+def write_sources(directory, n_stores, seed=0):
+    """load_data.SOURCES 형식의 파일 4개를 만든다 (good_price 80%, green_store 10%, 나머지 JSON 두 개)."""
+    os.makedirs(directory, exist_ok=True)
+    good_price, green, campaign, vision = [], [], [], []
+    for store in iter_stores(n_stores, seed):
+        bucket = store["id"] % 10
+        if bucket < 8:
+            good_price.append(store)
+        elif bucket == 8:
+            green.append(store)
+        elif store["id"] % 20 == 9:
+            campaign.append(store)
+        else:
+            vision.append(store)
+
+    with open(os.path.join(directory, "good_price.csv"), "w", newline="", encoding="cp949", errors="replace") as f:
+        writer = csv.writer(f)
+        writer.writerow(["시도", "시군", "업종", "업소명", "연락처", "주소", "메뉴1", "가격1"])
+        for s in good_price:
+            writer.writerow([s["sido"], s["district"], s["business"], s["name"], s["phone"], s["address"], "대표 메뉴", "7000"])
+    with open(os.path.join(directory, "green_store.csv"), "w", newline="", encoding="cp949", errors="replace") as f:
+        writer = csv.writer(f)
+        writer.writerow(["구분", "지정번호", "업체명", "매장명", "지정기간"])
+        for s in green:
+            writer.writerow(["일반", f"제{s['id']:03d}호", s["name"], s["name"], "2024-01-01 ~ 2026-12-31"])
+    for filename, rows in (("1004campaign.json", campaign), ("vision_store.json", vision)):
+        with open(os.path.join(directory, filename), "w", encoding="utf-8") as f:
+            json.dump([
+                {"name": s["name"], "address": s["address"], "district": f"{s['sido']} {s['district']}",
+                 "lat": None, "lon": None, "phone": s["phone"]}
+                for s in rows
+            ], f, ensure_ascii=False)
+    return directory
+
+
+def main():
+    parser = argparse.ArgumentParser(description="벤치마크용 합성 가게 데이터 생성")
+    parser.add_argument("--stores", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="만들 SQLite DB 경로")
+    parser.add_argument("--sources-dir", help="load_data 형식 CSV/JSON을 쓸 디렉터리")
+    args = parser.parse_args()
+    if not args.out and not args.sources_dir:
+        parser.error("--out 또는 --sources-dir 중 하나는 필요합니다")
+    if args.out:
+        build_db(args.out, args.stores, args.seed)
+    if args.sources_dir:
+        write_sources(args.sources_dir, args.stores, args.seed)
+        print(f"  sources for {args.stores} stores -> {args.sources_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# category_index.py
+# store_categories 비정규화 매핑 유지 + 카테고리 필터
+# - certifications insert/delete 트리거로 (store_id, category_code) 행을 자동 관리
+#   (ORM add, 벌크 insert, AI 수집 등 어떤 경로로 인증이 들어와도 동기화됨)
+# - /stores 카테고리 필터는 인증 그래프 조인 없이 이 테이블만 사용
+from sqlalchemy import select, text, func
+from models import Store, StoreCategory
+from migrations import ensure_derived_index
+
+_DDL = [
+    """
+    CREATE TRIGGER IF NOT EXISTS store_categories_cert_insert AFTER INSERT ON certifications
+    BEGIN
+        INSERT OR IGNORE INTO store_categories (store_id, category_code)
+            SELECT NEW.store_id, ct.category_code FROM certification_types ct
+            WHERE ct.id = NEW.cert_type_id AND ct.category_code IS NOT NULL
+              AND NEW.store_id IS NOT NULL;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS store_categories_cert_delete AFTER DELETE ON certifications
+    BEGIN
+        DELETE FROM store_categories
+        WHERE store_id = OLD.store_id
+          AND category_code = (SELECT category_code FROM certification_types WHERE id = OLD.cert_type_id)
+          AND NOT EXISTS (
+              SELECT 1 FROM certifications c
+              JOIN certification_types ct ON ct.id = c.cert_type_id
+              WHERE c.store_id = OLD.store_id AND ct.category_code = store_categories.category_code
+          );
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS store_categories_store_delete AFTER DELETE ON stores
+    BEGIN
+        DELETE FROM store_categories WHERE store_id = OLD.id;
+    END
+    """,
+]
+
+_BACKFILL = """
+    INSERT OR IGNORE INTO store_categories (store_id, category_code)
+    SELECT DISTINCT c.store_id, ct.category_code
+    FROM certifications c JOIN certification_types ct ON ct.id = c.cert_type_id
+    WHERE c.store_id IS NOT NULL AND ct.category_code IS NOT NULL
+"""
+
+
+def _build(conn):
+    for ddl in _DDL:
+        conn.execute(text(ddl))
+    conn.execute(text(_BACKFILL))
+
+
+def ensure_category_index(engine):
+    # 트리거 생성 + 트리거 이전에 들어온 인증 반영. 정의가 바뀌었을 때만 (migrations.ensure_derived_index)
+    ensure_derived_index(engine, "store_categories", _DDL + [_BACKFILL], _build)
+
+
+def parse_categories(value):
+    # "a,b, c" -> ["a", "b", "c"]
+    if not value:
+        return []
+    return [code.strip() for code in value.split(",") if code.strip()]
+
+
+def filter_by_categories(query, codes, match="any"):
+    """query(Store 기준)에 카테고리 필터 적용. match="any"면 OR, "all"이면 AND."""
+    codes = list(dict.fromkeys(codes))
+    if not codes:
+        return query
+    subquery = select(StoreCategory.store_id).where(StoreCategory.category_code.in_(codes))
+    if match == "all" and len(codes) > 1:
+        subquery = subquery.group_by(StoreCategory.store_id).having(
+            func.count(StoreCategory.category_code) == len(codes)
+        )
+    return query.filter(Store.id.in_(subquery))
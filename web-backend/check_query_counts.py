@@ -0,0 +1,157 @@
+# check_query_counts.py
+# API별 SQL 실행 횟수 점검 (N+1 회귀 방지)
+# - 임시 DB에 데이터를 작게/크게 두 번 채워서 각 엔드포인트를 호출하고
+#   쿼리 수가 예산(QUERY_BUDGETS, WRITE_BUDGETS)을 넘거나 데이터 양에 따라 늘어나면 실패(exit 1)
+# - 수집 POST는 write_queue(db-writer 스레드, 쓰기 엔진)에서 실행된 SQL까지 센다
+# 사용법: python check_query_counts.py [-v]
+import os
+import sys
+import atexit
+import shutil
+import argparse
+import datetime
+import tempfile
+from sqlalchemy.orm import sessionmaker
+
+# app import 시 create_all/마이그레이션이 web-backend/database.db가 아니라 임시 DB에서 돌도록
+# (측정은 make_engine이 db.bind()로 다시 연결한 DB에서)
+_IMPORT_DIR = tempfile.mkdtemp(prefix="check_query_counts_")
+atexit.register(shutil.rmtree, _IMPORT_DIR, ignore_errors=True)
+os.environ["DATABASE_PATH"] = os.path.join(_IMPORT_DIR, "import.db")
+
+import app as web_app  # noqa: E402
+import db  # noqa: E402
+import spatial  # noqa: E402
+import search_index  # noqa: E402
+import clusters  # noqa: E402
+import migrations  # noqa: E402
+from category_index import ensure_category_index  # noqa: E402
+from load_data import load_categories, load_certification_types  # noqa: E402
+from models import Base, Store, Certification, CertificationType, CardNews  # noqa: E402
+from query_counter import count_queries  # noqa: E402
+
+# (경로, 허용 쿼리 수). 데이터 양과 무관한 상수여야 함
+QUERY_BUDGETS = [
+    ("/stores", 3),
+    ("/stores?categories=good_price,sharing&match=all", 3),
+    ("/stores?limit=5", 3),
+    ("/stores?stream=ndjson", 3),
+    ("/stores?format=columns&categories=sharing", 3),
+    ("/stores?format=binary", 3),
+    ("/stores/search?q=착한가게", 4),
+    ("/stores/search?q=가게", 4),
+    ("/stores/1", 3),
+    ("/cardnews", 2),
+    ("/cardnews?limit=5", 2),
+    ("/cardnews?stream=json", 2),
+    ("/stores/nearby?lat=37.5&lon=127.0&radius=5&category=sharing", 1),
+    ("/stores/clusters?bbox=126.9,37.4,127.1,37.6&zoom=12", 2),
+    ("/stores/clusters?bbox=126.99,37.49,127.01,37.51&zoom=18", 2),
+]
+
+
+
+def _record(tag, i=0):
+    return {
+        "store_name": f"수집 가게 {tag}-{i}", "address": f"서울특별시 중구 세종대로 {tag}-{i}",
+        "positive_news_count": 3, "positive_sns_count": 4, "categories": ["sharing", "good_price"],
+        "cardnews": [{"title": "t", "summary": "s"}],
+    }
+
+
+# (경로, 요청 본문(tag) -> JSON, 허용 쿼리 수). 매번 새 가게로 수집. 데이터 양과 무관한 상수여야 함
+WRITE_BUDGETS = [
+    ("/stores/process", lambda tag: _record(tag), 12),
+    ("/stores/process/batch", lambda tag: [_record(tag, i) for i in range(5)], 12),
+]
+
+SMALL, LARGE = 10, 40
+
+
+def make_engine(path):
+    # app의 Session/ReadSession을 임시 DB로 연결 -> (쓰기 엔진, 읽기 엔진)
+    engine, read_engine = db.bind(path)
+    Base.metadata.create_all(engine)
+    migrations.migrate(engine)
+    spatial.ensure_spatial_index(engine)
+    ensure_category_index(engine)
+    clusters.ensure_cluster_index(engine)
+    search_index.ensure_search_index(engine)
+    return engine, read_engine
+
+
+def seed(session, n_stores):
+    load_categories(session)
+    load_certification_types(session)
+    cert_types = session.query(CertificationType).all()
+    for i in range(n_stores):
+        store = Store(
+            name=f"착한가게 {i}",
+            address=f"서울특별시 종로구 대학로 {i}",
+            district="종로구",
+            lat=37.5 + i * 0.0001,
+            lon=127.0 + i * 0.0001,
+            score=100,
+        )
+        session.add(store)
+        session.flush()
+        for cert_type in cert_types[:2] + cert_types[-1:]:
+            session.add(Certification(store_id=store.id, cert_type_id=cert_type.id))
+        for j in range(2):
+            session.add(CardNews(
+                store_id=store.id, title=f"카드뉴스 {i}-{j}", summary="요약",
+                created_at=datetime.datetime.utcnow(),
+            ))
+    session.commit()
+
+
+def measure(n_stores, tmp_dir):
+    engine, read_engine = make_engine(os.path.join(tmp_dir, f"check_{n_stores}.db"))
+    with sessionmaker(bind=engine)() as session:
+        seed(session, n_stores)
+
+    client = web_app.app.test_client()
+    counts = {}
+    for path, _ in QUERY_BUDGETS:
+        client.get(path)  # 연결 준비
+        web_app.response_cache.invalidate()  # 응답 캐시를 거치지 않고 실제 쿼리 수를 잰다
+        with count_queries(read_engine) as counter:
+            resp = client.get(path)
+            resp.get_data()  # 스트리밍 응답은 본문을 읽어야 쿼리가 실행됨
+        counts[path] = (resp.status_code, counter)
+    for path, body, _ in WRITE_BUDGETS:
+        client.post(path, json=body("warmup"))  # 연결 준비 + 수집 참조 데이터 캐시 로딩
+        with count_queries(read_engine) as read_counter, count_queries(engine) as write_counter:
+            resp = client.post(path, json=body("check"))
+        read_counter.statements.extend(write_counter.statements)
+        counts[path] = (resp.status_code, read_counter)
+    engine.dispose()
+    read_engine.dispose()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API별 SQL 실행 횟수 점검")
+    parser.add_argument("-v", "--verbose", action="store_true", help="실행된 SQL 출력")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        small = measure(SMALL, tmp_dir)
+        large = measure(LARGE, tmp_dir)
+
+    failures = 0
+    for path, budget in QUERY_BUDGETS + [(path, budget) for path, _, budget in WRITE_BUDGETS]:
+        status, small_counter = small[path]
+        _, large_counter = large[path]
+        ok = status == 200 and large_counter.count <= budget and large_counter.count == small_counter.count
+        failures += not ok
+        print(f"[{'OK' if ok else 'FAIL'}] {path}: {small_counter.count} -> {large_counter.count} queries "
+              f"(stores {SMALL} -> {LARGE}, budget {budget}, status {status})")
+        if args.verbose or not ok:
+            for statement in large_counter.statements:
+                print("    " + " ".join(statement.split())[:200])
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+# check_query_plans.py
+# 자주 실행되는 쿼리의 실행 계획 점검 (인덱스 회귀 방지)
+# - 임시 DB(마이그레이션 적용)에 데이터를 채우고 각 경로(읽기 API, 수집/적재 조회)를 실행하면서
+#   나간 SQL을 그대로 EXPLAIN QUERY PLAN -> 테이블 전체 스캔(SCAN <table>, 인덱스 없음)이 있으면 실패(exit 1)
+# - id 순으로 LIMIT까지만 읽는 첫 페이지처럼 의도된 스캔은 경로별 allowed_scans에 명시
+# - 경로가 꼭 써야 하는 인덱스는 required_indexes에 명시 (계획에 없으면 실패: 인덱스가 빠지거나 안 쓰이는 회귀)
+# 사용법: python check_query_plans.py [-v]
+import os
+import re
+import sys
+import argparse
+import tempfile
+from contextlib import contextmanager
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+# check_query_counts를 먼저 import: app import 전에 DATABASE_PATH를 임시 DB로 바꿔 둠 (web-backend/database.db를 만들지 않음)
+from check_query_counts import make_engine, seed
+import app as web_app  # noqa: E402
+import geocode_worker  # noqa: E402
+from ingest_service import normalize_record  # noqa: E402
+from models import Store  # noqa: E402
+
+N_STORES = 40
+
+# 인덱스 없이 테이블(또는 별칭)을 처음부터 끝까지 읽는 단계. 서브쿼리 결과(CO-ROUTINE/MATERIALIZE)는 제외
+_FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+_SUBQUERY = re.compile(r"^(?:CO-ROUTINE|MATERIALIZE) (\w+)")
+_USING_INDEX = re.compile(r"USING (?:COVERING )?INDEX (\w+)")
+
+
+def _get(path):
+    def run(client, session):
+        resp = client.get(path)
+        resp.get_data()
+        assert resp.status_code == 200, f"{path} -> {resp.status_code}"
+    return run
+
+
+def _ingest_existing(client, session):
+    # 이미 있는 주소와 새 주소로 AI 결과 수집 (주소 조회, 인증 연결, AI 기여분 upsert, 점수 재계산)
+    store = session.get(Store, N_STORES)
+    service = web_app.ingest_service
+    service.references.clear()  # 참조 데이터 캐시 첫 로딩도 함께 점검
+    records = [normalize_record({
+        "store_name": name, "address": address, "categories": ["sharing", "good_price"],
+        "positive_news_count": 30, "positive_sns_count": 20,
+        "cardnews": [{"title": "t", "summary": "s"}],
+    }) for name, address in [(store.name, store.address), ("새 가게", "서울시 어딘가 1")]]
+    cert_type_ids, _ = service.references.cert_type_ids(session, ["sharing", "good_price"])
+    service.store_records(session, records, cert_type_ids)
+    session.flush()
+
+
+def _load_row_by_name(client, session):
+    # 행 단위 적재의 가게명 조회
+    session.query(Store).filter_by(name=f"착한가게 {N_STORES // 2}").first()
+
+
+def _geocode_backlog(client, session):
+    # 좌표 채우기 워커의 backlog 카운트, 배치 조회, 좌표 UPDATE
+    geocode_worker.count_backlog(session)
+    geocode_worker.select_backlog(session, 0, 100)
+    session.execute(geocode_worker._FILL, {"store_id": 1, "new_lat": 37.5, "new_lon": 127.0})
+
+
+# (이름, 실행 함수(client, session), 전체 스캔을 허용하는 테이블/별칭[, 계획에 반드시 나와야 하는 인덱스])
+# score >= MIN_SCORE 필터는 실제 데이터에서 대부분 통과하므로(인증 하나 = 50점) 전체 목록은 id 순 스캔이 맞고,
+# ix_stores_score는 점수로 가게 id를 먼저 좁히는 서브쿼리(마커 목록의 카테고리 조회)에서 쓰인다
+PLAN_CHECKS = [
+    ("GET /stores", _get("/stores"), {"stores"}),  # 보이는 가게 전체를 id 순으로
+    ("GET /stores?limit=20", _get("/stores?limit=20"), {"stores"}),  # id 순 LIMIT까지만
+    ("GET /stores?limit=20&cursor=", _get("/stores?limit=20&cursor=eyJpZCI6IDEwfQ"), set()),
+    ("GET /stores?categories=sharing&limit=20", _get("/stores?categories=sharing&limit=20"), set()),
+    ("GET /stores?format=columns", _get("/stores?format=columns"), {"stores"}, {"ix_stores_score"}),
+    ("GET /stores?format=columns&categories=sharing", _get("/stores?format=columns&categories=sharing"), set()),
+    ("GET /stores/search?q=착한가게", _get("/stores/search?q=착한가게"), set()),
+    ("GET /stores/search?q=가게", _get("/stores/search?q=가게"), set()),
+    ("GET /stores/1", _get("/stores/1"), set()),
+    ("GET /cardnews?limit=5", _get("/cardnews?limit=5"), {"cardnews"}),  # id 순 LIMIT까지만
+    ("GET /stores/nearby", _get("/stores/nearby?lat=37.5&lon=127.0&radius=5&category=sharing"), set()),
+    ("GET /stores/clusters", _get("/stores/clusters?bbox=126.9,37.4,127.1,37.6&zoom=12"), set()),
+    # 참조 데이터 캐시는 처음 한 번 카테고리/인증 종류 전체를 읽음
+    ("ingest_service.store_records", _ingest_existing, {"categories", "certification_types"}),
+    ("load_data 가게명 조회", _load_row_by_name, set()),
+    ("geocode backlog", _geocode_backlog, set()),
+]
+
+
+@contextmanager
+def capture(*engines):
+    # 실행된 (SQL, 파라미터). executemany는 계획이 같으므로 제외
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "WITH")):
+            statements.append((statement, parameters))
+
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def explain(engine, statement, parameters):
+    with engine.connect() as conn:
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            return [row[3] for row in cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters or ())]
+        finally:
+            cursor.close()
+
+
+def full_scans(plan, allowed):
+    subqueries = {m.group(1) for m in map(_SUBQUERY.match, plan) if m}
+    scans = []
+    for detail in plan:
+        match = _FULL_SCAN.match(detail)
+        if match and match.group(1) not in allowed and match.group(1) not in subqueries:
+            scans.append(detail)
+    return scans
+
+
+def main():
+    parser = argparse.ArgumentParser(description="주요 쿼리 실행 계획 점검 (전체 스캔 회귀)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="모든 쿼리의 실행 계획 출력")
+    args = parser.parse_args()
+
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine, read_engine = make_engine(os.path.join(tmp_dir, "plans.db"))
+        with sessionmaker(bind=engine)() as session:
+            seed(session, N_STORES)
+        client = web_app.app.test_client()
+
+        for name, run, allowed, *required in PLAN_CHECKS:
+            required = required[0] if required else set()
+            web_app.response_cache.invalidate()
+            with sessionmaker(bind=engine)() as session, capture(engine, read_engine) as statements:
+                run(client, session)
+                session.rollback()
+            problems = []
+            used = set()
+            for statement, parameters in statements:
+                plan = explain(engine, statement, parameters)
+                used.update(m.group(1) for detail in plan for m in [_USING_INDEX.search(detail)] if m)
+                scans = full_scans(plan, allowed)
+                if scans:
+                    problems.append((statement, plan, scans))
+                elif args.verbose:
+                    print(f"    {' '.join(statement.split())[:160]}\n      {plan}")
+            missing = required - used
+            failures += bool(problems or missing)
+            print(f"[{'FAIL' if problems or missing else 'OK'}] {name}: {len(statements)} queries")
+            for statement, plan, scans in problems:
+                print(f"    {' '.join(statement.split())[:200]}\n      full scan: {scans}\n      plan: {plan}")
+            if missing:
+                print(f"    index not used: {sorted(missing)} (used: {sorted(used)})")
+        engine.dispose()
+        read_engine.dispose()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,268 @@
+# clusters.py
+# 지도 마커 클러스터 (줌 레벨별 격자 집계)
+# - 줌 z의 셀 크기 = 360 / 2^(z + CELL_BITS) 도 (타일 하나를 2^CELL_BITS x 2^CELL_BITS 칸으로 나눔)
+#   위도도 같은 각도로 나눔 (메르카토르 보정 없음, 국내 범위에서는 셀이 조금 세로로 길어지는 정도)
+# - store_clusters: (zoom, cell) -> 가게 수 + 좌표 합 (중심 = 합 / 수)
+#   store_cluster_categories: (zoom, cell, category) -> 가게 수
+# - stores / store_categories 트리거로 insert/좌표 변경/delete 시 해당 셀만 증감
+#   (ORM, 벌크 insert, AI 수집 어디서 들어와도 동기화됨)
+# - 조회는 화면 bbox에 걸리는 셀만 읽으므로 응답 크기는 전체 가게 수가 아니라 화면 크기에 비례
+# - 목록과 같게 좌표가 있고 점수가 MIN_SCORE 이상인 가게만 집계 (점수가 기준을 넘나들면 트리거가 증감)
+#   기준/레벨이 바뀌면 ensure_cluster_index가 트리거를 다시 만들고 집계를 재구성
+from sqlalchemy import text
+from models import Store, StoreCluster, StoreClusterCategory, StoreCategory
+from scoring import MIN_SCORE
+from migrations import ensure_derived_index
+from spatial import stores_rtree
+
+MIN_CLUSTER_ZOOM = 5
+MAX_CLUSTER_ZOOM = 15
+CELL_BITS = 2
+# 한 번에 읽는 셀 범위 상한 (줌에 비해 지나치게 넓은 bbox 방지)
+MAX_CLUSTER_CELLS = 20000
+# MAX_CLUSTER_ZOOM보다 확대하면 개별 가게를 돌려줌. 이보다 많으면 MAX_CLUSTER_ZOOM 클러스터로 대신
+MAX_CLUSTER_POINTS = 2000
+
+
+def cell_degrees(zoom):
+    return 360.0 / (1 << (zoom + CELL_BITS))
+
+
+def _cell_x(lon, levels="l"):
+    return f"CAST(({lon} + 180.0) / {levels}.cell_deg AS INTEGER)"
+
+
+def _cell_y(lat, levels="l"):
+    return f"CAST(({lat} + 90.0) / {levels}.cell_deg AS INTEGER)"
+
+
+def _cells(lat, lon):
+    # 좌표가 속한 모든 줌 레벨의 셀 (트리거 안에서는 CTE를 못 써서 cluster_levels 테이블을 조인)
+    return f"SELECT l.zoom, {_cell_x(lon)}, {_cell_y(lat)} FROM cluster_levels l"
+
+
+def _visible(row):
+    # 지도에 집계되는 가게: 좌표가 있고 점수 기준 이상
+    return f"({row}.lat IS NOT NULL AND {row}.lon IS NOT NULL AND {row}.score >= {int(MIN_SCORE)})"
+
+
+# store_categories 트리거용: OLD.store_id 가게가 속한 셀
+_STORE_CELLS = f"""
+    SELECT l.zoom, {_cell_x("s.lon")}, {_cell_y("s.lat")} FROM stores s, cluster_levels l
+    WHERE s.id = OLD.store_id AND {_visible("s")}
+"""
+
+_TRIGGERS = [
+    "store_clusters_insert", "store_clusters_update", "store_clusters_delete",
+    "store_cluster_categories_insert", "store_cluster_categories_delete",
+]
+
+_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS cluster_levels (
+        zoom INTEGER PRIMARY KEY,
+        cell_deg REAL NOT NULL
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS store_clusters_insert AFTER INSERT ON stores
+    WHEN {_visible("NEW")}
+    BEGIN
+        INSERT INTO store_clusters (zoom, cell_x, cell_y, count, sum_lat, sum_lon)
+            SELECT l.zoom, {_cell_x("NEW.lon")}, {_cell_y("NEW.lat")}, 1, NEW.lat, NEW.lon
+            FROM cluster_levels l WHERE true
+        ON CONFLICT (zoom, cell_x, cell_y) DO UPDATE SET
+            count = count + 1, sum_lat = sum_lat + excluded.sum_lat, sum_lon = sum_lon + excluded.sum_lon;
+        INSERT INTO store_cluster_categories (zoom, cell_x, cell_y, category_code, count)
+            SELECT l.zoom, {_cell_x("NEW.lon")}, {_cell_y("NEW.lat")}, sc.category_code, 1
+            FROM cluster_levels l, store_categories sc WHERE sc.store_id = NEW.id
+        ON CONFLICT (zoom, cell_x, cell_y, category_code) DO UPDATE SET count = count + 1;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS store_clusters_update AFTER UPDATE OF lat, lon, score ON stores
+    WHEN OLD.lat IS NOT NEW.lat OR OLD.lon IS NOT NEW.lon OR {_visible("OLD")} IS NOT {_visible("NEW")}
+    BEGIN
+        -- 이전 위치의 셀에서 빼기
+        UPDATE store_clusters
+        SET count = count - 1, sum_lat = sum_lat - OLD.lat, sum_lon = sum_lon - OLD.lon
+        WHERE {_visible("OLD")}
+          AND (zoom, cell_x, cell_y) IN ({_cells("OLD.lat", "OLD.lon")});
+        DELETE FROM store_clusters
+        WHERE count <= 0 AND (zoom, cell_x, cell_y) IN ({_cells("OLD.lat", "OLD.lon")});
+        UPDATE store_cluster_categories SET count = count - 1
+        WHERE {_visible("OLD")}
+          AND (zoom, cell_x, cell_y) IN ({_cells("OLD.lat", "OLD.lon")})
+          AND category_code IN (SELECT category_code FROM store_categories WHERE store_id = OLD.id);
+        DELETE FROM store_cluster_categories
+        WHERE count <= 0 AND (zoom, cell_x, cell_y) IN ({_cells("OLD.lat", "OLD.lon")});
+        -- 새 위치의 셀에 더하기
+        INSERT INTO store_clusters (zoom, cell_x, cell_y, count, sum_lat, sum_lon)
+            SELECT l.zoom, {_cell_x("NEW.lon")}, {_cell_y("NEW.lat")}, 1, NEW.lat, NEW.lon
+            FROM cluster_levels l WHERE {_visible("NEW")}
+        ON CONFLICT (zoom, cell_x, cell_y) DO UPDATE SET
+            count = count + 1, sum_lat = sum_lat + excluded.sum_lat, sum_lon = sum_lon + excluded.sum_lon;
+        INSERT INTO store_cluster_categories (zoom, cell_x, cell_y, category_code, count)
+            SELECT l.zoom, {_cell_x("NEW.lon")}, {_cell_y("NEW.lat")}, sc.category_code, 1
+            FROM cluster_levels l, store_categories sc
+            WHERE sc.store_id = NEW.id AND {_visible("NEW")}
+        ON CONFLICT (zoom, cell_x, cell_y, category_code) DO UPDATE SET count = count + 1;
+    END
+    """,
+    # BEFORE: store_categories 행이 store_categories_store_delete로 지워지기 전에 카테고리 수를 뺀다
+    f"""
+    CREATE TRIGGER IF NOT EXISTS store_clusters_delete BEFORE DELETE ON stores
+    WHEN {_visible("OLD")}
+    BEGIN
+        UPDATE store_clusters
+        SET count = count - 1, sum_lat = sum_lat - OLD.lat, sum_lon = sum_lon - OLD.lon
+        WHERE (zoom, cell_x, cell_y) IN ({_cells("OLD.lat", "OLD.lon")});
+        DELETE FROM store_clusters
+        WHERE count <= 0 AND (zoom, cell_x, cell_y) IN ({_cells("OLD.lat", "OLD.lon")});
+        UPDATE store_cluster_categories SET count = count - 1
+        WHERE (zoom, cell_x, cell_y) IN ({_cells("OLD.lat", "OLD.lon")})
+          AND category_code IN (SELECT category_code FROM store_categories WHERE store_id = OLD.id);
+        DELETE FROM store_cluster_categories
+        WHERE count <= 0 AND (zoom, cell_x, cell_y) IN ({_cells("OLD.lat", "OLD.lon")});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS store_cluster_categories_insert AFTER INSERT ON store_categories
+    BEGIN
+        INSERT INTO store_cluster_categories (zoom, cell_x, cell_y, category_code, count)
+            SELECT l.zoom, {_cell_x("s.lon")}, {_cell_y("s.lat")}, NEW.category_code, 1
+            FROM stores s, cluster_levels l
+            WHERE s.id = NEW.store_id AND {_visible("s")}
+        ON CONFLICT (zoom, cell_x, cell_y, category_code) DO UPDATE SET count = count + 1;
+    END
+    """,
+    # 가게 삭제로 지워지는 경우에는 stores 행이 이미 없어서 아무것도 하지 않음 (store_clusters_delete에서 처리)
+    f"""
+    CREATE TRIGGER IF NOT EXISTS store_cluster_categories_delete AFTER DELETE ON store_categories
+    BEGIN
+        UPDATE store_cluster_categories SET count = count - 1
+        WHERE category_code = OLD.category_code AND (zoom, cell_x, cell_y) IN ({_STORE_CELLS});
+        DELETE FROM store_cluster_categories
+        WHERE count <= 0 AND category_code = OLD.category_code AND (zoom, cell_x, cell_y) IN ({_STORE_CELLS});
+    END
+    """,
+]
+
+_REBUILD = [
+    "DELETE FROM store_clusters",
+    f"""
+    INSERT INTO store_clusters (zoom, cell_x, cell_y, count, sum_lat, sum_lon)
+    SELECT l.zoom, {_cell_x("s.lon")}, {_cell_y("s.lat")}, COUNT(*), SUM(s.lat), SUM(s.lon)
+    FROM stores s, cluster_levels l
+    WHERE {_visible("s")}
+    GROUP BY 1, 2, 3
+    """,
+    "DELETE FROM store_cluster_categories",
+    f"""
+    INSERT INTO store_cluster_categories (zoom, cell_x, cell_y, category_code, count)
+    SELECT l.zoom, {_cell_x("s.lon")}, {_cell_y("s.lat")}, sc.category_code, COUNT(*)
+    FROM stores s JOIN store_categories sc ON sc.store_id = s.id, cluster_levels l
+    WHERE {_visible("s")}
+    GROUP BY 1, 2, 3, 4
+    """,
+]
+
+def ensure_cluster_index(engine):
+    # 레벨 테이블/트리거 생성 + 집계 재구성. 트리거/레벨/집계 정의가 바뀌었을 때만 (migrations.ensure_derived_index)
+    # store_categories 트리거를 쓰므로 ensure_category_index 다음에 호출
+    levels = [(zoom, cell_degrees(zoom)) for zoom in range(MIN_CLUSTER_ZOOM, MAX_CLUSTER_ZOOM + 1)]
+
+    def build(conn):
+        # 트리거 본문에 점수 기준이 들어가므로 다시 만든다 (IF NOT EXISTS로는 기존 트리거가 남음)
+        for name in _TRIGGERS:
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+        for ddl in _DDL:
+            conn.execute(text(ddl))
+        conn.execute(text("DELETE FROM cluster_levels"))
+        conn.execute(
+            text("INSERT INTO cluster_levels (zoom, cell_deg) VALUES (:zoom, :cell_deg)"),
+            [{"zoom": zoom, "cell_deg": cell_deg} for zoom, cell_deg in levels],
+        )
+        for sql in _REBUILD:
+            conn.execute(text(sql))
+
+    ensure_derived_index(engine, "store_clusters", _DDL + _REBUILD + [repr(levels)], build)
+
+
+def parse_bbox(value):
+    """"west,south,east,north" -> (west, south, east, north). 잘못된 값이면 ValueError."""
+    parts = [float(part) for part in (value or "").split(",")]
+    if len(parts) != 4:
+        raise ValueError("bbox는 west,south,east,north 네 값이어야 합니다")
+    west, south, east, north = parts
+    if not (-180 <= west <= east <= 180 and -90 <= south <= north <= 90):
+        raise ValueError("bbox 범위가 올바르지 않습니다")
+    return west, south, east, north
+
+
+def _cell_range(zoom, west, south, east, north):
+    size = cell_degrees(zoom)
+    return (
+        int((west + 180.0) / size), int((east + 180.0) / size),
+        int((south + 90.0) / size), int((north + 90.0) / size),
+    )
+
+
+def query_clusters(session, zoom, west, south, east, north):
+    """bbox 안의 줌 레벨 클러스터 -> [{"lat", "lon", "count", "categories"}]. 범위가 너무 넓으면 ValueError."""
+    zoom = max(MIN_CLUSTER_ZOOM, min(zoom, MAX_CLUSTER_ZOOM))
+    x0, x1, y0, y1 = _cell_range(zoom, west, south, east, north)
+    if (x1 - x0 + 1) * (y1 - y0 + 1) > MAX_CLUSTER_CELLS:
+        raise ValueError("bbox가 줌 레벨에 비해 너무 넓습니다")
+
+    def in_range(model):
+        return (
+            model.zoom == zoom,
+            model.cell_x.between(x0, x1),
+            model.cell_y.between(y0, y1),
+        )
+
+    categories = {}
+    for row in session.query(
+        StoreClusterCategory.cell_x, StoreClusterCategory.cell_y,
+        StoreClusterCategory.category_code, StoreClusterCategory.count,
+    ).filter(*in_range(StoreClusterCategory)):
+        categories.setdefault((row.cell_x, row.cell_y), {})[row.category_code] = row.count
+
+    return [
+        {
+            "lat": row.sum_lat / row.count,
+            "lon": row.sum_lon / row.count,
+            "count": row.count,
+            "categories": categories.get((row.cell_x, row.cell_y), {}),
+        }
+        for row in session.query(
+            StoreCluster.cell_x, StoreCluster.cell_y, StoreCluster.count,
+            StoreCluster.sum_lat, StoreCluster.sum_lon,
+        ).filter(*in_range(StoreCluster)).order_by(StoreCluster.cell_y, StoreCluster.cell_x)
+    ]
+
+
+def query_points(session, west, south, east, north, limit=MAX_CLUSTER_POINTS):
+    """bbox 안의 점수 기준 이상 개별 가게 (count=1 클러스터 형태). limit개를 넘으면 None."""
+    def in_bbox(query, id_column):
+        return query.join(stores_rtree, stores_rtree.c.id == id_column).filter(
+            stores_rtree.c.max_lat >= south, stores_rtree.c.min_lat <= north,
+            stores_rtree.c.max_lon >= west, stores_rtree.c.min_lon <= east,
+        )
+
+    rows = (
+        in_bbox(session.query(Store.id, Store.lat, Store.lon), Store.id)
+        .filter(Store.score >= MIN_SCORE)
+        .limit(limit + 1)
+        .all()
+    )
+    if len(rows) > limit:
+        return None
+    categories = {}
+    for store_id, code in in_bbox(session.query(StoreCategory.store_id, StoreCategory.category_code), StoreCategory.store_id):
+        categories.setdefault(store_id, {})[code] = 1
+    return [
+        {"id": row.id, "lat": row.lat, "lon": row.lon, "count": 1, "categories": categories.get(row.id, {})}
+        for row in rows
+    ]
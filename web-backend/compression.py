@@ -0,0 +1,99 @@
+# compression.py
+# 응답 압축 (Accept-Encoding 협상: br > gzip)
+# - brotli 패키지가 없으면 gzip만 사용
+# - 스트리밍/작은 응답/이미 인코딩된 응답은 건드리지 않음
+# - ETag가 있는 응답은 (ETag, 인코딩)별 압축 결과를 기억해서 캐시 적중 시 다시 압축하지 않음
+# - 압축한 본문은 다른 표현이므로 ETag에 인코딩을 붙임 ("<tag>-gzip"). If-None-Match 비교는 etag_variants로
+import os
+import gzip
+import threading
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:  # 선택 의존성
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_CACHE_ENTRIES = int(os.environ.get("COMPRESS_CACHE_ENTRIES", "128"))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # 동적 응답용: 압축률보다 속도 우선
+
+COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "application/vnd.stores.columns+json",
+    "application/vnd.stores.markers",
+    "text/html",
+    "text/plain",
+}
+
+_compressed = OrderedDict()  # (etag, encoding) -> bytes
+_lock = threading.Lock()
+
+
+def supported_encodings():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate_encoding(accept_encodings):
+    # werkzeug Accept 객체 -> 사용할 인코딩 (없으면 None)
+    best = accept_encodings.best_match(supported_encodings())
+    return best if best and accept_encodings[best] > 0 else None
+
+
+def encoded_etag(etag, encoding):
+    return f"{etag}-{encoding}"
+
+
+def etag_variants(etag):
+    # 같은 내용의 무압축/압축 표현 ETag (If-None-Match 비교용)
+    return [etag] + [encoded_etag(etag, encoding) for encoding in ("br", "gzip")]
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _cached_compress(etag, body, encoding):
+    if not etag:
+        return compress(body, encoding)
+    key = (etag, encoding)
+    with _lock:
+        data = _compressed.get(key)
+        if data is not None:
+            _compressed.move_to_end(key)
+            return data
+    data = compress(body, encoding)
+    with _lock:
+        _compressed[key] = data
+        while len(_compressed) > COMPRESS_CACHE_ENTRIES:
+            _compressed.popitem(last=False)
+    return data
+
+
+def compress_response(response, accept_encodings):
+    """Flask after_request용. 조건이 맞으면 본문을 압축하고 Content-Encoding/Vary를 붙인다."""
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    response.vary.add("Accept-Encoding")
+    if (
+        response.status_code != 200
+        or response.is_streamed
+        or response.direct_passthrough
+        or "Content-Encoding" in response.headers
+    ):
+        return response
+    encoding = negotiate_encoding(accept_encodings)
+    if encoding is None:
+        return response
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return response
+    etag, weak = response.get_etag()
+    response.set_data(_cached_compress(etag, body, encoding))
+    response.headers["Content-Encoding"] = encoding
+    if etag:
+        response.set_etag(encoded_etag(etag, encoding), weak)
+    return response
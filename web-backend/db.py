@@ -0,0 +1,170 @@
+# db.py
+# 공용 DB 계층 (app.py, load_data.py 공용)
+# - 같은 database.db(이 파일 옆)를 쓰는 엔진 두 개
+#   engine     : 쓰기용. WAL + 튜닝 pragma, 트랜잭션은 BEGIN IMMEDIATE (쓰기 잠금을 처음부터 잡아
+#                읽다가 쓰기로 올라갈 때의 "database is locked"를 피하고 busy_timeout 동안 기다림)
+#   read_engine: 읽기 전용 풀 (query_only). WAL이라 쓰기/적재 중에도 마지막 commit 기준으로 바로 읽음
+# - write_queue: 모든 쓰기를 한 스레드에서 실행. 짧은 쓰기 여러 개를 한 트랜잭션으로 모아 commit
+#   작업마다 savepoint를 두어 하나가 실패해도 같은 묶음의 다른 작업은 저장
+import os
+import time
+import queue
+import logging
+import threading
+import contextvars
+from concurrent.futures import Future
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.environ.get("DATABASE_PATH") or os.path.join(BASE_DIR, "database.db")
+
+BUSY_TIMEOUT_SECONDS = 30
+READ_POOL_SIZE = int(os.environ.get("DB_READ_POOL_SIZE", "8"))
+# 한 트랜잭션으로 묶을 최대 쓰기 작업 수 / 첫 작업 뒤 다음 작업을 기다리는 최대 시간(초)
+WRITE_BATCH_MAX = int(os.environ.get("DB_WRITE_BATCH_MAX", "200"))
+WRITE_BATCH_WAIT = float(os.environ.get("DB_WRITE_BATCH_WAIT_MS", "5")) / 1000
+
+_PRAGMAS = [
+    "PRAGMA synchronous=NORMAL",  # WAL에서는 NORMAL이어도 손상 없음 (전원 장애 시 마지막 commit만 유실 가능)
+    # temp_store=MEMORY는 쓰지 않음: write_queue 작업마다 두는 savepoint의 statement journal이 메모리에 쌓이면
+    # 기존 페이지를 많이 고치는 큰 작업(적재)에서 insert가 10배 이상 느려짐 (SQLite 3.40, 1만 건 0.7s -> 8s)
+    "PRAGMA cache_size=-32000",  # 연결당 약 32MB
+    "PRAGMA mmap_size=268435456",
+]
+
+
+def create_db_engine(path, readonly=False):
+    """path의 SQLite 엔진. readonly면 query_only 읽기 풀, 아니면 WAL + BEGIN IMMEDIATE 쓰기 엔진."""
+    kwargs = {"pool_size": READ_POOL_SIZE, "max_overflow": READ_POOL_SIZE} if readonly else {}
+    engine = create_engine(
+        f"sqlite:///{os.path.abspath(path)}",
+        connect_args={"check_same_thread": False, "timeout": BUSY_TIMEOUT_SECONDS},
+        **kwargs,
+    )
+
+    @event.listens_for(engine, "connect")
+    def _configure(dbapi_connection, connection_record):
+        # pysqlite의 암묵적 BEGIN을 끄고 트랜잭션 시작은 아래 begin 이벤트에서 직접
+        if not readonly:
+            dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        if not readonly:
+            cursor.execute("PRAGMA journal_mode=WAL")
+        for pragma in _PRAGMAS:
+            cursor.execute(pragma)
+        if readonly:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+    if not readonly:
+        @event.listens_for(engine, "begin")
+        def _begin(conn):
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    return engine
+
+
+class WriteQueue:
+    """단일 writer 스레드. submit(fn)한 fn(session)을 순서대로 실행하고 묶어서 commit.
+
+    fn은 commit/rollback을 하지 않는다 (묶음 단위로 큐가 처리). 반환값은 Future 결과가 되므로
+    세션에 묶인 ORM 객체 대신 id 같은 값을 돌려준다. fn 안에서 다시 run()을 호출하면 안 된다.
+    fn은 submit한 쪽의 contextvars 문맥(복사본)에서 실행된다 (metrics가 요청별 SQL 집계에 사용).
+    """
+
+    def __init__(self, session_factory, max_batch=WRITE_BATCH_MAX, max_wait=WRITE_BATCH_WAIT):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stats = {"jobs": 0, "failed": 0, "commits": 0, "commit_errors": 0}
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, fn):
+        future = Future()
+        self._ensure_thread()
+        self._queue.put((fn, future, contextvars.copy_context()))
+        return future
+
+    def run(self, fn, timeout=None):
+        # 쓰기 작업을 큐에 넣고 commit될 때까지 기다린 뒤 fn의 반환값을 돌려줌 (실패하면 예외)
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("write_queue.run()은 쓰기 작업 안에서 호출할 수 없습니다")
+        return self.submit(fn).result(timeout)
+
+    def _run(self):
+        while True:
+            jobs = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(jobs) < self.max_batch:
+                try:
+                    jobs.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            self._commit(jobs)
+
+    def _commit(self, jobs):
+        done = []
+        failed = 0
+        with self.session_factory() as session:
+            try:
+                for fn, future, context in jobs:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        with session.begin_nested():
+                            result = context.run(fn, session)
+                    except Exception as e:
+                        failed += 1
+                        future.set_exception(e)
+                        continue
+                    done.append((future, result))
+                session.commit()
+            except Exception as e:
+                session.rollback()
+                logger.error(f"[Write Queue] commit failed ({len(done)} jobs): {e}")
+                for future, _ in done:
+                    future.set_exception(e)
+                with self._lock:
+                    self._stats["jobs"] += len(jobs)
+                    self._stats["failed"] += failed + len(done)
+                    self._stats["commit_errors"] += 1
+                return
+        for future, result in done:
+            future.set_result(result)
+        with self._lock:
+            self._stats["jobs"] += len(jobs)
+            self._stats["failed"] += failed
+            self._stats["commits"] += 1
+
+    def status(self):
+        with self._lock:
+            return {**self._stats, "pending": self._queue.qsize()}
+
+
+engine = create_db_engine(DB_PATH)
+read_engine = create_db_engine(DB_PATH, readonly=True)
+Session = sessionmaker(bind=engine)
+ReadSession = sessionmaker(bind=read_engine)
+write_queue = WriteQueue(Session)
+
+
+def bind(path):
+    """Session/ReadSession(과 write_queue)을 다른 DB 파일로 다시 연결. 점검/벤치마크 스크립트용.
+
+    (쓰기 엔진, 읽기 엔진)을 반환한다.
+    """
+    writer, reader = create_db_engine(path), create_db_engine(path, readonly=True)
+    Session.configure(bind=writer)
+    ReadSession.configure(bind=reader)
+    return writer, reader
@@ -0,0 +1,166 @@
+# geocode_worker.py
+# 좌표가 비어 있는 가게를 백그라운드 스레드에서 지오코딩
+# - 수집(/stores/process 등)은 좌표 없이 가게를 저장하고 notify()만 호출 -> 응답이 외부 지오코더를 기다리지 않음
+# - 워커는 id 순으로 batch_size개씩 주소를 모아 Geocoder.geocode_many로 변환 (geocode_cache 사용)
+#   외부 호출 중에는 DB 트랜잭션을 잡지 않고, 결과만 짧은 트랜잭션으로 UPDATE (write_queue가 있으면 큐로)
+# - 한 바퀴(id 끝까지)를 돌면 notify() 또는 rescan_interval까지 대기 -> 기존 가게의 빈 좌표도 채움(backfill)
+# - 결과 없음/오류로 못 채운 가게는 다음 바퀴에서 다시 시도 (결과 없음은 캐시되어 외부 호출 없음)
+# - 좌표 UPDATE는 응답 캐시를 무효화하지 않음 (배치마다 비우면 backfill 동안 캐시가 쓸모없음)
+#   대신 한 바퀴에서 하나라도 채웠으면 on_filled(채운 수)를 한 번 호출 (app.py가 캐시 무효화)
+import os
+import time
+import logging
+import threading
+from sqlalchemy import select, update, func, or_, bindparam
+from models import Store
+
+logger = logging.getLogger(__name__)
+
+GEOCODE_BATCH_SIZE = int(os.environ.get("GEOCODE_BATCH_SIZE", "100"))
+GEOCODE_RESCAN_SECONDS = float(os.environ.get("GEOCODE_RESCAN_SECONDS", "300"))
+
+IDLE, RUNNING, WAITING, DISABLED, STOPPED = "idle", "running", "waiting", "disabled", "stopped"
+
+_MISSING = or_(Store.lat.is_(None), Store.lon.is_(None))
+_BACKLOG_FILTER = (_MISSING, Store.address.is_not(None), Store.address != "")
+
+# backlog 조회/카운트는 좌표 없는 가게만 담는 부분 인덱스 ix_stores_missing_coords 사용 (migrations.py)
+
+# 그 사이 다른 경로가 좌표를 채웠으면 덮어쓰지 않음
+# skip_response_cache_invalidation: response_cache.SKIP_INVALIDATION (flask를 import하지 않으려고 이름만 사용)
+_FILL = (
+    update(Store.__table__)
+    .where(Store.__table__.c.id == bindparam("store_id"), or_(Store.__table__.c.lat.is_(None), Store.__table__.c.lon.is_(None)))
+    .values(lat=bindparam("new_lat"), lon=bindparam("new_lon"))
+    .execution_options(skip_response_cache_invalidation=True)
+)
+
+
+def count_backlog(session):
+    return session.execute(select(func.count()).select_from(Store).where(*_BACKLOG_FILTER)).scalar()
+
+
+def select_backlog(session, after_id, limit):
+    # 좌표가 비어 있는 가게 (id, address)를 after_id 다음부터 id 순으로 limit개
+    return session.execute(
+        select(Store.id, Store.address)
+        .where(*_BACKLOG_FILTER, Store.id > after_id)
+        .order_by(Store.id)
+        .limit(limit)
+    ).all()
+
+
+class GeocodeWorker:
+    def __init__(self, session_factory, geocoder, write_queue=None,
+                 batch_size=GEOCODE_BATCH_SIZE, rescan_interval=GEOCODE_RESCAN_SECONDS, on_filled=None):
+        self.session_factory = session_factory
+        self.write_queue = write_queue
+        self.on_filled = on_filled
+        self.geocoder = geocoder
+        self.batch_size = batch_size
+        self.rescan_interval = rescan_interval
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._state = IDLE
+        self._stats = {"batches": 0, "geocoded": 0, "unresolved": 0, "passes": 0}
+        self._last_error = None
+        self._last_pass_at = None
+
+    @property
+    def enabled(self):
+        return getattr(self.geocoder.backend, "enabled", True)
+
+    def start(self):
+        # 이미 실행 중이면 False
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="geocode-worker", daemon=True)
+            self._thread.start()
+        return True
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def notify(self):
+        # 좌표 없는 가게가 새로 생겼음을 알림 (대기 중이면 바로 다음 바퀴 시작)
+        self._wake.set()
+
+    def _set_state(self, state):
+        with self._lock:
+            self._state = state
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            if not self.enabled:
+                # 키가 없으면 외부 조회를 할 수 없으므로 건너뜀 (backlog는 status에서 계속 보임)
+                self._set_state(DISABLED)
+            else:
+                self._set_state(RUNNING)
+                try:
+                    self.run_pass()
+                except Exception as e:
+                    logger.exception("[Geocode Worker] pass failed")
+                    with self._lock:
+                        self._last_error = str(e)
+                self._set_state(WAITING)
+            self._wake.wait(self.rescan_interval)
+        self._set_state(STOPPED)
+
+    def run_pass(self):
+        """backlog를 id 순으로 한 바퀴 처리. 채운 가게 수를 반환."""
+        after_id = 0
+        filled = 0
+        while not self._stop.is_set():
+            with self.session_factory() as session:
+                batch = select_backlog(session, after_id, self.batch_size)
+            if not batch:
+                break
+            after_id = batch[-1].id
+            filled += self._process(batch)
+        with self._lock:
+            self._stats["passes"] += 1
+            self._last_pass_at = time.time()
+        if filled and self.on_filled is not None:
+            self.on_filled(filled)
+        return filled
+
+    def _process(self, batch):
+        # 외부 호출(캐시 miss)은 세션 밖에서: geocode_many가 자체 세션으로 캐시만 저장
+        coords = self.geocoder.geocode_many([address for _, address in batch])
+        rows = []
+        for store_id, address in batch:
+            lat, lon = coords.get(address, (None, None))
+            if lat is not None and lon is not None:
+                rows.append({"store_id": store_id, "new_lat": lat, "new_lon": lon})
+        if rows and self.write_queue is not None:
+            self.write_queue.run(lambda session: session.execute(_FILL, rows))
+        elif rows:
+            with self.session_factory() as session:
+                session.execute(_FILL, rows)
+                session.commit()
+        with self._lock:
+            self._stats["batches"] += 1
+            self._stats["geocoded"] += len(rows)
+            self._stats["unresolved"] += len(batch) - len(rows)
+        logger.info(f"[Geocode Worker] {len(rows)}/{len(batch)} stores geocoded")
+        return len(rows)
+
+    def status(self):
+        with self.session_factory() as session:
+            backlog = count_backlog(session)
+        with self._lock:
+            return {
+                "state": self._state,
+                "backlog": backlog,
+                **self._stats,
+                "last_pass_at": self._last_pass_at,
+                "last_error": self._last_error,
+            }
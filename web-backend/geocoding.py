@@ -0,0 +1,183 @@
+# geocoding.py
+# 주소 -> 좌표 변환 공용 모듈 (load_data.py, app.py 공용)
+# - geocode_cache 테이블에 정규화된 주소 기준으로 결과를 저장 (결과 없음도 저장)
+# - 캐시에 없는 주소만 스레드 풀 + 요청 속도 제한으로 백엔드에 조회
+# - 백엔드는 교체 가능 (KakaoGeocoder / StubGeocoder)
+# - 자체 세션으로 조회할 때는 외부 호출 중에 트랜잭션을 잡지 않음 (캐시 읽기 -> 외부 조회 -> 캐시 쓰기)
+import os
+import re
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from sqlalchemy.dialects.sqlite import insert
+from metrics import track_outbound
+from models import GeocodeCache
+
+logger = logging.getLogger(__name__)
+
+KAKAO_GEOCODE_URL = "https://dapi.kakao.com/v2/local/search/address.json"
+
+GEOCODE_MAX_WORKERS = int(os.environ.get("GEOCODE_MAX_WORKERS", "8"))
+GEOCODE_RATE_LIMIT = float(os.environ.get("GEOCODE_RATE_LIMIT", "10"))  # 초당 최대 요청 수
+
+# SQLite IN (...) 파라미터 수 제한을 넘지 않도록 나눠서 조회
+_LOOKUP_CHUNK = 500
+
+
+def normalize_address(address):
+    # 앞뒤 공백 제거 + 연속 공백을 하나로
+    if not address:
+        return ""
+    return re.sub(r"\s+", " ", address).strip()
+
+
+class KakaoGeocoder:
+    # 카카오 로컬 API. 결과가 없으면 None, 네트워크/HTTP 오류는 예외로 올린다
+    def __init__(self, api_key=None, timeout=5):
+        # .env 로딩 이후에 생성되므로 여기서 환경변수를 읽는다
+        self.api_key = api_key or os.environ.get("KAKAO_API_KEY")
+        self.timeout = timeout
+        self.http = requests.Session()
+
+    @property
+    def enabled(self):
+        return bool(self.api_key)
+
+    def geocode(self, address):
+        headers = {"Authorization": f"KakaoAK {self.api_key}"}
+        with track_outbound("kakao") as call:
+            resp = self.http.get(KAKAO_GEOCODE_URL, headers=headers, params={"query": address}, timeout=self.timeout)
+            call["status"] = resp.status_code
+        resp.raise_for_status()
+        docs = resp.json().get("documents", [])
+        if docs:
+            return float(docs[0]["y"]), float(docs[0]["x"])  # (lat, lon)
+        return None
+
+
+class StubGeocoder:
+    # 테스트/로컬용 백엔드. mapping에 없는 주소는 결과 없음
+    def __init__(self, mapping=None):
+        self.mapping = {normalize_address(k): v for k, v in (mapping or {}).items()}
+        self.calls = 0
+
+    def geocode(self, address):
+        self.calls += 1
+        return self.mapping.get(address)
+
+
+class RateLimiter:
+    # 여러 스레드가 공유하는 단순 간격 기반 속도 제한기
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0
+        self.lock = threading.Lock()
+        self.next_at = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            wait_for = self.next_at - now
+            self.next_at = max(now, self.next_at) + self.interval
+        if wait_for > 0:
+            time.sleep(wait_for)
+
+
+class Geocoder:
+    def __init__(self, session_factory, backend=None, max_workers=GEOCODE_MAX_WORKERS, rate_limit=GEOCODE_RATE_LIMIT,
+                 write_queue=None):
+        # write_queue가 있으면 캐시 저장은 db.write_queue로 (session_factory는 읽기 전용이어도 됨)
+        self.session_factory = session_factory
+        self.write_queue = write_queue
+        self.backend = backend or KakaoGeocoder()
+        self.max_workers = max_workers
+        self.rate_limiter = RateLimiter(rate_limit)
+
+    def geocode(self, address, session=None):
+        # 단일 주소 변환. 실패하거나 결과가 없으면 (None, None)
+        return self.geocode_many([address], session=session).get(address, (None, None))
+
+    def geocode_many(self, addresses, session=None):
+        """주소 리스트 -> {원본 주소: (lat, lon)}.
+
+        session을 넘기면 캐시 조회/저장을 호출자의 트랜잭션 안에서 하고 commit은 호출자에게 맡긴다.
+        """
+        normalized = {}
+        for address in addresses:
+            key = normalize_address(address)
+            if key:
+                normalized.setdefault(key, []).append(address)
+        if not normalized:
+            return {address: (None, None) for address in addresses}
+
+        if session is not None:
+            coords = self._load_cached(session, list(normalized))
+        else:
+            with self.session_factory() as own:
+                coords = self._load_cached(own, list(normalized))
+        misses = [key for key in normalized if key not in coords]
+        if misses:
+            resolved = self._resolve(misses)
+            if resolved:
+                self._store(session, resolved)
+                for key, latlon in resolved.items():
+                    coords[key] = latlon or (None, None)
+
+        result = {address: (None, None) for address in addresses}
+        for key, originals in normalized.items():
+            for address in originals:
+                result[address] = coords.get(key, (None, None))
+        return result
+
+    def _store(self, session, resolved):
+        stmt = insert(GeocodeCache).on_conflict_do_nothing(index_elements=["address"])
+        rows = [
+            {"address": key, "lat": latlon[0] if latlon else None, "lon": latlon[1] if latlon else None}
+            for key, latlon in resolved.items()
+        ]
+        if session is not None:
+            session.execute(stmt, rows)
+        elif self.write_queue is not None:
+            self.write_queue.run(lambda s: s.execute(stmt, rows))
+        else:
+            with self.session_factory() as own:
+                own.execute(stmt, rows)
+                own.commit()
+
+    def _load_cached(self, session, keys):
+        coords = {}
+        for i in range(0, len(keys), _LOOKUP_CHUNK):
+            chunk = keys[i:i + _LOOKUP_CHUNK]
+            rows = session.query(GeocodeCache.address, GeocodeCache.lat, GeocodeCache.lon).filter(
+                GeocodeCache.address.in_(chunk)
+            )
+            for address, lat, lon in rows:
+                coords[address] = (lat, lon)
+        return coords
+
+    def _lookup(self, key):
+        self.rate_limiter.wait()
+        try:
+            return key, True, self.backend.geocode(key)
+        except Exception as e:
+            # 일시적인 오류는 캐시하지 않고 다음 실행 때 다시 시도
+            logger.warning(f"[Geocoding Error] {key}: {e}")
+            return key, False, None
+
+    def _resolve(self, keys):
+        # {정규화 주소: (lat, lon) 또는 None(결과 없음)}, 오류난 주소는 제외
+        resolved = {}
+        if not getattr(self.backend, "enabled", True):
+            logger.warning(f"[Geocoding] backend disabled, skipped {len(keys)} lookups")
+            return resolved
+        workers = max(1, min(self.max_workers, len(keys)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for key, ok, latlon in pool.map(self._lookup, keys):
+                if ok:
+                    resolved[key] = latlon
+        if keys:
+            logger.info(f"[Geocoding] {len(keys)} lookups, {len(resolved)} cached")
+        return resolved
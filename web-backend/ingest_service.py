@@ -0,0 +1,227 @@
+# ingest_service.py
+# AI 분석 결과 수집 공용 서비스 (/stores/process, /stores/process/batch, AI 스트림 적재)
+# - 결과 여러 건을 write_queue 작업 하나로 저장: 주소 조회, 새 가게 insert, 인증 연결, AI 기여분 upsert,
+#   점수 재계산, 카드뉴스 insert를 모두 배치 단위 쿼리로 (건수와 무관한 쿼리 수)
+# - 인증 연결은 (store_id, cert_type_id) 유니크 인덱스에 INSERT OR IGNORE -> 건별 존재 확인 쿼리 없음
+# - Category/CertificationType은 프로세스 로컬 캐시(ReferenceCache): 처음 한 번 읽고, 새 코드가 나오면
+#   같은 트랜잭션에서 만든 뒤 commit이 끝나야 캐시에 반영 (롤백된 id가 캐시에 남지 않도록)
+# - 배치 저장이 실패하면 같은 작업 안에서 건별 savepoint로 다시 시도해 실패한 건만 골라냄
+# - 새 가게는 좌표 없이 저장 (geocode_worker가 채움)
+import datetime
+import threading
+from concurrent.futures import Future
+from sqlalchemy import select, insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import Store, Certification, CertificationType, Category, CardNews
+import scoring
+
+# SQLite IN (...) 파라미터 수 제한을 넘지 않도록 나눠서 조회
+_LOOKUP_CHUNK = 500
+
+
+def _chunks(items, size=_LOOKUP_CHUNK):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def normalize_record(data):
+    """AI 결과 dict -> 저장에 쓰는 값만 정리한 dict. 값 형식이 잘못되면 TypeError/ValueError."""
+    cardnews = data.get("cardnews", [])
+    if isinstance(cardnews, dict):
+        cardnews = [cardnews]
+    elif not isinstance(cardnews, list):
+        cardnews = []
+    for cn in cardnews:
+        if not isinstance(cn, dict):
+            raise TypeError(f"cardnews 항목은 객체여야 합니다: {cn!r}")
+    address = data.get("address", "")
+    categories = list(data.get("categories") or [])
+    if not isinstance(address, str) or not all(isinstance(code, str) for code in categories):
+        raise TypeError("address와 categories 항목은 문자열이어야 합니다")
+    news_count = data.get("positive_news_count", 0)
+    sns_count = data.get("positive_sns_count", 0)
+    return {
+        "store_name": data.get("store_name"),
+        "address": address,
+        "categories": categories,
+        "news_count": news_count,
+        "sns_count": sns_count,
+        "score": scoring.ai_score(news_count, sns_count),
+        "source": data.get("source", scoring.DEFAULT_AI_SOURCE),
+        "cardnews": cardnews,
+    }
+
+
+class ReferenceCache:
+    """카테고리 코드 -> 인증 종류 id (AI 결과의 카테고리는 같은 코드의 인증 종류로 연결)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._categories = None  # {code: name}
+        self._cert_types = None  # {code: id}
+
+    def _load(self, session):
+        categories = dict(session.execute(select(Category.code, Category.name)).all())
+        cert_types = dict(session.execute(select(CertificationType.code, CertificationType.id)).all())
+        with self._lock:
+            if self._cert_types is None:
+                self._categories, self._cert_types = categories, cert_types
+
+    def cert_type_ids(self, session, codes):
+        """codes -> ({code: cert_type_id}, 이번에 새로 만든 {code: id}). 새 항목은 promote() 전까지 캐시에 없음."""
+        if self._cert_types is None:
+            self._load(session)
+        with self._lock:
+            known = {code: self._cert_types[code] for code in codes if code in self._cert_types}
+            new_categories = [code for code in codes if code not in known and code not in self._categories]
+        missing = [code for code in codes if code not in known]
+        if not missing:
+            return known, {}
+
+        if new_categories:
+            session.execute(
+                sqlite_insert(Category.__table__).on_conflict_do_nothing(index_elements=["code"]),
+                [{"code": code, "name": code} for code in new_categories],
+            )
+        # 인증 종류 이름은 카테고리 이름을 그대로 사용
+        session.execute(
+            sqlite_insert(CertificationType.__table__)
+            .from_select(
+                ["code", "name", "category_code"],
+                select(Category.code, Category.name, Category.code).where(Category.code.in_(missing)),
+            )
+            .on_conflict_do_nothing(index_elements=["code"])
+        )
+        created = dict(session.execute(
+            select(CertificationType.code, CertificationType.id).where(CertificationType.code.in_(missing))
+        ).all())
+        return {**known, **created}, created
+
+    def promote(self, created):
+        # commit된 새 인증 종류를 캐시에 반영
+        if not created:
+            return
+        with self._lock:
+            if self._cert_types is None:
+                return
+            self._cert_types.update(created)
+            for code in created:
+                self._categories.setdefault(code, code)
+
+    def clear(self):
+        with self._lock:
+            self._categories = self._cert_types = None
+
+
+class IngestService:
+    def __init__(self, write_queue, min_score, references=None):
+        self.write_queue = write_queue
+        self.min_score = min_score
+        self.references = references or ReferenceCache()
+
+    def submit(self, items):
+        """AI 결과 리스트를 저장 작업으로 큐에 넣는다. Future 결과는 건별 오류 메시지 리스트 (성공이면 None)."""
+        # 값 형식이 잘못된 건(점수 계산 불가)은 저장하지 않고 해당 자리에 오류만 기록
+        errors = [None] * len(items)
+        records = []
+        for i, data in enumerate(items):
+            try:
+                records.append((i, normalize_record(data)))
+            except (TypeError, ValueError) as e:
+                errors[i] = f"invalid record: {e}"
+        result = Future()
+        if not records:
+            result.set_result(errors)
+            return result
+
+        def done(job):
+            try:
+                job_errors, created = job.result()
+            except Exception as e:
+                result.set_exception(e)
+                return
+            self.references.promote(created)
+            for (i, _), error in zip(records, job_errors):
+                errors[i] = error
+            result.set_result(errors)
+
+        self.write_queue.submit(
+            lambda session: self._ingest_job(session, [rec for _, rec in records])
+        ).add_done_callback(done)
+        return result
+
+    def ingest(self, items, timeout=None):
+        # 저장(commit)까지 기다린 뒤 건별 오류 리스트를 돌려줌
+        return self.submit(items).result(timeout)
+
+    def _ingest_job(self, session, records):
+        codes = sorted({code for rec in records for code in rec["categories"]})
+        cert_type_ids, created = self.references.cert_type_ids(session, codes)
+        errors = [None] * len(records)
+        try:
+            with session.begin_nested():
+                self.store_records(session, records, cert_type_ids)
+        except Exception:
+            # 어떤 건이 실패했는지 모르므로 건별로 다시 (성공한 건은 저장)
+            for i, rec in enumerate(records):
+                try:
+                    with session.begin_nested():
+                        self.store_records(session, [rec], cert_type_ids)
+                except Exception as e:
+                    errors[i] = str(e)
+        return errors, created
+
+    @staticmethod
+    def _lookup_store_ids(session, addresses):
+        store_ids = {}
+        for chunk in _chunks(addresses):
+            # 같은 주소가 여러 가게면 filter_by(address).first()와 같게 가장 먼저 들어온 것
+            for store_id, address in session.execute(
+                select(Store.id, Store.address).where(Store.address.in_(chunk)).order_by(Store.id)
+            ):
+                store_ids.setdefault(address, store_id)
+        return store_ids
+
+    def store_records(self, session, records, cert_type_ids):
+        """정리된 결과들을 배치 쿼리로 저장. commit은 호출자 몫. 저장 대상이 된 store id 리스트 반환."""
+        store_ids = self._lookup_store_ids(session, list({rec["address"] for rec in records}))
+
+        # 처음 보는 주소 중 점수 기준을 넘는 것만 새 가게로 (한 배치 안에서 같은 주소는 첫 건이 만든 가게 사용)
+        # ORM add_all은 SQLite에서 가게마다 INSERT 한 번이므로 executemany로 넣고 id는 주소로 다시 조회
+        now = datetime.datetime.utcnow()
+        new_stores = {}
+        for rec in records:
+            address = rec["address"]
+            if address not in store_ids and address not in new_stores and rec["score"] >= self.min_score:
+                new_stores[address] = {"name": rec["store_name"], "address": address, "score": rec["score"], "created_at": now}
+        if new_stores:
+            session.execute(insert(Store.__table__), list(new_stores.values()))
+            store_ids.update(self._lookup_store_ids(session, list(new_stores)))
+
+        links, contributions, cards = set(), [], []
+        for rec in records:
+            store_id = store_ids.get(rec["address"])
+            if store_id is None:
+                continue
+            links.update((store_id, cert_type_ids[code]) for code in rec["categories"] if code in cert_type_ids)
+            contributions.append((store_id, rec["news_count"], rec["sns_count"], rec["source"]))
+            cards.extend(
+                {"store_id": store_id, "title": cn.get("title", ""), "summary": cn.get("summary", ""), "created_at": now}
+                for cn in rec["cardnews"]
+            )
+
+        if links:
+            session.execute(
+                sqlite_insert(Certification.__table__).on_conflict_do_nothing(
+                    index_elements=["store_id", "cert_type_id"]
+                ),
+                [{"store_id": store_id, "cert_type_id": cert_type_id} for store_id, cert_type_id in sorted(links)],
+            )
+        # 같은 결과를 다시 받아도 점수가 누적되지 않도록 소스별로 기록 후 재계산
+        scoring.record_ai_contributions(session, contributions)
+        touched = sorted({store_id for store_id, *_ in contributions})
+        if touched:
+            scoring.recompute_scores(session, touched)
+        if cards:
+            session.execute(insert(CardNews.__table__), cards)
+        return touched
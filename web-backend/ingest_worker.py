@@ -0,0 +1,81 @@
+# ingest_worker.py
+# 서버 시작 시 데이터 적재를 백그라운드 스레드에서 실행
+# - 서버는 바로 기존 DB로 읽기 요청에 응답하고, 적재 진행 상황은 status()로 확인 (/ready)
+# - steps: [(이름, fn(progress))] 순서대로 실행. 한 단계가 실패해도 다음 단계는 진행
+#   progress(item, state)로 단계 안의 세부 진행(소스 파일 등)을 기록
+import time
+import threading
+import traceback
+
+IDLE, RUNNING, DONE, FAILED = "idle", "running", "done", "failed"
+
+
+class BackgroundIngest:
+    def __init__(self, steps):
+        self.steps = steps
+        self._lock = threading.Lock()
+        self._thread = None
+        self._state = IDLE
+        self._started_at = None
+        self._finished_at = None
+        self._steps = {name: {"state": IDLE, "items": {}, "error": None, "seconds": None} for name, _ in steps}
+
+    def start(self):
+        # 이미 실행 중이면 아무것도 하지 않음. 스레드를 시작했으면 True
+        with self._lock:
+            if self._state == RUNNING:
+                return False
+            self._state = RUNNING
+            self._started_at = time.time()
+            self._finished_at = None
+            for step in self._steps.values():
+                step.update(state=IDLE, items={}, error=None, seconds=None)
+            self._thread = threading.Thread(target=self._run, name="background-ingest", daemon=True)
+            self._thread.start()
+        return True
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _set_step(self, name, **fields):
+        with self._lock:
+            self._steps[name].update(fields)
+
+    def _run(self):
+        failed = False
+        for name, fn in self.steps:
+            started = time.monotonic()
+            self._set_step(name, state=RUNNING)
+
+            def progress(item, state, _name=name):
+                with self._lock:
+                    self._steps[_name]["items"][item] = state
+
+            try:
+                fn(progress)
+                with self._lock:
+                    step = self._steps[name]
+                    # 단계 함수가 오류를 삼켜도 세부 항목이 실패했으면 실패로 표시
+                    step_failed = FAILED in step["items"].values()
+                    step.update(state=FAILED if step_failed else DONE, seconds=round(time.monotonic() - started, 3))
+                failed = failed or step_failed
+            except Exception as e:
+                failed = True
+                traceback.print_exc()
+                self._set_step(name, state=FAILED, error=str(e), seconds=round(time.monotonic() - started, 3))
+        with self._lock:
+            self._state = FAILED if failed else DONE
+            self._finished_at = time.time()
+
+    def status(self):
+        with self._lock:
+            return {
+                "state": self._state,
+                "started_at": self._started_at,
+                "finished_at": self._finished_at,
+                "steps": {
+                    name: {**step, "items": dict(step["items"])}
+                    for name, step in self._steps.items()
+                },
+            }
@@ -2,14 +2,29 @@
 import csv
 import datetime
 import os
+import sys
 import json
-import requests
 import logging
+import shutil
+import argparse
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.exc import SQLAlchemyError
 from models import Base, Store, Certification, CertificationType, Category
+from db import engine, Session, ReadSession, write_queue
+from geocoding import Geocoder
+from geocode_worker import GeocodeWorker
+from spatial import ensure_spatial_index
+from category_index import ensure_category_index
+from clusters import ensure_cluster_index
+from scoring import recompute_scores
+from search_index import ensure_search_index
+import manifest
+from migrations import migrate
+from source_reader import read_source
 
 load_dotenv()
 
@@ -18,32 +33,18 @@ logger = logging.getLogger(__name__)
 
 BASE_DIR = os.path.dirname(__file__)
 DATA_DIR = os.path.join(BASE_DIR, "data")
-KAKAO_API_KEY = os.environ.get("KAKAO_API_KEY")
-
-# SQLite timeout 증가, check_same_thread 유지
-engine = create_engine(
-    "sqlite:///database.db",
-    connect_args={"check_same_thread": False, "timeout": 30}
-)
-Session = sessionmaker(bind=engine)
+# 벌크 모드에서 한 번의 executemany로 넣을 최대 행 수
+BULK_CHUNK_SIZE = 1000
+
+# 엔진/세션/쓰기 큐는 app.py와 공용 (db.py)
 Base.metadata.create_all(engine)
+migrate(engine)
+ensure_spatial_index(engine)
+ensure_category_index(engine)
+ensure_cluster_index(engine)
+ensure_search_index(engine)
 
-def geocode_address(address):
-    if not address:
-        return None, None
-    try:
-        url = "https://dapi.kakao.com/v2/local/search/address.json"
-        headers = {"Authorization": f"KakaoAK {KAKAO_API_KEY}"}
-        params = {"query": address}
-        resp = requests.get(url, headers=headers, params=params, timeout=5)
-        resp.raise_for_status()
-        docs = resp.json().get("documents", [])
-        if docs:
-            y, x = float(docs[0]["y"]), float(docs[0]["x"])
-            return y, x
-    except Exception as e:
-        logger.warning(f"[Geocoding Error] {address}: {e}")
-    return None, None
+geocoder = Geocoder(ReadSession, write_queue=write_queue)
 
 def load_categories(session):
     categories = [
@@ -60,7 +61,7 @@ def load_categories(session):
     for cat in categories:
         if not session.query(Category).filter_by(code=cat["code"]).first():
             session.add(Category(**cat))
-    session.commit()
+    session.flush()
 
 def load_certification_types(session):
     cert_types = [
@@ -78,9 +79,13 @@ def load_certification_types(session):
                 issuing_agency=ct["issuing_agency"],
                 category_code=category.code if category else None
             ))
-    session.commit()
+    session.flush()
 
+# 행 단위 로더는 파일을 끝까지 오류 없이 읽었으면 True. 파일/행 오류가 있으면 False (읽은 행은 commit됨)
+# 벌크 모드처럼 좌표는 비워 두고 geocode_worker가 채운다 (쓰기 트랜잭션 안에서 외부 지오코더를 기다리지 않도록)
+# -> 호출자는 True일 때만 manifest를 기록해서 다음 실행에서 다시 시도 (가게명 기준이라 다시 적재해도 중복 없음)
 def load_stores_from_csv(session, csv_path, cert_code, name_keys, batch_size=10):
+    failed = 0
     try:
         with open(csv_path, newline="", encoding="cp949") as f:
             reader = csv.DictReader(f)
@@ -93,13 +98,12 @@ def load_stores_from_csv(session, csv_path, cert_code, name_keys, batch_size=10)
                 try:
                     store = session.query(Store).filter_by(name=store_name).first()
                     if not store:
-                        lat, lon = geocode_address(row.get("주소", ""))
                         store = Store(
                             name=store_name,
                             address=row.get("주소", ""),
                             district=row.get("시군", ""),
-                            lat=lat,
-                            lon=lon,
+                            lat=None,
+                            lon=None,
                             phone=row.get("연락처", ""),
                             raw_meta=row,
                             created_at=datetime.datetime.utcnow(),
@@ -114,12 +118,17 @@ def load_stores_from_csv(session, csv_path, cert_code, name_keys, batch_size=10)
                         session.commit()
                 except SQLAlchemyError as e:
                     session.rollback()
+                    failed += 1
                     logger.error(f"[CSV Row Error] {row}: {e}")
             session.commit()
     except Exception as e:
+        session.rollback()
         logger.error(f"[CSV Load Error] {csv_path}: {e}")
+        return False
+    return failed == 0
 
 def load_stores_from_json(session, json_path, cert_code, batch_size=10):
+    failed = 0
     try:
         with open(json_path, "r", encoding="utf-8") as f:
             data = json.load(f)
@@ -132,13 +141,12 @@ def load_stores_from_json(session, json_path, cert_code, batch_size=10):
             try:
                 store = session.query(Store).filter_by(name=store_name).first()
                 if not store:
-                    lat, lon = geocode_address(item.get("address", ""))
                     store = Store(
                         name=store_name,
                         address=item.get("address", ""),
                         district=item.get("district", ""),
-                        lat=lat,
-                        lon=lon,
+                        lat=None,
+                        lon=None,
                         phone=item.get("phone", ""),
                         raw_meta=item,
                         created_at=datetime.datetime.utcnow(),
@@ -153,26 +161,284 @@ def load_stores_from_json(session, json_path, cert_code, batch_size=10):
                     session.commit()
             except SQLAlchemyError as e:
                 session.rollback()
+                failed += 1
                 logger.error(f"[JSON Row Error] {item}: {e}")
         session.commit()
     except Exception as e:
+        session.rollback()
         logger.error(f"[JSON Load Error] {json_path}: {e}")
+        return False
+    return failed == 0
+
+SOURCES = [
+    # (파일명, 인증 코드, CSV 가게명 컬럼 - JSON이면 None)
+    ("good_price.csv", "good_price", ["업소명"]),
+    ("green_store.csv", "eco_friendly", ["매장명", "업체명"]),
+    ("1004campaign.json", "1004campaign", None),
+    ("vision_store.json", "vision_store", None),
+]
+
+# ---------------------------------------------------------------------------
+# 벌크 로딩 모드
+# 1) 파싱: 변경된 소스 파일을 읽고 정규화 (source_reader.py, cp949 디코딩 포함). workers > 1이면 프로세스 풀에서 동시에
+# 2) 병합: 소스 간 같은 가게명은 메모리에서 한 번만 (SOURCES 순서상 먼저 나온 행 기준 = 순서대로 적재한 결과와 같음)
+# 3) 쓰기: BULK_CHUNK_SIZE 가게씩 write_queue 작업으로 나눠서 (청크마다 기존 가게명 조회 -> 새 행 executemany)
+#    작업 사이사이 다른 쓰기가 끼어들 수 있음. manifest는 마지막 청크에서만 기록 -> 중간 실패 시 다음 실행에서 재적재
+# 좌표는 비워 두고 geocode_worker가 채운다 (쓰기 트랜잭션 안에서 외부 지오코더를 기다리지 않도록).
+# ---------------------------------------------------------------------------
+# 파싱 워커 프로세스 수 기본값 (--workers). 1 이하면 풀 없이 현재 프로세스에서 파싱
+# 기본은 1: 10만 건 기준 파싱은 전체 적재의 5% 미만(약 0.6s)이고 결과를 부모로 넘기는 pickle 비용이 그만큼 듦.
+# 소스 파일이 여러 개로 크게 늘어나면 --workers / LOAD_DATA_WORKERS로 늘림
+LOAD_WORKERS = int(os.environ.get("LOAD_DATA_WORKERS", "1"))
+
+def parse_sources(jobs, workers=LOAD_WORKERS):
+    """jobs: [(key, path, name_keys)] -> {key: records 또는 예외}. 파일마다 워커 하나."""
+    results = {}
+    if workers <= 1 or len(jobs) <= 1:
+        for key, path, name_keys in jobs:
+            try:
+                results[key] = read_source(path, name_keys)
+            except Exception as e:
+                results[key] = e
+        return results
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        futures = {key: pool.submit(read_source, path, name_keys) for key, path, name_keys in jobs}
+        for key, future in futures.items():
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                results[key] = e
+    return results
+
+def _chunks(rows, size):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+def merge_sources(sources):
+    """[(cert_code, records)] -> [(record, [cert_code, ...])]. 가게명 기준으로 처음 나온 행만 남기고 인증 코드는 모음."""
+    merged = {}
+    for cert_code, records in sources:
+        for rec in records:
+            entry = merged.get(rec["name"])
+            if entry is None:
+                merged[rec["name"]] = (rec, [cert_code])
+            elif cert_code not in entry[1]:
+                entry[1].append(cert_code)
+    return list(merged.values())
+
+def _store_ids_by_name(session, names):
+    # 가게명 -> id (동일 이름이 여러 개면 filter_by().first()와 같게 가장 먼저 들어온 것)
+    store_ids = {}
+    for store_id, name in session.query(Store.id, Store.name).filter(Store.name.in_(names)).order_by(Store.id):
+        store_ids.setdefault(name, store_id)
+    return store_ids
+
+def bulk_load_chunk(session, items, cert_type_ids):
+    """merge_sources 결과 일부를 저장 (새 가게 insert, 인증 연결, 점수 재계산). (새 가게 수, 새 인증 수) 반환.
+
+    가게명/인증 쌍을 이 작업 안에서 다시 확인하므로 같은 청크를 다시 실행해도 중복이 생기지 않는다. commit은 호출자 몫.
+    """
+    store_ids = _store_ids_by_name(session, [rec["name"] for rec, _ in items])
+    new_rows = [rec for rec, _ in items if rec["name"] not in store_ids]
+    if new_rows:
+        now = datetime.datetime.utcnow()
+        session.execute(insert(Store), [
+            {**rec, "lat": None, "lon": None, "created_at": now, "score": 0} for rec in new_rows
+        ])
+        store_ids.update(_store_ids_by_name(session, [rec["name"] for rec in new_rows]))
+
+    cert_rows = [
+        {"store_id": store_ids[rec["name"]], "cert_type_id": cert_type_ids[code]}
+        for rec, codes in items for code in codes if code in cert_type_ids
+    ]
+    new_certs = 0
+    if cert_rows:
+        # (store_id, cert_type_id) 유니크 인덱스(migrations 2)로 이미 있는 쌍은 건너뜀
+        new_certs = session.execute(
+            sqlite_insert(Certification.__table__).on_conflict_do_nothing(index_elements=["store_id", "cert_type_id"]),
+            cert_rows,
+        ).rowcount
+        recompute_scores(session, list(store_ids.values()))
+    return len(new_rows), new_certs
+
+def bulk_load(ready, chunk_size=BULK_CHUNK_SIZE):
+    """파싱된 소스 [(filename, cert_code, records, source, digest)]를 병합해 청크 단위 write_queue 작업으로 저장.
+
+    청크마다 짧은 작업 하나라서 적재 중에도 다른 쓰기(/stores/process 등)가 사이사이 처리된다.
+    manifest는 마지막 청크 작업에서만 기록 -> 중간에 실패하면 다음 실행에서 처음부터 다시 (가게명/인증 쌍 기준이라 안전).
+    성공하면 True.
+    """
+    with ReadSession() as session:
+        cert_type_ids = dict(session.query(CertificationType.code, CertificationType.id).filter(
+            CertificationType.code.in_([cert_code for _, cert_code, _, _, _ in ready])
+        ))
+    items = merge_sources([(cert_code, records) for _, cert_code, records, _, _ in ready])
+    chunks = list(_chunks(items, chunk_size)) or [[]]
 
-def update_store_scores(session):
-    for store in session.query(Store).all():
-        cert_count = session.query(Certification).filter_by(store_id=store.id).count()
-        store.score = (cert_count or 0) * 50
-    session.commit()
-
-def main():
-    with Session() as session:
-        load_categories(session)
-        load_certification_types(session)
-        load_stores_from_csv(session, os.path.join(DATA_DIR, "good_price.csv"), "good_price", ["업소명"])
-        load_stores_from_csv(session, os.path.join(DATA_DIR, "green_store.csv"), "eco_friendly", ["매장명", "업체명"])
-        load_stores_from_json(session, os.path.join(DATA_DIR, "1004campaign.json"), "1004campaign")
-        load_stores_from_json(session, os.path.join(DATA_DIR, "vision_store.json"), "vision_store")
-        update_store_scores(session)
+    def record_manifest(session):
+        for _, _, _, source, digest in ready:
+            manifest.record(session, source, digest)
+
+    added = linked = 0
+    try:
+        for i, chunk in enumerate(chunks):
+            last = i == len(chunks) - 1
+
+            def job(session, chunk=chunk, last=last):
+                result = bulk_load_chunk(session, chunk, cert_type_ids)
+                if last:
+                    record_manifest(session)
+                return result
+
+            new_stores, new_certs = write_queue.run(job)
+            added += new_stores
+            linked += new_certs
+    except SQLAlchemyError as e:
+        logger.error(f"[Bulk Load Error] {', '.join(filename for filename, *_ in ready)}: {e}")
+        return False
+    for _, cert_code, records, _, _ in ready:
+        logger.info(f"[Bulk Load] {cert_code}: {len(records)} rows")
+    logger.info(f"[Bulk Load] {len(items)} stores in {len(chunks)} jobs: {added} new stores, {linked} new certifications")
+    return True
+
+def update_store_scores(session, store_ids=None):
+    # 인증 개수 + AI 기여분 집계 한 문장으로 재계산 (scoring.py). commit은 호출자 몫
+    changed = recompute_scores(session, store_ids)
+    logger.info(f"[Scores] {changed} stores updated")
+
+def main(bulk=True, force=False, progress=None, workers=LOAD_WORKERS):
+    """SOURCES를 적재한다. manifest의 해시와 같은 파일은 건너뜀 (force=True면 모두 다시 적재).
+
+    progress(source, state)가 주어지면 소스별 진행 상태(loading/loaded/skipped/failed)를 알려준다.
+    벌크 모드는 변경된 파일을 workers개 프로세스에서 동시에 파싱한 뒤 BULK_CHUNK_SIZE 가게씩 write_queue 작업으로 나눠 적재한다.
+    새로 적재한 소스가 있으면 True (새 가게의 좌표는 비어 있음 -> geocode_worker가 채움).
+    """
+    report = progress or (lambda source, state: None)
+    write_queue.run(lambda session: (load_categories(session), load_certification_types(session)))
+    pending = []  # [(filename, path, cert_code, name_keys, source, digest)]
+    for filename, cert_code, name_keys in SOURCES:
+        path = os.path.join(DATA_DIR, filename)
+        source = f"file:{filename}"
+        try:
+            digest = manifest.file_sha256(path)
+        except OSError as e:
+            logger.error(f"[Load Error] {path}: {e}")
+            report(filename, "failed")
+            continue
+        with ReadSession() as session:
+            unchanged = manifest.is_unchanged(session, source, digest)
+        if not force and unchanged:
+            logger.info(f"[Manifest] {filename} 변경 없음, 건너뜀")
+            report(filename, "skipped")
+            continue
+        pending.append((filename, path, cert_code, name_keys, source, digest))
+
+    loaded = []
+    if not bulk:
+        for filename, path, cert_code, name_keys, source, digest in pending:
+            report(filename, "loading")
+            # 행 단위 모드는 자체 세션으로 여러 번 commit (write_queue를 거치지 않는 디버깅용 경로)
+            # 실패한 파일은 manifest를 기록하지 않음 (다음 실행에서 다시 적재)
+            with Session() as session:
+                if name_keys:
+                    ok = load_stores_from_csv(session, path, cert_code, name_keys)
+                else:
+                    ok = load_stores_from_json(session, path, cert_code)
+                if ok:
+                    manifest.record(session, source, digest)
+                    session.commit()
+            if ok:
+                loaded.append(filename)
+            report(filename, "loaded" if ok else "failed")
+        if loaded:
+            # 행 단위 모드는 점수를 마지막에 한 번에 재계산 (벌크 모드는 청크마다 해당 가게만)
+            write_queue.run(update_store_scores)
+    elif pending:
+        for filename, *_ in pending:
+            report(filename, "loading")
+        parsed = parse_sources([(filename, path, name_keys) for filename, path, _, name_keys, _, _ in pending], workers)
+        ready = []
+        for filename, path, cert_code, name_keys, source, digest in pending:
+            if isinstance(parsed[filename], Exception):
+                logger.error(f"[Load Error] {path}: {parsed[filename]}")
+                report(filename, "failed")
+            else:
+                ready.append((filename, cert_code, parsed[filename], source, digest))
+
+        if ready:
+            ok = bulk_load(ready)
+            if ok:
+                loaded = [filename for filename, *_ in ready]
+            for filename, *_ in ready:
+                report(filename, "loaded" if ok else "failed")
+    return bool(loaded)
+
+# ---------------------------------------------------------------------------
+# 서버에서 적재: 이 스크립트를 낮은 CPU 우선순위 자식 프로세스로 실행 (main_in_subprocess)
+# - 파싱/병합/insert 준비 같은 파이썬 작업이 서버 프로세스의 GIL을 잡지 않고, nice로 GET 처리에 CPU를 양보
+#   (서버 스레드에서 돌리면 적재 중 GET p95가 2.7ms -> 21ms, 자식 + nice 19면 2.9ms. 3만 건, 1코어)
+# - 자식은 같은 DB 파일에 직접 쓴다. 서버 write_queue와는 SQLite 쓰기 잠금(BEGIN IMMEDIATE + busy_timeout)으로
+#   순서가 정해지고, 적재는 청크 단위 짧은 트랜잭션이라 사이사이 서버 쓰기가 들어감
+# - 서버의 응답 캐시는 자식의 commit을 모르므로 호출자가 끝난 뒤 무효화
+# ---------------------------------------------------------------------------
+LOAD_NICE = int(os.environ.get("LOAD_DATA_NICE", "19"))
+
+def main_in_subprocess(bulk=True, force=False, progress=None, workers=LOAD_WORKERS):
+    """main()을 자식 프로세스에서 실행하고 끝날 때까지 기다린다. 반환값은 main()과 같음.
+
+    progress는 이 프로세스에서 호출된다. 자식이 비정상 종료하면 False. 좌표 채우기는 호출자 몫.
+    """
+    report = progress or (lambda source, state: None)
+    command = [
+        sys.executable, os.path.abspath(__file__), "--progress", "--no-geocode",
+        "--data-dir", DATA_DIR, "--workers", str(workers),
+    ]
+    if not bulk:
+        command.append("--row-by-row")
+    if force:
+        command.append("--force")
+    # 자식의 import/마이그레이션 확인부터 낮은 우선순위로 (nice 명령이 없는 환경은 그대로 실행)
+    if LOAD_NICE and shutil.which("nice"):
+        command = ["nice", "-n", str(LOAD_NICE)] + command
+    # 점검/벤치마크 스크립트가 db.bind()로 바꾼 DB도 그대로 따라가도록 현재 쓰기 DB 경로를 넘김
+    env = {**os.environ, "DATABASE_PATH": Session.kw["bind"].url.database}
+    changed = False
+    with subprocess.Popen(command, stdout=subprocess.PIPE, text=True, env=env) as process:
+        for line in process.stdout:
+            # 진행 상태 JSON 줄만 사용 (그 밖의 출력은 무시)
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(event, dict):
+                continue
+            if "changed" in event:
+                changed = event["changed"]
+            else:
+                report(event["source"], event["state"])
+    if process.returncode != 0:
+        logger.error(f"[Load Error] 적재 프로세스가 비정상 종료 (exit code {process.returncode})")
+        return False
+    return changed
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="초기 CSV/JSON 데이터 로딩")
+    parser.add_argument("--row-by-row", action="store_true", help="벌크 모드 대신 행 단위로 로딩")
+    parser.add_argument("--force", action="store_true", help="manifest를 무시하고 모든 소스를 다시 로딩")
+    parser.add_argument("--workers", type=int, default=LOAD_WORKERS,
+                        help=f"소스 파일 파싱 프로세스 수 (기본 {LOAD_WORKERS}, 1이면 현재 프로세스에서 순서대로)")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="소스 파일 디렉터리")
+    parser.add_argument("--progress", action="store_true",
+                        help="소스별 진행 상태와 결과를 표준출력에 JSON 줄로 출력 (main_in_subprocess용)")
+    parser.add_argument("--no-geocode", action="store_true", help="적재 후 좌표 채우기를 하지 않음 (서버 geocode_worker가 처리)")
+    args = parser.parse_args()
+    DATA_DIR = args.data_dir
+    progress = None
+    if args.progress:
+        progress = lambda source, state: print(json.dumps({"source": source, "state": state}), flush=True)
+    changed = main(bulk=not args.row_by_row, force=args.force, progress=progress, workers=args.workers)
+    if args.progress:
+        print(json.dumps({"changed": changed}), flush=True)
+    if changed and not args.no_geocode:
+        # 서버 없이 실행할 때는 좌표 채우기도 여기서 한 번 (서버에서는 geocode_worker가 처리)
+        GeocodeWorker(ReadSession, geocoder, write_queue=write_queue).run_pass()
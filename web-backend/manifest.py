@@ -0,0 +1,30 @@
+# manifest.py
+# 데이터 소스 manifest: 소스별 마지막 적재 해시를 source_manifest 테이블에 기록
+# - 파일: "file:<파일명>" -> sha256
+# - AI 배치: "ai_batch" -> AI 서버가 알려주는 배치 id
+import hashlib
+import datetime
+from models import SourceManifest
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def is_unchanged(session, source, digest):
+    entry = session.get(SourceManifest, source)
+    return entry is not None and entry.digest == digest
+
+
+def record(session, source, digest):
+    # commit은 호출자 몫
+    entry = session.get(SourceManifest, source)
+    if entry is None:
+        session.add(SourceManifest(source=source, digest=digest, loaded_at=datetime.datetime.utcnow()))
+    else:
+        entry.digest = digest
+        entry.loaded_at = datetime.datetime.utcnow()
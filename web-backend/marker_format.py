@@ -0,0 +1,137 @@
+# marker_format.py
+# 지도 마커용 압축 표현 (/stores?format=columns|binary 또는 Accept 헤더)
+# - columns: 열 단위 JSON. 가게마다 키를 반복하지 않고 id/lat/lon/score/category_mask 병렬 배열
+# - binary : 같은 열을 리틀엔디언 고정 폭 배열로 패킹
+# - category_mask: categories[i] 카테고리를 가지면 i번째 비트가 1
+# ORM 객체를 만들지 않고 필요한 컬럼만 조회해서 바로 배열로 만든다
+import sys
+import json
+import struct
+from array import array
+from sqlalchemy import select
+from models import Store, StoreCategory, Category
+
+COLUMNS_MIMETYPE = "application/vnd.stores.columns+json"
+BINARY_MIMETYPE = "application/vnd.stores.markers"
+FORMATS = ("json", "columns", "binary")
+_MIMETYPE_FORMATS = {COLUMNS_MIMETYPE: "columns", BINARY_MIMETYPE: "binary"}
+
+# 위경도 소수점 자리수 (6자리 ≈ 0.1m)
+COORD_DIGITS = 6
+
+# binary 헤더: magic, version, mask 바이트 수, 예약, 가게 수, categories 길이(바이트)
+BINARY_MAGIC = b"STMK"
+BINARY_VERSION = 1
+_HEADER = struct.Struct("<4sBBHII")
+
+
+class FormatError(ValueError):
+    pass
+
+
+def negotiate(args, accept):
+    """format= 파라미터 우선, 없으면 Accept 헤더. 기본은 기존 json."""
+    fmt = args.get("format")
+    if fmt is not None:
+        if fmt not in FORMATS:
+            raise FormatError("format은 json, columns, binary 중 하나여야 합니다")
+        return fmt
+    # 같은 우선순위면 목록 앞쪽이 선택되므로 json을 먼저 둔다 (*/*, 브라우저 Accept는 json)
+    best = accept.best_match(["application/json", *_MIMETYPE_FORMATS], default="application/json")
+    return _MIMETYPE_FORMATS.get(best, "json")
+
+
+def load_markers(session, store_filter):
+    """store_filter(select) -> (categories, ids, lats, lons, scores, masks). id 순."""
+    categories = [code for (code,) in session.execute(select(Category.code).order_by(Category.code))]
+    bits = {code: 1 << i for i, code in enumerate(categories)}
+
+    ids, lats, lons, scores = [], [], [], []
+    for store_id, lat, lon, score in session.execute(
+        store_filter(select(Store.id, Store.lat, Store.lon, Store.score)).order_by(Store.id)
+    ):
+        ids.append(store_id)
+        lats.append(lat)
+        lons.append(lon)
+        scores.append(score or 0)
+
+    index = {store_id: i for i, store_id in enumerate(ids)}
+    masks = [0] * len(ids)
+    for store_id, code in session.execute(
+        select(StoreCategory.store_id, StoreCategory.category_code)
+        .where(StoreCategory.store_id.in_(store_filter(select(Store.id))))
+    ):
+        i = index.get(store_id)
+        if i is not None:
+            masks[i] |= bits.get(code, 0)
+    return categories, ids, lats, lons, scores, masks
+
+
+def _round(values):
+    return [None if v is None else round(v, COORD_DIGITS) for v in values]
+
+
+def encode_columns(categories, ids, lats, lons, scores, masks):
+    return json.dumps({
+        "count": len(ids),
+        "categories": categories,
+        "id": ids,
+        "lat": _round(lats),
+        "lon": _round(lons),
+        "score": scores,
+        "category_mask": masks,
+    }, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def encode_binary(categories, ids, lats, lons, scores, masks):
+    """
+    헤더(16바이트) + categories(UTF-8, 쉼표 구분, 4바이트 정렬로 0 패딩) + 열 배열:
+      id uint32[n], lat float32[n], lon float32[n], score int32[n], category_mask uint8[n * mask_bytes]
+    좌표가 없으면 NaN. 모든 값은 리틀엔디언.
+    """
+    mask_bytes = max(1, (len(categories) + 7) // 8)
+    legend = ",".join(categories).encode("utf-8")
+    parts = [
+        _HEADER.pack(BINARY_MAGIC, BINARY_VERSION, mask_bytes, 0, len(ids), len(legend)),
+        legend, b"\0" * (-len(legend) % 4),
+    ]
+    nan = float("nan")
+    columns = [
+        array("I", ids),
+        array("f", [nan if v is None else v for v in lats]),
+        array("f", [nan if v is None else v for v in lons]),
+        array("i", scores),
+    ]
+    for column in columns:
+        if sys.byteorder != "little":
+            column.byteswap()
+        parts.append(column.tobytes())
+    parts.append(b"".join(mask.to_bytes(mask_bytes, "little") for mask in masks))
+    return b"".join(parts)
+
+
+def decode_binary(data):
+    # 검증/클라이언트 참고용 디코더 -> encode_binary의 입력과 같은 튜플 (좌표 NaN은 None)
+    magic, version, mask_bytes, _, count, legend_len = _HEADER.unpack_from(data)
+    if magic != BINARY_MAGIC or version != BINARY_VERSION:
+        raise FormatError("지원하지 않는 marker 바이너리 형식입니다")
+    offset = _HEADER.size
+    legend = data[offset:offset + legend_len].decode("utf-8")
+    categories = legend.split(",") if legend else []
+    offset += legend_len + (-legend_len % 4)
+    columns = []
+    for typecode in ("I", "f", "f", "i"):
+        column = array(typecode)
+        column.frombytes(data[offset:offset + count * column.itemsize])
+        if sys.byteorder != "little":
+            column.byteswap()
+        offset += count * column.itemsize
+        columns.append(column.tolist())
+    ids, lats, lons, scores = columns
+    lats = [None if v != v else v for v in lats]
+    lons = [None if v != v else v for v in lons]
+    masks = [
+        int.from_bytes(data[offset + i * mask_bytes:offset + (i + 1) * mask_bytes], "little")
+        for i in range(count)
+    ]
+    return categories, ids, lats, lons, scores, masks
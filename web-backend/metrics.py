@@ -0,0 +1,240 @@
+# metrics.py
+# 요청 단위 성능 계측 + Prometheus 텍스트 형식 /metrics
+# - 라우트별 응답 시간 히스토그램, 요청당 SQL 실행 수/시간 (SQLAlchemy 엔진 이벤트)
+# - 외부 HTTP 호출 시간 (track_outbound: 카카오 지오코딩, AI 서버)
+# - SLOW_REQUEST_LOG_MS를 설정하면 그보다 느린 요청을 실행한 SQL과 함께 로그로 남김 (기본 꺼짐)
+# 스트리밍 응답은 응답 객체를 돌려준 시점까지만 잰다 (본문 전송 중 SQL은 요청 집계에서 빠짐)
+import os
+import time
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from flask import g, request, Response
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+SLOW_REQUEST_LOG_MS = float(os.environ.get("SLOW_REQUEST_LOG_MS", "0"))  # 0이면 끔
+SLOW_LOG_MAX_STATEMENTS = 50
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + list(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) + (float("inf"),)
+        self._values = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, state in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, state):
+                    cumulative += count
+                    le = f'le="{_number(bound)}"'
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, [le])} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(state[-2])}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {state[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_LATENCY = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP 요청 처리 시간", ("method", "route", "status"),
+))
+REQUEST_SQL_STATEMENTS = registry.register(Histogram(
+    "http_request_sql_statements", "요청 하나가 실행한 SQL 문 수", ("route",), COUNT_BUCKETS,
+))
+REQUEST_SQL_SECONDS = registry.register(Histogram(
+    "http_request_sql_duration_seconds", "요청 하나의 SQL 실행 시간 합", ("route",),
+))
+SQL_STATEMENTS = registry.register(Counter(
+    "db_statements_total", "실행한 SQL 문 수 (요청 밖의 적재 작업 포함)", ("database",),
+))
+SQL_SECONDS = registry.register(Counter(
+    "db_statement_seconds_total", "SQL 실행 시간 합 (요청 밖의 적재 작업 포함)", ("database",),
+))
+OUTBOUND_LATENCY = registry.register(Histogram(
+    "outbound_http_duration_seconds", "외부 HTTP 호출 시간", ("target", "status"),
+))
+
+
+@contextmanager
+def track_outbound(target):
+    """외부 HTTP 호출 시간 기록. with 블록 안에서 call["status"]에 상태 코드를 넣으면 라벨로 사용."""
+    call = {"status": "ok"}
+    started = time.perf_counter()
+    try:
+        yield call
+    except Exception:
+        call["status"] = "error"
+        raise
+    finally:
+        OUTBOUND_LATENCY.observe(time.perf_counter() - started, target, str(call["status"]))
+
+
+class RequestSQL:
+    """요청 하나의 SQL 실행 수/시간. 요청 스레드와 db-writer 스레드(write_queue 작업)가 함께 기록."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = []
+        self._lock = threading.Lock()
+
+    def add(self, elapsed, statement):
+        with self._lock:
+            self.count += 1
+            self.seconds += elapsed
+            if SLOW_REQUEST_LOG_MS and len(self.statements) < SLOW_LOG_MAX_STATEMENTS:
+                self.statements.append((elapsed, statement))
+
+
+# 현재 요청의 RequestSQL. write_queue 작업은 submit한 쪽의 contextvars 문맥에서 실행되므로 (db.py)
+# 요청이 맡긴 쓰기의 SQL도 그 요청에 집계된다
+_request_sql = contextvars.ContextVar("metrics_request_sql", default=None)
+
+
+def _route():
+    rule = request.url_rule
+    return rule.rule if rule is not None else "unmatched"
+
+
+def _engine_label(engine):
+    return os.path.basename(engine.url.database or "") or "memory"
+
+
+def instrument_engines():
+    """모든 엔진(나중에 만들어지거나 세션에 다시 바인딩되는 것 포함)의 SQL 실행 수/시간을
+    전체(DB 파일별) 및 현재 요청(_request_sql)에 집계. 여러 번 호출해도 한 번만 등록."""
+    if event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("metrics_started")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    label = _engine_label(conn.engine)
+    SQL_STATEMENTS.inc(label)
+    SQL_SECONDS.inc(label, amount=elapsed)
+    stats = _request_sql.get()
+    if stats is not None:
+        stats.add(elapsed, statement)
+
+
+def init_app(app):
+    """SQL 계측, 요청 훅과 GET /metrics를 등록."""
+    instrument_engines()
+
+    @app.before_request
+    def _start():
+        g.metrics_started = time.perf_counter()
+        g.metrics_sql = RequestSQL()
+        _request_sql.set(g.metrics_sql)
+
+    @app.after_request
+    def _finish(response):
+        started = g.pop("metrics_started", None)
+        if started is None:
+            return response
+        # 이후(스트리밍 본문 등) SQL은 집계하지 않음
+        _request_sql.set(None)
+        elapsed = time.perf_counter() - started
+        route = _route()
+        sql = g.metrics_sql
+        REQUEST_LATENCY.observe(elapsed, request.method, route, str(response.status_code))
+        REQUEST_SQL_STATEMENTS.observe(sql.count, route)
+        REQUEST_SQL_SECONDS.observe(sql.seconds, route)
+        if SLOW_REQUEST_LOG_MS and elapsed * 1000 >= SLOW_REQUEST_LOG_MS:
+            statements = "".join(
+                f"\n    {seconds * 1000:8.2f} ms  {' '.join(statement.split())[:300]}"
+                for seconds, statement in sql.statements
+            )
+            logger.warning(
+                f"[Slow Request] {request.method} {request.full_path} -> {response.status_code} "
+                f"{elapsed * 1000:.1f} ms, {sql.count} SQL ({sql.seconds * 1000:.1f} ms){statements}"
+            )
+        return response
+
+    @app.route("/metrics")
+    def metrics():
+        return Response(registry.render(), mimetype="text/plain; version=0.0.4")
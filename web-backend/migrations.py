@@ -0,0 +1,121 @@
+# migrations.py
+# 스키마 마이그레이션
+# - create_all은 없는 테이블만 만들기 때문에, 기존 DB에 인덱스/제약을 더할 때는 여기에 버전을 추가
+# - schema_migrations 테이블에 적용한 버전을 기록하고, migrate(engine)는 아직 적용하지 않은 버전만
+#   순서대로 각각 트랜잭션 하나로 실행 (여러 번 호출해도 안전)
+# - 새 DB는 create_all이 models.py 선언대로 같은 이름의 인덱스를 먼저 만들므로 IF NOT EXISTS로 작성
+# - 단계는 SQL 문자열 또는 fn(conn) (SQL만으로 안 되는 데이터 보정)
+# - 트리거로 유지되는 파생 인덱스는 ensure_derived_index: 정의(DDL/백필 SQL)가 바뀐 경우에만 다시 구성
+import hashlib
+import datetime
+import logging
+from sqlalchemy import select, insert, text, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import SchemaMigration, DerivedIndex, Certification
+from scoring import recompute_scores
+
+logger = logging.getLogger(__name__)
+
+
+def _dedupe_certifications(conn):
+    # 같은 (가게, 인증 종류)가 중복으로 들어간 기존 행은 가장 먼저 들어온 것만 남기고
+    # 인증 개수로 계산된 점수가 부풀려진 가게는 같은 트랜잭션에서 다시 계산
+    store_ids = [
+        store_id for (store_id,) in conn.execute(
+            select(Certification.store_id).distinct()
+            .group_by(Certification.store_id, Certification.cert_type_id)
+            .having(func.count() > 1)
+        )
+    ]
+    if not store_ids:
+        return
+    conn.execute(text("""
+        DELETE FROM certifications WHERE id NOT IN (
+            SELECT MIN(id) FROM certifications GROUP BY store_id, cert_type_id
+        )
+    """))
+    recompute_scores(conn, store_ids)
+    logger.info(f"[Migration] duplicate certifications removed for {len(store_ids)} stores")
+
+# (버전, 이름, 단계 목록). 한 번 배포한 항목은 고치지 말고 새 버전을 추가
+MIGRATIONS = [
+    (1, "stores lookup indexes", [
+        # 적재/수집 경로의 가게명/주소 조회, /stores 점수 필터, 지역 필터
+        "CREATE INDEX IF NOT EXISTS ix_stores_name ON stores (name)",
+        "CREATE INDEX IF NOT EXISTS ix_stores_address ON stores (address)",
+        "CREATE INDEX IF NOT EXISTS ix_stores_score ON stores (score)",
+        "CREATE INDEX IF NOT EXISTS ix_stores_district ON stores (district)",
+    ]),
+    (2, "unique certification per store and type", [
+        _dedupe_certifications,
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_certifications_store_cert ON certifications (store_id, cert_type_id)",
+    ]),
+    (3, "cardnews store index", [
+        # 가게 목록/상세의 카드뉴스 selectin 로딩 (store_id IN (...))
+        "CREATE INDEX IF NOT EXISTS ix_cardnews_store_id ON cardnews (store_id)",
+    ]),
+    (4, "stores missing coordinates index", [
+        # 좌표 채우기 워커의 backlog 조회/카운트 (좌표 없는 가게만 담는 부분 인덱스)
+        "CREATE INDEX IF NOT EXISTS ix_stores_missing_coords ON stores (id) WHERE lat IS NULL OR lon IS NULL",
+    ]),
+]
+
+
+def applied_versions(conn):
+    return {version for (version,) in conn.execute(select(SchemaMigration.version))}
+
+
+def migrate(engine):
+    """아직 적용하지 않은 마이그레이션을 실행. 새로 적용한 버전 리스트를 반환."""
+    SchemaMigration.__table__.create(engine, checkfirst=True)
+    with engine.connect() as conn:
+        done = applied_versions(conn)
+    applied = []
+    for version, name, statements in MIGRATIONS:
+        if version in done:
+            continue
+        with engine.begin() as conn:
+            # 다른 프로세스가 먼저 적용했을 수 있으므로 트랜잭션 안에서 다시 확인
+            if version in applied_versions(conn):
+                continue
+            for step in statements:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(text(step))
+            conn.execute(insert(SchemaMigration).values(
+                version=version, name=name, applied_at=datetime.datetime.utcnow(),
+            ))
+        logger.info(f"[Migration] {version}: {name}")
+        applied.append(version)
+    return applied
+
+
+def _derived_version(conn, name):
+    return conn.execute(select(DerivedIndex.version).where(DerivedIndex.name == name)).scalar()
+
+
+def ensure_derived_index(engine, name, definition, build):
+    """트리거로 유지되는 파생 인덱스 name을 정의가 바뀌었을 때만 build(conn)로 (재)구성. 구성했으면 True.
+
+    definition(DDL/백필 SQL 문자열 리스트)의 해시를 derived_indexes에 기록해 두고, 같으면 아무것도 하지 않는다
+    -> 평소 시작은 조회 한 번 (백필/재구성은 행 수에 비례하므로 처음 한 번과 정의가 바뀐 뒤에만).
+    기록 뒤에 들어온 행은 트리거가 반영한다. build는 여러 번 실행해도 안전해야 한다.
+    """
+    version = hashlib.sha256("\n".join(definition).encode()).hexdigest()[:16]
+    DerivedIndex.__table__.create(engine, checkfirst=True)
+    with engine.connect() as conn:
+        if _derived_version(conn, name) == version:
+            return False
+    with engine.begin() as conn:
+        # 다른 프로세스가 먼저 구성했을 수 있으므로 트랜잭션 안에서 다시 확인
+        if _derived_version(conn, name) == version:
+            return False
+        build(conn)
+        conn.execute(sqlite_insert(DerivedIndex).values(
+            name=name, version=version, built_at=datetime.datetime.utcnow(),
+        ).on_conflict_do_update(
+            index_elements=["name"], set_={"version": version, "built_at": datetime.datetime.utcnow()},
+        ))
+    logger.info(f"[Derived Index] {name} built ({version})")
+    return True
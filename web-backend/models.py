@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, JSON, Index, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 import datetime
@@ -8,24 +8,60 @@ Base = declarative_base()
 class Store(Base):
     __tablename__ = 'stores'
     id = Column(Integer, primary_key=True)
-    name = Column(String, nullable=False)
-    address = Column(String, nullable=False)
-    district = Column(String)  # 필터 가능한 최소 단위 주소
+    name = Column(String, nullable=False, index=True)
+    address = Column(String, nullable=False, index=True)
+    district = Column(String, index=True)  # 필터 가능한 최소 단위 주소
     lat = Column(Float, nullable=True)  # 위도
     lon = Column(Float, nullable=True)  # 경도
     phone = Column(String)
     
     @property
     def categories(self):
-        # store가 가진 모든 certification의 카테고리 코드 집합 반환
-        return list({cert.cert_type.category_code for cert in self.certifications if cert.cert_type and cert.cert_type.category_code})
+        # store가 가진 모든 certification의 카테고리 코드 (store_categories 비정규화 매핑에서 읽음)
+        return [link.category_code for link in self.category_links]
 
     raw_meta = Column(JSON)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
-    score = Column(Integer, default=0)
+    score = Column(Integer, default=0, index=True)
 
     certifications = relationship("Certification", back_populates="store")
     cardnews = relationship("CardNews", back_populates="store")
+    category_links = relationship("StoreCategory", order_by="StoreCategory.category_code", viewonly=True)
+    ai_contributions = relationship("AIContribution", back_populates="store")
+
+    __table_args__ = (
+        # 좌표가 비어 있는 가게만 (geocode_worker backlog)
+        Index('ix_stores_missing_coords', 'id', sqlite_where=text('lat IS NULL OR lon IS NULL')),
+    )
+
+class StoreCategory(Base):
+    # store -> 카테고리 코드 매핑. certifications 트리거로 유지됨 (category_index.py)
+    __tablename__ = 'store_categories'
+    store_id = Column(Integer, ForeignKey('stores.id'), primary_key=True)
+    category_code = Column(String, primary_key=True)
+
+    __table_args__ = (
+        Index('ix_store_categories_category_store', 'category_code', 'store_id'),
+    )
+
+class StoreCluster(Base):
+    # 줌 레벨별 격자 셀 집계 (지도 마커 클러스터). stores 트리거로 유지됨 (clusters.py)
+    __tablename__ = 'store_clusters'
+    zoom = Column(Integer, primary_key=True)
+    cell_x = Column(Integer, primary_key=True)
+    cell_y = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    sum_lat = Column(Float, nullable=False, default=0.0)  # 중심 좌표 = sum / count
+    sum_lon = Column(Float, nullable=False, default=0.0)
+
+class StoreClusterCategory(Base):
+    # 클러스터 셀별 카테고리 가게 수. store_categories 트리거로 유지됨 (clusters.py)
+    __tablename__ = 'store_cluster_categories'
+    zoom = Column(Integer, primary_key=True)
+    cell_x = Column(Integer, primary_key=True)
+    cell_y = Column(Integer, primary_key=True)
+    category_code = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
 
 class CertificationType(Base):
     __tablename__ = 'certification_types'
@@ -48,10 +84,14 @@ class Certification(Base):
     store = relationship("Store", back_populates="certifications")
     cert_type = relationship("CertificationType", back_populates="certifications")
 
+    __table_args__ = (
+        Index('ux_certifications_store_cert', 'store_id', 'cert_type_id', unique=True),
+    )
+
 class CardNews(Base):
     __tablename__ = 'cardnews'
     id = Column(Integer, primary_key=True)
-    store_id = Column(Integer, ForeignKey('stores.id'), nullable=False)
+    store_id = Column(Integer, ForeignKey('stores.id'), nullable=False, index=True)
     title = Column(String, nullable=False)
     summary = Column(String, nullable=False)
     categories = Column(JSON, default=[])
@@ -67,4 +107,46 @@ class Category(Base):
     name = Column(String)
     description = Column(String)
 
-    certification_types = relationship("CertificationType", back_populates="category")
\ No newline at end of file
+    certification_types = relationship("CertificationType", back_populates="category")
+
+class AIContribution(Base):
+    # AI 분석 결과가 store 점수에 더하는 몫. (store_id, source)당 한 행이라 같은 결과를 다시 받아도 점수가 늘지 않음
+    __tablename__ = 'ai_contributions'
+    store_id = Column(Integer, ForeignKey('stores.id'), primary_key=True)
+    source = Column(String, primary_key=True)
+    positive_news_count = Column(Integer, default=0)
+    positive_sns_count = Column(Integer, default=0)
+    score = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+    store = relationship("Store", back_populates="ai_contributions")
+
+class SourceManifest(Base):
+    # 마지막으로 적재한 데이터 소스의 해시 (파일 sha256, AI 배치 id). 같으면 다시 적재하지 않음
+    __tablename__ = 'source_manifest'
+    source = Column(String, primary_key=True)
+    digest = Column(String, nullable=False)
+    loaded_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+class GeocodeCache(Base):
+    # 정규화된 주소 -> 좌표 캐시. lat/lon이 모두 None이면 "결과 없음"으로 기록된 주소
+    __tablename__ = 'geocode_cache'
+    address = Column(String, primary_key=True)
+    lat = Column(Float, nullable=True)
+    lon = Column(Float, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class SchemaMigration(Base):
+    # 적용한 스키마 마이그레이션 버전 (migrations.py)
+    __tablename__ = 'schema_migrations'
+    version = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)
+    applied_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+
+class DerivedIndex(Base):
+    # 트리거로 유지되는 파생 인덱스(R*Tree, FTS, 카테고리, 클러스터)를 마지막으로 구성한 정의의 해시 (migrations.ensure_derived_index)
+    __tablename__ = 'derived_indexes'
+    name = Column(String, primary_key=True)
+    version = Column(String, nullable=False)
+    built_at = Column(DateTime, default=datetime.datetime.utcnow)
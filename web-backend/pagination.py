@@ -0,0 +1,120 @@
+# pagination.py
+# 목록 API 공용: keyset(cursor) 페이지네이션 + 스트리밍 응답
+#   ?limit=N[&cursor=...]  -> {"items": [...], "next_cursor": "..." | null}
+#   ?stream=json|ndjson    -> id 순으로 배치 조회하며 청크 단위로 전송 (요청당 메모리 상한 = 배치 크기)
+#   (둘 다 없으면 기존처럼 전체 배열)
+import json
+import base64
+import binascii
+from flask import Response, jsonify, stream_with_context
+
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+STREAM_BATCH_SIZE = 500
+STREAM_FORMATS = ("json", "ndjson")
+
+
+class PaginationError(ValueError):
+    pass
+
+
+def encode_cursor(last_id):
+    raw = json.dumps({"id": last_id}).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        return int(json.loads(raw)["id"])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise PaginationError("잘못된 cursor 입니다")
+
+
+def parse_page_args(args):
+    """request.args -> (limit, after_id, stream_format). 페이지네이션을 안 쓰면 limit/after_id는 None."""
+    limit = args.get("limit")
+    cursor = args.get("cursor")
+    stream_format = args.get("stream")
+
+    if stream_format is not None and stream_format not in STREAM_FORMATS:
+        raise PaginationError("stream은 json 또는 ndjson 이어야 합니다")
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise PaginationError("limit는 숫자여야 합니다")
+        if limit <= 0:
+            raise PaginationError("limit는 0보다 커야 합니다")
+        limit = min(limit, MAX_PAGE_LIMIT)
+    elif cursor is not None and stream_format is None:
+        limit = DEFAULT_PAGE_LIMIT
+    after_id = decode_cursor(cursor) if cursor else None
+    return limit, after_id, stream_format
+
+
+def _after(query, id_column, after_id):
+    if after_id is not None:
+        query = query.filter(id_column > after_id)
+    return query.order_by(id_column)
+
+
+def iter_batches(session, build_query, id_column, after_id=None, limit=None, batch_size=STREAM_BATCH_SIZE):
+    # id 순으로 batch_size개씩 조회 (keyset). limit이 있으면 총 limit개까지만
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = batch_size if remaining is None else min(batch_size, remaining)
+        rows = _after(build_query(session), id_column, after_id).limit(size).all()
+        if not rows:
+            return
+        yield rows
+        after_id = rows[-1].id
+        if remaining is not None:
+            remaining -= len(rows)
+        if len(rows) < size:
+            return
+        # 이미 보낸 배치의 객체는 세션에서 떼어내 메모리를 묶어두지 않음
+        session.expunge_all()
+
+
+def _stream(session_factory, build_query, id_column, serialize, after_id, limit, stream_format):
+    with session_factory() as session:
+        first = True
+        if stream_format == "json":
+            yield "["
+        for rows in iter_batches(session, build_query, id_column, after_id, limit):
+            for item in serialize(rows):
+                if stream_format == "ndjson":
+                    yield json.dumps(item, ensure_ascii=False) + "\n"
+                else:
+                    yield ("" if first else ",") + json.dumps(item, ensure_ascii=False)
+                    first = False
+        if stream_format == "json":
+            yield "]"
+
+
+def list_response(session_factory, build_query, id_column, serialize, args):
+    """목록 API 응답. build_query(session) -> 필터가 걸린 query, serialize(rows) -> dict 리스트."""
+    try:
+        limit, after_id, stream_format = parse_page_args(args)
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if stream_format:
+        mimetype = "application/x-ndjson" if stream_format == "ndjson" else "application/json"
+        return Response(
+            stream_with_context(_stream(session_factory, build_query, id_column, serialize, after_id, limit, stream_format)),
+            mimetype=mimetype,
+        )
+
+    with session_factory() as session:
+        if limit is None:
+            return jsonify(serialize(_after(build_query(session), id_column, None).all()))
+
+        rows = _after(build_query(session), id_column, after_id).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return jsonify({
+            "items": serialize(rows),
+            "next_cursor": encode_cursor(rows[-1].id) if has_more else None,
+        })
@@ -0,0 +1,30 @@
+# query_counter.py
+# 엔진에서 실행되는 SQL 문을 세는 도구 (N+1 회귀 확인용, check_query_counts.py 참고)
+#   with count_queries(engine) as counter:
+#       client.get("/cardnews")
+#   counter.count, counter.statements
+from contextlib import contextmanager
+from sqlalchemy import event
+
+
+class QueryCounter:
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+@contextmanager
+def count_queries(engine):
+    counter = QueryCounter()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counter.statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
@@ -0,0 +1,171 @@
+# response_cache.py
+# GET 응답 캐시 (LRU + 쓰기 시 버전 증가로 무효화 + ETag/304)
+# - 키: 경로 + 정렬된 query args
+# - DB에 쓰기가 commit되면 version이 올라가고 이전 버전 항목은 모두 무효
+#   (install_invalidation으로 등록한 sessionmaker의 세션만 감지 -> 다른 프로세스의 쓰기는 ttl로 만료)
+#   execution option SKIP_INVALIDATION이 붙은 문장은 무효화하지 않음 (호출자가 따로 invalidate)
+# - 스트리밍 응답(?stream=)은 캐시하지 않음
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+from flask import request, Response, make_response
+from sqlalchemy import event
+from compression import etag_variants
+
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", "512"))
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", "300"))  # 초, 0이면 만료 없음
+# 문장(statement.execution_options)에 True로 붙이면 commit 시 캐시를 비우지 않음
+SKIP_INVALIDATION = "skip_response_cache_invalidation"
+
+
+class ResponseCache:
+    def __init__(self, max_entries=RESPONSE_CACHE_MAX_ENTRIES, max_bytes=RESPONSE_CACHE_MAX_BYTES, ttl=RESPONSE_CACHE_TTL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (version, stored_at, etag, mimetype, body)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        # 쓰기 후 호출. 항목은 버전이 달라져 다음 조회 때 버려진다
+        with self._lock:
+            self.version += 1
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            version, stored_at, *_ = entry
+            if version != self.version or (self.ttl and time.monotonic() - stored_at > self.ttl):
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, version, etag, mimetype, body):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if version != self.version:
+                # 응답을 만드는 사이에 쓰기가 있었음
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (version, time.monotonic(), etag, mimetype, body)
+            self._bytes += len(body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= len(entry[4])
+
+    def stats(self):
+        with self._lock:
+            return {
+                "version": self.version,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+def _cache_key(vary=None):
+    args = tuple(sorted(request.args.items(multi=True)))
+    if vary is not None:
+        # query args 외에 응답을 바꾸는 요소 (예: Accept 헤더로 고른 형식)
+        return request.path, args, vary()
+    return request.path, args
+
+
+def _conditional(etag, mimetype, body, vary_headers=()):
+    # 클라이언트가 가진 표현(무압축/압축)의 ETag와 비교. 304에는 그 ETag를 그대로 돌려줌
+    # (200은 compress_response가 실제 인코딩에 맞춰 ETag를 바꿈)
+    matched = next((tag for tag in etag_variants(etag) if request.if_none_match.contains(tag)), None)
+    if matched is not None:
+        resp = Response(status=304)
+        resp.set_etag(matched)
+    else:
+        resp = Response(body, status=200, mimetype=mimetype)
+        resp.set_etag(etag)
+    resp.vary.update(vary_headers)
+    return resp
+
+
+def cached(cache, vary=None, vary_headers=()):
+    """Flask GET 뷰 데코레이터. 200 응답만 캐시하고, 모든 응답에 ETag를 붙인다.
+
+    vary: 캐시 키에 더할 값을 돌려주는 함수 (query args로 구분되지 않는 헤더 협상 결과 등).
+    vary_headers: vary가 참고하는 요청 헤더 이름 (Vary 응답 헤더로 알림).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if "stream" in request.args:
+                return view(*args, **kwargs)
+
+            try:
+                key = _cache_key(vary)
+            except ValueError:
+                # 협상 실패(잘못된 파라미터)는 뷰가 400으로 응답하도록 캐시를 거치지 않음
+                return view(*args, **kwargs)
+            entry = cache.get(key)
+            if entry is not None:
+                _, _, etag, mimetype, body = entry
+                return _conditional(etag, mimetype, body, vary_headers)
+
+            version = cache.version
+            resp = make_response(view(*args, **kwargs))
+            if resp.status_code != 200 or resp.is_streamed:
+                return resp
+            body = resp.get_data()
+            # 내용 기반 ETag -> 다른 데이터가 바뀌어도 이 응답이 같으면 304
+            etag = hashlib.blake2b(body, digest_size=12).hexdigest()
+            cache.put(key, version, etag, resp.mimetype, body)
+            return _conditional(etag, resp.mimetype, body, vary_headers)
+        return wrapper
+    return decorator
+
+
+def install_invalidation(cache, session_factory):
+    """session_factory(sessionmaker)로 만든 세션이 무언가를 쓰고 commit하면 cache.invalidate()."""
+
+    @event.listens_for(session_factory, "after_flush")
+    def _mark_flush(session, flush_context):
+        session.info["response_cache_dirty"] = True
+
+    @event.listens_for(session_factory, "do_orm_execute")
+    def _mark_dml(orm_execute_state):
+        if orm_execute_state.execution_options.get(SKIP_INVALIDATION):
+            return
+        if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+            orm_execute_state.session.info["response_cache_dirty"] = True
+
+    # after_commit/after_rollback은 savepoint(write_queue 작업마다 begin_nested)에서도 불린다.
+    # savepoint RELEASE 시점에는 아직 다른 연결이 새 행을 못 보므로 무효화는 바깥 트랜잭션이 끝날 때만,
+    # 실패한 작업의 savepoint rollback은 같은 묶음의 앞선 작업이 남긴 표시를 지우지 않음
+    @event.listens_for(session_factory, "after_commit")
+    def _invalidate(session):
+        if session.in_nested_transaction():
+            return
+        if session.info.pop("response_cache_dirty", False):
+            cache.invalidate()
+
+    @event.listens_for(session_factory, "after_rollback")
+    def _reset(session):
+        if session.in_nested_transaction():
+            return
+        session.info.pop("response_cache_dirty", None)
@@ -0,0 +1,86 @@
+# scoring.py
+# store 점수 계산
+#   score = 인증 개수 * CERT_SCORE + Σ(AI 소스별 점수)
+# - AI 점수는 ai_contributions에 (store_id, source)별로 덮어써서 기록 -> 재처리해도 멱등
+# - 재계산은 GROUP BY 집계 + UPDATE ... FROM 한 문장 (전체 또는 일부 store)
+import datetime
+from sqlalchemy import select, update, func
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import aliased
+from models import Store, Certification, AIContribution
+
+CERT_SCORE = 50
+NEWS_SCORE = 25
+SNS_SCORE = 10
+
+# 목록/검색/지도에 보이는 최소 점수 기준 (app.py, clusters.py 집계 트리거 공용)
+MIN_SCORE = 50
+
+DEFAULT_AI_SOURCE = "ai_overview"
+
+# SQLite IN (...) 파라미터 수 제한을 넘지 않도록 나눠서 갱신
+_IDS_CHUNK = 500
+
+
+def ai_score(positive_news_count, positive_sns_count):
+    return (positive_news_count or 0) * NEWS_SCORE + (positive_sns_count or 0) * SNS_SCORE
+
+
+def record_ai_contributions(session, contributions):
+    """[(store_id, news, sns, source)]를 executemany 한 번으로 upsert. commit은 호출자 몫."""
+    if not contributions:
+        return
+    now = datetime.datetime.utcnow()
+    stmt = insert(AIContribution.__table__)
+    session.execute(stmt.on_conflict_do_update(
+        index_elements=["store_id", "source"],
+        set_={
+            "positive_news_count": stmt.excluded.positive_news_count,
+            "positive_sns_count": stmt.excluded.positive_sns_count,
+            "score": stmt.excluded.score,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    ), [
+        {
+            "store_id": store_id,
+            "source": source,
+            "positive_news_count": news or 0,
+            "positive_sns_count": sns or 0,
+            "score": ai_score(news, sns),
+            "updated_at": now,
+        }
+        for store_id, news, sns, source in contributions
+    ])
+
+
+def _score_update(store_ids=None):
+    cert_counts = select(Certification.store_id, func.count().label("n")).group_by(Certification.store_id)
+    ai_totals = select(AIContribution.store_id, func.sum(AIContribution.score).label("total")).group_by(AIContribution.store_id)
+    target = aliased(Store)
+    scores = select(target.id.label("store_id"))
+    if store_ids is not None:
+        cert_counts = cert_counts.where(Certification.store_id.in_(store_ids))
+        ai_totals = ai_totals.where(AIContribution.store_id.in_(store_ids))
+        scores = scores.where(target.id.in_(store_ids))
+    cert_counts = cert_counts.subquery()
+    ai_totals = ai_totals.subquery()
+    scores = scores.add_columns(
+        (func.coalesce(cert_counts.c.n, 0) * CERT_SCORE + func.coalesce(ai_totals.c.total, 0)).label("score")
+    ).outerjoin(cert_counts, cert_counts.c.store_id == target.id).outerjoin(
+        ai_totals, ai_totals.c.store_id == target.id
+    ).subquery()
+    return update(Store).where(
+        Store.id == scores.c.store_id,
+        Store.score.is_distinct_from(scores.c.score),
+    ).values(score=scores.c.score).execution_options(synchronize_session=False)
+
+
+def recompute_scores(session, store_ids=None):
+    """점수를 집계 한 문장으로 다시 계산. store_ids를 주면 해당 store만. 바뀐 행 수 반환 (commit은 호출자 몫)."""
+    if store_ids is None:
+        return session.execute(_score_update()).rowcount
+    store_ids = list(set(store_ids))
+    changed = 0
+    for i in range(0, len(store_ids), _IDS_CHUNK):
+        changed += session.execute(_score_update(store_ids[i:i + _IDS_CHUNK])).rowcount
+    return changed
@@ -0,0 +1,115 @@
+# search_index.py
+# 가게 검색 인덱스 (SQLite FTS5 trigram)
+# - stores_fts(name, address, district): rowid = stores.id, 공백을 제거한 텍스트를 저장
+#   -> "돈까스 보라" / "돈까스보라" 같은 띄어쓰기 차이와 한글 부분 일치를 모두 잡음
+# - stores 테이블 트리거로 insert/update/delete 동기화
+# - 3글자 이상은 MATCH + bm25 순위, 더 짧은 검색어는 가게명 LIKE로 대체
+from sqlalchemy import text
+from migrations import ensure_derived_index
+
+# bm25 컬럼 가중치 (name, address, district)
+NAME_WEIGHT = 10.0
+ADDRESS_WEIGHT = 2.0
+DISTRICT_WEIGHT = 1.0
+
+# trigram 토크나이저는 3글자 미만 검색어를 MATCH로 찾지 못함
+MIN_MATCH_LENGTH = 3
+
+_COMPACT = "replace(replace(coalesce({col}, ''), ' ', ''), char(9), '')"
+
+_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS stores_fts USING fts5(
+        name, address, district, tokenize='trigram'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS stores_fts_insert AFTER INSERT ON stores
+    BEGIN
+        INSERT INTO stores_fts (rowid, name, address, district) VALUES (
+            NEW.id, {_COMPACT.format(col="NEW.name")},
+            {_COMPACT.format(col="NEW.address")}, {_COMPACT.format(col="NEW.district")}
+        );
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS stores_fts_update AFTER UPDATE OF name, address, district ON stores
+    BEGIN
+        DELETE FROM stores_fts WHERE rowid = OLD.id;
+        INSERT INTO stores_fts (rowid, name, address, district) VALUES (
+            NEW.id, {_COMPACT.format(col="NEW.name")},
+            {_COMPACT.format(col="NEW.address")}, {_COMPACT.format(col="NEW.district")}
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS stores_fts_delete AFTER DELETE ON stores
+    BEGIN
+        DELETE FROM stores_fts WHERE rowid = OLD.id;
+    END
+    """,
+]
+
+_BACKFILL = f"""
+    INSERT INTO stores_fts (rowid, name, address, district)
+    SELECT id, {_COMPACT.format(col="name")}, {_COMPACT.format(col="address")}, {_COMPACT.format(col="district")}
+    FROM stores WHERE id NOT IN (SELECT rowid FROM stores_fts)
+"""
+
+_MATCH_SQL = text(f"""
+    SELECT s.id FROM stores_fts
+    JOIN stores s ON s.id = stores_fts.rowid
+    WHERE stores_fts MATCH :query AND s.score >= :min_score
+    ORDER BY bm25(stores_fts, {NAME_WEIGHT}, {ADDRESS_WEIGHT}, {DISTRICT_WEIGHT}), s.score DESC
+    LIMIT :limit
+""")
+
+# 짧은 검색어: 가게명만, FTS5 content 테이블(c0 = 공백 제거한 name)을 직접 훑고 LIMIT에서 멈춤
+# (trigram 가상 테이블에 3글자 미만 LIKE를 걸면 인덱스를 못 쓰고 더 느림)
+_LIKE_SQL = text("""
+    SELECT s.id FROM stores_fts_content c
+    JOIN stores s ON s.id = c.id
+    WHERE c.c0 LIKE :pattern ESCAPE '\\' AND s.score >= :min_score
+    LIMIT :limit
+""")
+
+
+def _build(conn):
+    for ddl in _DDL:
+        conn.execute(text(ddl))
+    conn.execute(text(_BACKFILL))
+
+
+def ensure_search_index(engine):
+    # 가상 테이블/트리거 생성 + 트리거 이전에 들어온 store 반영. 정의가 바뀌었을 때만 (migrations.ensure_derived_index)
+    ensure_derived_index(engine, "stores_fts", _DDL + [_BACKFILL], _build)
+
+
+def _phrase(term):
+    return '"' + term.replace('"', '""') + '"'
+
+
+def build_match_query(query):
+    """검색어 -> FTS5 MATCH 식. 3글자 미만이라 MATCH를 못 쓰면 None."""
+    compact = "".join(query.split())
+    if len(compact) < MIN_MATCH_LENGTH:
+        return None
+    expr = _phrase(compact)
+    # 단어 순서가 바뀐 검색어("보라 돈까스")도 찾도록, 모든 단어가 3글자 이상이면 AND 조건 추가
+    words = query.split()
+    if len(words) > 1 and all(len(w) >= MIN_MATCH_LENGTH for w in words):
+        expr = f"{expr} OR ({' AND '.join(_phrase(w) for w in words)})"
+    return expr
+
+
+def search_store_ids(session, query, limit, min_score=0):
+    # 관련도 순 store id 리스트
+    match_query = build_match_query(query)
+    if match_query:
+        rows = session.execute(_MATCH_SQL, {"query": match_query, "min_score": min_score, "limit": limit})
+    else:
+        compact = "".join(query.split())
+        escaped = compact.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        pattern = f"%{escaped}%"
+        rows = session.execute(_LIKE_SQL, {"pattern": pattern, "min_score": min_score, "limit": limit})
+    return [row[0] for row in rows]
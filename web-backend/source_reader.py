@@ -0,0 +1,49 @@
+# source_reader.py
+# load_data 소스 파일(CSV/JSON) 파싱 -> 정규화된 가게 dict 리스트
+# - DB/설정을 건드리지 않는 가벼운 모듈: load_data가 프로세스 풀 워커에서 이 함수들을 실행
+#   (워커는 이 모듈만 import 하므로 엔진/마이그레이션 초기화가 워커마다 다시 돌지 않음)
+# - cp949 디코딩, csv 파싱, 행 정규화까지 워커에서 끝내고 결과 리스트만 부모로 돌려줌
+import csv
+import json
+
+
+def read_csv_records(csv_path, name_keys):
+    records = []
+    with open(csv_path, newline="", encoding="cp949") as f:
+        for row in csv.DictReader(f):
+            store_name = next((row.get(k) for k in name_keys if row.get(k)), None)
+            if not store_name:
+                continue
+            records.append({
+                "name": store_name,
+                "address": row.get("주소", ""),
+                "district": row.get("시군", ""),
+                "phone": row.get("연락처", ""),
+                "raw_meta": row,
+            })
+    return records
+
+
+def read_json_records(json_path):
+    with open(json_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    records = []
+    for item in data:
+        store_name = item.get("name")
+        if not store_name:
+            continue
+        records.append({
+            "name": store_name,
+            "address": item.get("address", ""),
+            "district": item.get("district", ""),
+            "phone": item.get("phone", ""),
+            "raw_meta": item,
+        })
+    return records
+
+
+def read_source(path, name_keys):
+    # SOURCES 항목 하나: CSV 가게명 컬럼이 있으면 CSV, 없으면(None) JSON
+    if name_keys:
+        return read_csv_records(path, name_keys)
+    return read_json_records(path)
@@ -0,0 +1,114 @@
+# spatial.py
+# Store.lat/Store.lon 공간 인덱스 (SQLite R*Tree)
+# - stores_rtree 가상 테이블은 stores 테이블 트리거로 자동 동기화
+# - 반경 검색: R*Tree로 bounding box 후보를 뽑고, 하버사인 거리로 정확히 거른 뒤 정렬
+import math
+from sqlalchemy import Table, Column, Integer, Float, MetaData, text
+from models import Store
+from migrations import ensure_derived_index
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE_LAT = 111.32
+
+# create_all 대상이 아니도록 별도 MetaData 사용 (가상 테이블은 ensure_spatial_index에서 생성)
+stores_rtree = Table(
+    "stores_rtree", MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("min_lat", Float),
+    Column("max_lat", Float),
+    Column("min_lon", Float),
+    Column("max_lon", Float),
+)
+
+_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS stores_rtree USING rtree(
+        id, min_lat, max_lat, min_lon, max_lon
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS stores_rtree_insert AFTER INSERT ON stores
+    WHEN NEW.lat IS NOT NULL AND NEW.lon IS NOT NULL
+    BEGIN
+        INSERT OR REPLACE INTO stores_rtree VALUES (NEW.id, NEW.lat, NEW.lat, NEW.lon, NEW.lon);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS stores_rtree_update AFTER UPDATE OF lat, lon ON stores
+    BEGIN
+        DELETE FROM stores_rtree WHERE id = OLD.id;
+        INSERT INTO stores_rtree
+            SELECT NEW.id, NEW.lat, NEW.lat, NEW.lon, NEW.lon
+            WHERE NEW.lat IS NOT NULL AND NEW.lon IS NOT NULL;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS stores_rtree_delete AFTER DELETE ON stores
+    BEGIN
+        DELETE FROM stores_rtree WHERE id = OLD.id;
+    END
+    """,
+]
+
+_BACKFILL = """
+    INSERT INTO stores_rtree
+    SELECT id, lat, lat, lon, lon FROM stores
+    WHERE lat IS NOT NULL AND lon IS NOT NULL
+      AND id NOT IN (SELECT id FROM stores_rtree)
+"""
+
+
+def _build(conn):
+    for ddl in _DDL:
+        conn.execute(text(ddl))
+    conn.execute(text(_BACKFILL))
+
+
+def ensure_spatial_index(engine):
+    # 가상 테이블/트리거 생성 + 트리거 이전에 들어온 좌표 채우기. 정의가 바뀌었을 때만 (migrations.ensure_derived_index)
+    ensure_derived_index(engine, "stores_rtree", _DDL + [_BACKFILL], _build)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(lat, lon, radius_km):
+    # 반경 radius_km 원을 감싸는 (min_lat, max_lat, min_lon, max_lon)
+    dlat = radius_km / KM_PER_DEGREE_LAT
+    cos_lat = math.cos(math.radians(lat))
+    if cos_lat < 1e-6:
+        dlon = 180.0
+    else:
+        dlon = min(180.0, radius_km / (KM_PER_DEGREE_LAT * cos_lat))
+    return lat - dlat, lat + dlat, lon - dlon, lon + dlon
+
+
+def nearby_query(session, lat, lon, radius_km, *columns):
+    """R*Tree bounding box 안의 후보 store 쿼리. 호출자가 필터를 더 붙일 수 있다."""
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_km)
+    return session.query(*(columns or (Store,))).join(
+        stores_rtree, stores_rtree.c.id == Store.id
+    ).filter(
+        stores_rtree.c.max_lat >= min_lat,
+        stores_rtree.c.min_lat <= max_lat,
+        stores_rtree.c.max_lon >= min_lon,
+        stores_rtree.c.min_lon <= max_lon,
+    )
+
+
+def rank_by_distance(rows, lat, lon, radius_km, limit=None):
+    # rows: lat/lon 속성을 가진 객체 -> [(distance_km, row)] 가까운 순
+    ranked = []
+    for row in rows:
+        if row.lat is None or row.lon is None:
+            continue
+        distance = haversine_km(lat, lon, row.lat, row.lon)
+        if distance <= radius_km:
+            ranked.append((distance, row))
+    ranked.sort(key=lambda item: item[0])
+    return ranked[:limit] if limit else ranked